@@ -4,19 +4,42 @@ from dotenv import load_dotenv
 # Load environment variables FIRST before any other imports
 load_dotenv()
 
+import hashlib
+import hmac
 import json
+import threading
 import time
 import uuid
-from flask import Flask, request, redirect, url_for, render_template, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, request, redirect, url_for, render_template, jsonify, g, before_render_template, template_rendered
 from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-import mixpanel
 
 # Import our custom modules
-from config import VISIBLE_ATTRS, PLACEHOLDERS, CLUB_PROMPT_FILES, RATE_LIMIT, FLASK_PORT, FLASK_DEBUG, DEBUG_DUMP_SYSTEM_PROMPT
-from services.llm_service import classify_query_is_model_specific, build_url_with_llm
-from services.scraper import scrape_2ndswing
+from config import (
+    VISIBLE_ATTRS, PLACEHOLDERS, RATE_LIMIT, SEARCH_RATE_LIMIT, FLASK_PORT, FLASK_DEBUG,
+    QUERY_CACHE_ENABLED, QUERY_CACHE_TTL_SECS, QUERY_CACHE_MAX_ENTRIES,
+    RESULTS_STORE_TTL_SECS, RESULTS_STORE_MAX_ENTRIES,
+    FETCH_ALL_ENABLED, FETCH_ALL_MAX_PAGES, INVENTORY_ENABLED, INVENTORY_CRAWL_IN_APP,
+    ALTERNATE_SEARCH_ENABLED, ALTERNATE_SEARCH_WORKERS,
+    BATCH_API_TOKEN, BATCH_CONCURRENCY, BATCH_MAX_ITEMS, CLUB_PROMPT_FILES,
+)
+from services.cache import make_cache, make_result_store
+from services.search_pipeline import build_search_url, timing_stats, record_timings, singleflight_stats, semantic_cache_stats
+from services import rule_parser, prompt_registry
+from services.llm_service import llm_stats, detect_club_type_mismatch, CLUB_TYPE_KEYWORDS
+from services.model_index import load_model_indexes
+from services.scraper import scrape_2ndswing, scrape_stats
+from services.http_client import http_stats
+from services import batch, inventory, metrics, prefetch, telemetry
+from services.fetch_all import fetch_all_pages, fetch_all_stats, LOCAL_SORTS
+from services.filter_schema import url_check_stats
+
+try:
+    import orjson  # several times faster than json.dumps on the product lists
+except ImportError:
+    orjson = None
 
 app = Flask(__name__)
 
@@ -34,117 +57,300 @@ def client_key():
 
 limiter = Limiter(client_key, app=app, storage_uri=storage_uri)
 
-# In-memory, cookie-less results cache for PRG that works in iframes (no third-party cookies)
-# Entries are shown once (popped on first GET) and expire after TTL seconds
-RESULTS_CACHE = {}
-RESULT_TTL_SECS = 300
+# Lets the template offer the opt-in "Show all" control without threading it through every render
+app.jinja_env.globals["FETCH_ALL_ENABLED"] = FETCH_ALL_ENABLED
+
+# Per-stage timings: Server-Timing header on every response, histograms on /metrics
+@app.before_request
+def _start_timing():
+    g.t_request = time.perf_counter()
+    metrics.start_request()
+
+@before_render_template.connect_via(app)
+def _render_started(sender, template, context, **extra):
+    g.t_render = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def _render_finished(sender, template, context, **extra):
+    if "t_render" in g:
+        metrics.observe("render", (time.perf_counter() - g.pop("t_render")) * 1000)
+
+@app.after_request
+def _finish_timing(response):
+    total_ms = (time.perf_counter() - g.t_request) * 1000 if "t_request" in g else None
+    response.headers["Server-Timing"] = metrics.server_timing(metrics.end_request(), total_ms)
+    if total_ms is not None:
+        metrics.observe_request(request.url_rule.rule if request.url_rule else "unmatched", response.status_code, total_ms)
+    return response
+
+metrics.register("telemetry_queue_depth", "gauge", "Mixpanel events waiting to be sent.", lambda: telemetry.telemetry_stats()["queue_depth"])
+metrics.register("telemetry_dropped_total", "counter", "Mixpanel events dropped because the queue was full.", lambda: telemetry.telemetry_stats()["dropped"])
+metrics.register("prefetch_inflight", "gauge", "Next-page prefetches in flight.", lambda: prefetch.prefetch_stats()["inflight"])
+metrics.register("llm_coalesced_total", "counter", "Searches that shared an identical in-flight LLM build.", lambda: (singleflight_stats() or {}).get("coalesced", 0))
+metrics.register("scrape_coalesced_total", "counter", "Scrapes that shared an identical in-flight upstream fetch.", lambda: (scrape_stats()["singleflight"] or {}).get("coalesced", 0))
+
+# Read every prompt, the brand list and model lists once; later edits hot-reload by mtime
+prompt_registry.preload()
+
+# Build the model-name indexes once at startup (used by the local classifier)
+load_model_indexes()
+
+# Keep the local inventory snapshot fresh from this process (otherwise crawl from cron)
+if INVENTORY_ENABLED and INVENTORY_CRAWL_IN_APP:
+    inventory.start_crawler()
+
+# Query -> URL cache in front of both LLM calls; shared via Redis when available
+QUERY_CACHE = make_cache("q2u", QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECS, REDIS_URL) if QUERY_CACHE_ENABLED else None
+
+# Cookie-less results store for PRG that works in iframes (no third-party cookies)
+# Entries are shown once (popped on first GET), expire after RESULTS_STORE_TTL_SECS and are
+# capped at RESULTS_STORE_MAX_ENTRIES; shared via Redis so ?rid= works on any worker
+RESULTS_STORE = make_result_store(RESULTS_STORE_MAX_ENTRIES, RESULTS_STORE_TTL_SECS, REDIS_URL)
+metrics.register("results_store_bytes", "gauge", "JSON bytes held by the in-process results store.", lambda: RESULTS_STORE.stats().get("bytes", 0))
 
 def _cache_put(data: dict) -> str:
     rid = uuid.uuid4().hex
-    RESULTS_CACHE[rid] = {"data": data, "ts": time.time()}
+    RESULTS_STORE.put(rid, data)
     return rid
 
 def _cache_pop(rid: str):
-    # Remove expired entries opportunistically
-    now = time.time()
-    expired = [k for k, v in RESULTS_CACHE.items() if now - v.get("ts", 0) > RESULT_TTL_SECS]
-    for k in expired:
-        RESULTS_CACHE.pop(k, None)
     # Pop requested entry (render-once semantics)
-    item = RESULTS_CACHE.pop(rid, None)
-    return item["data"] if item else None
+    return RESULTS_STORE.pop(rid)
+
+# Alternate searches for the club type a query names when another one is selected; they run
+# next to the primary search and only land in the results store (see /api/results/<rid>)
+_alternate_pool = ThreadPoolExecutor(max_workers=ALTERNATE_SEARCH_WORKERS, thread_name_prefix="alternate")
+ALTERNATE_STATS = {"started": 0, "stored": 0, "failed": 0, "shown": 0, "not_ready": 0}
+_alternate_lock = threading.Lock()
+
+def _count_alternate(key: str):
+    with _alternate_lock:
+        ALTERNATE_STATS[key] += 1
+
+def alternate_club_type(user_query: str, club_type: str):
+    """The club type the query names if it isn't the selected one (keyword check, no LLM)."""
+    if not ALTERNATE_SEARCH_ENABLED:
+        return None
+    potential_clubtype_mismatch, intended_club_type = detect_club_type_mismatch(user_query, club_type)
+    if not potential_clubtype_mismatch:
+        return None
+    # A query that names the selected type too ("forgiving driver for 90 mph swing" hits a
+    # wedge loft keyword) rarely means the wrong type was picked; don't pay for a second search
+    query_lc = user_query.lower()
+    if any(kw in query_lc for kw in CLUB_TYPE_KEYWORDS.get(club_type, [])):
+        return None
+    return intended_club_type
+
+def store_alternate(rid: str, user_query: str, club_type: str, search: dict, page):
+    """Keep an alternate search's results under rid (no telemetry: nobody has seen them yet)."""
+    products, total_count, applied_filters, next_page_url, no_results = page
+    RESULTS_STORE.put(rid, {
+        "user_query": user_query,
+        "generated_url": search["generated_url"],
+        "products": products,
+        "club_type": club_type,
+        "total_count": total_count,
+        "applied_filters": applied_filters,
+        "next_page_url": next_page_url,
+        "no_results": no_results,
+        "potential_clubtype_mismatch": False,
+        "intended_club_type": None,
+    })
+    _count_alternate("stored")
+    print(f"[ALTERNATE] stored {club_type} results for '{user_query}' ({len(products)} products)")
+
+def _run_alternate(rid: str, user_query: str, club_type: str):
+    try:
+        search = build_search_url(user_query, club_type, cache=QUERY_CACHE)
+        store_alternate(rid, user_query, club_type, search, scrape_2ndswing(search["generated_url"]))
+    except Exception as e:
+        print("[ALTERNATE] search error:", e)
+        _count_alternate("failed")
+
+def start_alternate_search(user_query: str, club_type: str):
+    """Search the club type the query names in the background; returns its results id, or None."""
+    intended_club_type = alternate_club_type(user_query, club_type)
+    if intended_club_type is None:
+        return None
+    rid = uuid.uuid4().hex
+    _count_alternate("started")
+    _alternate_pool.submit(_run_alternate, rid, user_query, intended_club_type)
+    return rid
+
+def track_page_view():
+    telemetry.track(get_remote_address(), 'Page View', {
+        'page': 'home',
+        'method': request.method,
+        'user_agent': request.headers.get('User-Agent', ''),
+        'referrer': request.headers.get('Referer', '')
+    })
+
+# The helpers below finish a request once the URL is built and the page scraped; the
+# async app (asgi.py) does those two steps with awaits and then calls the same helpers.
+
+def json_response(data, status: int = 200):
+    """jsonify, but serialized with orjson when it is installed."""
+    body = orjson.dumps(data) if orjson is not None else json.dumps(data)
+    return app.response_class(body, status=status, mimetype="application/json")
+
+def search_results_context(user_query: str, club_type: str, search: dict, page, scrape_ms: float,
+                           alternate_rid: str = None) -> dict:
+    """Results of a search (search = build_search_url result, page = scrape result) as template variables.
+
+    alternate_rid is the results id of the background search for the intended club type, if any.
+    """
+    classification = search["classification"]
+    potential_clubtype_mismatch = classification["potential_clubtype_mismatch"]
+    intended_club_type = classification["intended_club_type"]
+    generated_url = search["generated_url"]
+    products, total_count, applied_filters, next_page_url, no_results = page
+
+    timings = dict(search["timings"], scrape_ms=scrape_ms)
+    record_timings("scrape", {"scrape_ms": scrape_ms})
+    prefetch.schedule(next_page_url)
+    print(f"[TIMING] {search['source']}: " + ", ".join(f"{k} {v:.0f}" for k, v in timings.items()))
+
+    # Track search with Mixpanel - exactly the 5 things requested (queued, sent in the background)
+    telemetry.track(get_remote_address(), 'Search Performed', {
+        'club_type': club_type,                    # a) club type
+        'user_query': user_query,                  # b) user's search query  
+        'generated_url': generated_url,            # c) URL that's generated
+        'applied_filters': applied_filters,        # d) filters used in search
+        'product_count': total_count or 0          # e) number of products found
+    })
+
+    return {
+        "user_query": user_query,
+        "generated_url": generated_url,
+        "products": products,
+        "club_type": club_type,
+        "total_count": total_count,
+        "applied_filters": applied_filters,
+        "next_page_url": next_page_url,
+        "no_results": no_results,
+        "potential_clubtype_mismatch": potential_clubtype_mismatch,
+        "intended_club_type": intended_club_type,
+        "alternate_rid": alternate_rid if potential_clubtype_mismatch else None,
+    }
+
+def search_results_page(user_query: str, club_type: str, search: dict, page, scrape_ms: float,
+                        alternate_rid: str = None):
+    """Render the full page for a POST / search (no-JS fallback; the page itself uses /api/search)."""
+    # Directly render results on POST to ensure reliability in iframes and multi-instance deployments
+    return render_template(
+        "index.html",
+        **search_results_context(user_query, club_type, search, page, scrape_ms, alternate_rid),
+        VISIBLE_ATTRS=VISIBLE_ATTRS,
+        placeholders_json=json.dumps(PLACEHOLDERS),
+        mixpanel_token=os.environ.get("MIXPANEL_TOKEN")
+    )
+
+def url_results_context(user_query: str, club_type: str, url: str, page) -> dict:
+    """Results of a pre-built URL search (filter removal) as template variables."""
+    products, total_count, applied_filters, next_page_url, no_results = page
+    prefetch.schedule(next_page_url)
+
+    # Track search with Mixpanel (queued, sent in the background)
+    telemetry.track(get_remote_address(), 'Search Performed', {
+        'club_type': club_type,
+        'user_query': user_query + " (filter removed)",
+        'generated_url': url,
+        'applied_filters': applied_filters,
+        'product_count': total_count or 0
+    })
+
+    return {
+        "user_query": user_query,
+        "generated_url": url,
+        "products": products,
+        "club_type": club_type,
+        "total_count": total_count,
+        "applied_filters": applied_filters,
+        "next_page_url": next_page_url,
+        "no_results": no_results,
+        "potential_clubtype_mismatch": False,
+        "intended_club_type": None,
+    }
+
+def url_results_page(user_query: str, club_type: str, url: str, page):
+    """Render the full page for /search_with_url (filter removal)."""
+    # Render the template with new results
+    return render_template(
+        "index.html",
+        **url_results_context(user_query, club_type, url, page),
+        VISIBLE_ATTRS=VISIBLE_ATTRS,
+        placeholders_json=json.dumps(PLACEHOLDERS)
+    )
+
+def results_response(context: dict, fmt: str):
+    """/api/* response: the results as JSON, or (format=html) just the _results.html fragment."""
+    if fmt == "html":
+        return render_template("_results.html", VISIBLE_ATTRS=VISIBLE_ATTRS, **context)
+    return json_response(context)
+
+def api_search_params():
+    """(user_query, club_type) from a form post or a JSON body."""
+    data = request.get_json(silent=True) or request.form
+    return data.get("user_query", ""), data.get("club_type", "Driver")
+
+# The empty search page is the same for every visitor: render it once per process and let
+# browsers revalidate it with an ETag (the page view is still tracked on each request)
+_page_shell = {}
+
+def page_shell():
+    if "html" not in _page_shell or app.debug:
+        html = render_template(
+            "index.html",
+            user_query="",
+            generated_url="",
+            products=[],
+            club_type="Driver",
+            total_count=None,
+            applied_filters=[],
+            next_page_url=None,
+            no_results=False,
+            VISIBLE_ATTRS=VISIBLE_ATTRS,
+            placeholders_json=json.dumps(PLACEHOLDERS),
+            mixpanel_token=os.environ.get("MIXPANEL_TOKEN")
+        )
+        _page_shell.update(html=html, etag=hashlib.sha1(html.encode()).hexdigest())
+    response = app.make_response(_page_shell["html"])
+    response.set_etag(_page_shell["etag"])
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def load_more_response(club_type: str, page):
+    """JSON for /load_more from the next page's scrape result."""
+    products, _, _, next_page_url, _ = page
+    prefetch.schedule(next_page_url)
+
+    print(f"Load more response - Products: {len(products)}, Next URL: {next_page_url}")
+
+    return json_response({
+        "products": products,
+        "next_page_url": next_page_url,
+        "club_type": club_type
+    })
 
 @app.route("/", methods=["GET", "POST"])  # Short window guard (easy to verify)
-@limiter.limit("100 per hour", methods=["POST"])    # Hourly guard
+@limiter.limit(SEARCH_RATE_LIMIT, methods=["POST"])    # Hourly guard
 def index():
     # Track page view for all requests
-    if os.environ.get("MIXPANEL_TOKEN"):
-        mp = mixpanel.Mixpanel(os.environ.get("MIXPANEL_TOKEN"))
-        mp.track(get_remote_address(), 'Page View', {
-            'page': 'home',
-            'method': request.method,
-            'user_agent': request.headers.get('User-Agent', ''),
-            'referrer': request.headers.get('Referer', '')
-        })
-
-    # Initialize default values
-    user_query = ""
-    generated_url = ""
-    products = []
-    club_type = "Driver"
-    total_count = None
-    applied_filters = []
-    next_page_url = None
-    no_results = False
+    track_page_view()
 
     if request.method == "POST":
         user_query = request.form.get("user_query", "")
         club_type = request.form.get("club_type", "Driver")
+        alternate_rid = start_alternate_search(user_query, club_type)
 
-        # Check if query is model-specific and detect club type mismatch
-        classification = classify_query_is_model_specific(user_query, club_type)
-        is_model_specific = classification["is_model_specific"]
-        potential_clubtype_mismatch = classification["potential_clubtype_mismatch"]
-        intended_club_type = classification["intended_club_type"]
-
-        # Load system prompt for the club type from prompts_v2
-        prompt_path = os.path.join("textdocs", "prompts_v2", CLUB_PROMPT_FILES.get(club_type, "driver.txt"))
-        try:
-            with open(prompt_path, "r") as f:
-                system_prompt = f.read()
-        except Exception:
-            system_prompt = "Build a URL for the chosen club type."
-
-        # Prepend classifier result to system prompt
-        prefix = (
-            f"CLASSIFICATION: {'MODEL_SPECIFIC' if is_model_specific else 'GENERIC'}\n"
-            f"CLUB_TYPE: {club_type}\n"
-        )
-        system_prompt = prefix + system_prompt
-
-        # Debug: dump system prompt to CLI if enabled
-        if DEBUG_DUMP_SYSTEM_PROMPT:
-            print("\n" + "="*80)
-            print("SYSTEM PROMPT DEBUG DUMP")
-            print("="*80)
-            print(f"Club Type: {club_type}")
-            print(f"User Query: {user_query}")
-            print("-"*80)
-            print(system_prompt)
-            print("="*80 + "\n")
-
-        # Generate URL and scrape data (no model extraction needed - using q= parameter)
-        generated_url = build_url_with_llm(user_query, system_prompt, "")
-        products, total_count, applied_filters, next_page_url, no_results = scrape_2ndswing(generated_url)
-
-        # Track search with Mixpanel - exactly the 5 things requested
-        if os.environ.get("MIXPANEL_TOKEN"):
-            mp = mixpanel.Mixpanel(os.environ.get("MIXPANEL_TOKEN"))
-            mp.track(get_remote_address(), 'Search Performed', {
-                'club_type': club_type,                    # a) club type
-                'user_query': user_query,                  # b) user's search query  
-                'generated_url': generated_url,            # c) URL that's generated
-                'applied_filters': applied_filters,        # d) filters used in search
-                'product_count': total_count or 0          # e) number of products found
-            })
-
-        # Directly render results on POST to ensure reliability in iframes and multi-instance deployments
-        return render_template(
-            "index.html",
-            user_query=user_query,
-            generated_url=generated_url,
-            products=products,
-            club_type=club_type,
-            total_count=total_count,
-            applied_filters=applied_filters,
-            next_page_url=next_page_url,
-            no_results=no_results,
-            potential_clubtype_mismatch=potential_clubtype_mismatch,
-            intended_club_type=intended_club_type,
-            VISIBLE_ATTRS=VISIBLE_ATTRS,
-            placeholders_json=json.dumps(PLACEHOLDERS),
-            mixpanel_token=os.environ.get("MIXPANEL_TOKEN")
-        )
+        # Classify + build URL (rule-based fast path, then query cache, then LLM)
+        search = build_search_url(user_query, club_type, cache=QUERY_CACHE)
+
+        # Scrape data
+        t_scrape = time.perf_counter()
+        page = scrape_2ndswing(search["generated_url"])
+        return search_results_page(user_query, club_type, search, page, (time.perf_counter() - t_scrape) * 1000, alternate_rid)
 
     # For GET requests, if we have a result id from previous POST, render once then clear
     rid = request.args.get('rid')
@@ -167,21 +373,8 @@ def index():
             placeholders_json=json.dumps(PLACEHOLDERS)
         )
 
-    # Default empty page render
-    return render_template(
-        "index.html",
-        user_query=user_query,
-        generated_url=generated_url,
-        products=products,
-        club_type=club_type,
-        total_count=total_count,
-        applied_filters=applied_filters,
-        next_page_url=next_page_url,
-        no_results=no_results,
-        VISIBLE_ATTRS=VISIBLE_ATTRS,
-        placeholders_json=json.dumps(PLACEHOLDERS),
-        mixpanel_token=os.environ.get("MIXPANEL_TOKEN")
-    )
+    # Default empty page: the cached shell; searches then load /api/search fragments into it
+    return page_shell()
 
 
 @app.route("/search_with_url", methods=["POST"])
@@ -200,39 +393,67 @@ def search_with_url():
         print(f"Search with URL request - URL: {url}, Club type: {club_type}")
         
         # Scrape the modified URL
-        products, total_count, applied_filters, next_page_url, no_results = scrape_2ndswing(url)
-        
-        # Track search with Mixpanel
-        if os.environ.get("MIXPANEL_TOKEN"):
-            mp = mixpanel.Mixpanel(os.environ.get("MIXPANEL_TOKEN"))
-            mp.track(get_remote_address(), 'Search Performed', {
-                'club_type': club_type,
-                'user_query': user_query + " (filter removed)",
-                'generated_url': url,
-                'applied_filters': applied_filters,
-                'product_count': total_count or 0
-            })
-        
-        # Render the template with new results
-        return render_template(
-            "index.html",
-            user_query=user_query,
-            generated_url=url,
-            products=products,
-            club_type=club_type,
-            total_count=total_count,
-            applied_filters=applied_filters,
-            next_page_url=next_page_url,
-            no_results=no_results,
-            VISIBLE_ATTRS=VISIBLE_ATTRS,
-            placeholders_json=json.dumps(PLACEHOLDERS)
-        )
+        return url_results_page(user_query, club_type, url, scrape_2ndswing(url))
         
     except Exception as e:
         print("Search with URL error:", e)
         return jsonify({"error": "Failed to search with URL"}), 500
 
 
+@app.route("/api/search", methods=["POST"])
+@limiter.limit(SEARCH_RATE_LIMIT)
+def api_search():
+    """Search without re-rendering the page: JSON results, or ?format=html for the results fragment."""
+    track_page_view()
+    user_query, club_type = api_search_params()
+    alternate_rid = start_alternate_search(user_query, club_type)
+    search = build_search_url(user_query, club_type, cache=QUERY_CACHE)
+    t_scrape = time.perf_counter()
+    page = scrape_2ndswing(search["generated_url"])
+    context = search_results_context(user_query, club_type, search, page, (time.perf_counter() - t_scrape) * 1000, alternate_rid)
+    return results_response(context, request.args.get("format", "json"))
+
+
+@app.route("/api/results/<rid>", methods=["GET"])
+@limiter.limit(RATE_LIMIT)
+def api_results(rid):
+    """Stored results of an alternate search (shown once): JSON, or ?format=html for the fragment."""
+    stored = _cache_pop(rid)
+    if not stored:
+        # Still running, failed or already shown; the page then searches again itself
+        _count_alternate("not_ready")
+        return jsonify({"error": "Results not ready"}), 404
+    _count_alternate("shown")
+    prefetch.schedule(stored.get("next_page_url"))
+    telemetry.track(get_remote_address(), 'Search Performed', {
+        'club_type': stored["club_type"],
+        'user_query': stored["user_query"],
+        'generated_url': stored["generated_url"],
+        'applied_filters': stored["applied_filters"],
+        'product_count': stored["total_count"] or 0
+    })
+    return results_response(stored, request.args.get("format", "json"))
+
+
+@app.route("/api/search_with_url", methods=["POST"])
+@limiter.limit(RATE_LIMIT)
+def api_search_with_url():
+    """/search_with_url returning JSON, or ?format=html for the results fragment."""
+    try:
+        data = request.get_json()
+        url = data.get("url")
+        club_type = data.get("club_type", "Driver")
+        user_query = data.get("user_query", "")
+        if not url:
+            return jsonify({"error": "No URL provided"}), 400
+        print(f"Search with URL request - URL: {url}, Club type: {club_type}")
+        context = url_results_context(user_query, club_type, url, scrape_2ndswing(url))
+        return results_response(context, request.args.get("format", "json"))
+    except Exception as e:
+        print("Search with URL error:", e)
+        return jsonify({"error": "Failed to search with URL"}), 500
+
+
 @app.route("/load_more", methods=["POST"])
 @limiter.limit(RATE_LIMIT)
 def load_more():
@@ -252,19 +473,113 @@ def load_more():
         decoded_url = html.unescape(next_url)
         print(f"Decoded URL for scraping: {decoded_url}")
             
-        products, _, _, next_page_url, _ = scrape_2ndswing(decoded_url)
-        
-        print(f"Load more response - Products: {len(products)}, Next URL: {next_page_url}")
-        
-        return jsonify({
-            "products": products,
-            "next_page_url": next_page_url,
-            "club_type": club_type
-        })
+        # Usually already fetched in the background right after the previous page
+        return load_more_response(club_type, prefetch.take(decoded_url) or scrape_2ndswing(decoded_url))
         
     except Exception as e:
         print("Load more error:", e)
         return jsonify({"error": "Failed to load more products"}), 500
 
+@app.route("/load_all", methods=["POST"])
+@limiter.limit(RATE_LIMIT)
+def load_all():
+    """Opt-in: fetch every page of a search at once, merged and optionally sorted/filtered locally."""
+    if not FETCH_ALL_ENABLED:
+        return jsonify({"error": "Fetch all is disabled"}), 404
+    try:
+        url = request.json.get("url")
+        club_type = request.json.get("club_type", "Driver")
+        sort = request.json.get("sort")
+        attr_filters = request.json.get("attrs") or {}
+
+        if not url:
+            return jsonify({"error": "No URL provided"}), 400
+        if sort and sort not in LOCAL_SORTS:
+            return jsonify({"error": f"sort must be one of {', '.join(LOCAL_SORTS)}"}), 400
+        if not isinstance(attr_filters, dict):
+            return jsonify({"error": "attrs must be an object"}), 400
+
+        import html
+        decoded_url = html.unescape(url)
+        print(f"Load all request - URL: {decoded_url}, Club type: {club_type}, sort: {sort}, attrs: {attr_filters}")
+
+        result = fetch_all_pages(decoded_url, FETCH_ALL_MAX_PAGES, sort, attr_filters)
+        if 1 in result["failed_pages"]:  # page 1 failed: keep the page the client already shows
+            return jsonify({"error": "Failed to load all products"}), 502
+        result["club_type"] = club_type
+        result["next_page_url"] = None
+        return json_response(result)
+
+    except Exception as e:
+        print("Load all error:", e)
+        return jsonify({"error": "Failed to load all products"}), 500
+
+@app.route("/api/batch", methods=["POST"])
+@limiter.exempt
+def api_batch():
+    """Run a batch of searches (services/batch.py), streamed back as JSONL in completion order.
+
+    Body: {"items": [{"user_query", "club_type"}, ...]} or {"placeholders": true} (optionally
+    with "club_types"), plus optional "concurrency" and "scrape" (default true). Needs
+    "Authorization: Bearer <BATCH_API_TOKEN>"; without a configured token the route is off.
+    Holds one request thread for the whole batch.
+    """
+    if not BATCH_API_TOKEN:
+        return jsonify({"error": "Batch search is disabled"}), 404
+    auth = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(auth.encode("utf-8"), f"Bearer {BATCH_API_TOKEN}".encode("utf-8")):
+        return jsonify({"error": "Unauthorized"}), 401
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get("placeholders"):
+            club_types = data.get("club_types")
+            if club_types is not None and not (isinstance(club_types, list) and set(club_types) <= set(CLUB_PROMPT_FILES)):
+                raise ValueError("club_types must be a list of club types")
+            items = batch.placeholder_items(club_types)
+        else:
+            items = batch.parse_items(data.get("items") or [])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not items:
+        return jsonify({"error": "No items provided"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400
+    try:
+        concurrency = int(data.get("concurrency", BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency must be an integer"}), 400
+    print(f"[BATCH] {len(items)} items, concurrency {concurrency}")
+
+    results = batch.run_batch(items, concurrency, cache=QUERY_CACHE, scrape=data.get("scrape", True) is not False)
+    return Response((batch.to_jsonl(result) for result in results), mimetype="application/x-ndjson")
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Cache hit/miss, fast-path and LLM call counters for this process."""
+    return jsonify({
+        "query_cache": QUERY_CACHE.stats() if QUERY_CACHE is not None else None,
+        "semantic_cache": semantic_cache_stats(),
+        "results_store": RESULTS_STORE.stats(),
+        "rule_fast_path": rule_parser.stats(),
+        "llm": llm_stats(),
+        "timings": timing_stats(),
+        "singleflight": singleflight_stats(),
+        "scrape": scrape_stats(),
+        "url_check": url_check_stats(),
+        "http": http_stats(),
+        "prefetch": prefetch.prefetch_stats(),
+        "fetch_all": fetch_all_stats(),
+        "alternate_search": dict(ALTERNATE_STATS),
+        "batch": batch.batch_stats(),
+        "inventory": inventory.inventory_stats() if INVENTORY_ENABLED else None,
+        "telemetry": telemetry.telemetry_stats(),
+        "prompts": prompt_registry.stats(),
+    })
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Stage/request latency histograms and token counters in the Prometheus text format."""
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
 if __name__ == "__main__":
     app.run(debug=FLASK_DEBUG, port=FLASK_PORT)
@@ -0,0 +1,259 @@
+"""ASGI entry point: the search routes run as coroutines, everything else is the Flask app.
+
+Under gunicorn's sync workers every search holds a worker for the whole
+classify -> build URL -> fetch round-trip. Here POST /, /search_with_url,
+/api/search, /api/search_with_url and /load_more await the async OpenAI
+client and httpx.AsyncClient instead, and HTML parsing runs on a small thread
+pool, so one process keeps hundreds of searches in flight. The handlers run inside a normal Flask request context
+(before/after_request hooks, templates, Server-Timing) and reuse the response
+helpers in app.py; all other routes go through WsgiToAsgi.
+
+Flask-Limiter only enforces per-route limits inside the decorated Flask view,
+which these handlers replace, so each one is wrapped with rate_limited() and
+checks the same limit as its Flask route (same endpoint, same counters).
+
+Run:
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker -w 2
+"""
+import asyncio
+import html
+import io
+import sys
+import time
+import uuid
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import request, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import (
+    app, limiter, QUERY_CACHE, track_page_view, search_results_page, url_results_page, load_more_response,
+    search_results_context, url_results_context, results_response, api_search_params,
+    alternate_club_type, store_alternate, _count_alternate,
+)
+from config import RATE_LIMIT, SEARCH_RATE_LIMIT
+from services import prefetch, telemetry
+from services.search_pipeline import build_search_url_async
+from services.scraper import scrape_2ndswing_async
+
+_wsgi = WsgiToAsgi(app)
+# Same proxy handling as app.wsgi_app; returns the rewritten environ instead of calling Flask
+_proxy_fix = ProxyFix(lambda environ, start_response: environ, x_for=1, x_proto=1)
+
+
+def rate_limited(limit_value: str):
+    """Apply a Flask-Limiter limit to an async handler.
+
+    limiter.limit() can't wrap a coroutine (it would run it through ensure_sync), so it
+    decorates a no-op named after the handler instead, called before the handler is awaited.
+    A breach raises RateLimitExceeded, which the request context turns into a 429.
+    """
+    def decorate(handler):
+        def check():
+            pass
+        check.__name__ = f"{handler.__name__}_rate_limit"
+        check.__qualname__ = check.__name__
+        check = limiter.limit(limit_value)(check)
+
+        async def run():
+            check()
+            return await handler()
+        return run
+    return decorate
+
+
+_alternate_tasks = set()  # strong refs so running alternate searches aren't garbage-collected
+
+
+async def _run_alternate(rid: str, user_query: str, club_type: str):
+    try:
+        search = await build_search_url_async(user_query, club_type, cache=QUERY_CACHE)
+        page = await scrape_2ndswing_async(search["generated_url"])
+        await asyncio.to_thread(store_alternate, rid, user_query, club_type, search, page)
+    except Exception as e:
+        print("[ALTERNATE] search error:", e)
+        _count_alternate("failed")
+
+
+def start_alternate_search():
+    """app.start_alternate_search on the event loop: the alternate search is a task next to this one."""
+    user_query, club_type = api_search_params()
+    intended_club_type = alternate_club_type(user_query, club_type)
+    if intended_club_type is None:
+        return None
+    rid = uuid.uuid4().hex
+    _count_alternate("started")
+    task = asyncio.create_task(_run_alternate(rid, user_query, intended_club_type))
+    _alternate_tasks.add(task)
+    task.add_done_callback(_alternate_tasks.discard)
+    return rid
+
+
+@rate_limited(SEARCH_RATE_LIMIT)
+async def index_post():
+    track_page_view()
+    user_query = request.form.get("user_query", "")
+    club_type = request.form.get("club_type", "Driver")
+    alternate_rid = start_alternate_search()
+
+    search = await build_search_url_async(user_query, club_type, cache=QUERY_CACHE)
+    t_scrape = time.perf_counter()
+    page = await scrape_2ndswing_async(search["generated_url"])
+    return search_results_page(user_query, club_type, search, page, (time.perf_counter() - t_scrape) * 1000, alternate_rid)
+
+
+@rate_limited(RATE_LIMIT)
+async def search_with_url():
+    try:
+        data = request.get_json()
+        url = data.get("url")
+        club_type = data.get("club_type", "Driver")
+        user_query = data.get("user_query", "")
+        if not url:
+            return jsonify({"error": "No URL provided"}), 400
+        print(f"Search with URL request - URL: {url}, Club type: {club_type}")
+        return url_results_page(user_query, club_type, url, await scrape_2ndswing_async(url))
+    except Exception as e:
+        print("Search with URL error:", e)
+        return jsonify({"error": "Failed to search with URL"}), 500
+
+
+@rate_limited(SEARCH_RATE_LIMIT)
+async def api_search():
+    track_page_view()
+    user_query, club_type = api_search_params()
+    alternate_rid = start_alternate_search()
+    search = await build_search_url_async(user_query, club_type, cache=QUERY_CACHE)
+    t_scrape = time.perf_counter()
+    page = await scrape_2ndswing_async(search["generated_url"])
+    context = search_results_context(user_query, club_type, search, page, (time.perf_counter() - t_scrape) * 1000, alternate_rid)
+    return results_response(context, request.args.get("format", "json"))
+
+
+@rate_limited(RATE_LIMIT)
+async def api_search_with_url():
+    try:
+        data = request.get_json()
+        url = data.get("url")
+        club_type = data.get("club_type", "Driver")
+        user_query = data.get("user_query", "")
+        if not url:
+            return jsonify({"error": "No URL provided"}), 400
+        print(f"Search with URL request - URL: {url}, Club type: {club_type}")
+        context = url_results_context(user_query, club_type, url, await scrape_2ndswing_async(url))
+        return results_response(context, request.args.get("format", "json"))
+    except Exception as e:
+        print("Search with URL error:", e)
+        return jsonify({"error": "Failed to search with URL"}), 500
+
+
+@rate_limited(RATE_LIMIT)
+async def load_more():
+    try:
+        next_url = request.json.get("next_url")
+        club_type = request.json.get("club_type", "Driver")
+        print(f"Load more request - URL: {next_url}, Club type: {club_type}")
+        if not next_url:
+            print("Error: No next URL provided")
+            return jsonify({"error": "No next URL provided"}), 400
+        decoded_url = html.unescape(next_url)
+        # prefetch.take may wait on an in-flight background fetch; don't block the loop on it
+        page = await asyncio.to_thread(prefetch.take, decoded_url) or await scrape_2ndswing_async(decoded_url)
+        return load_more_response(club_type, page)
+    except Exception as e:
+        print("Load more error:", e)
+        return jsonify({"error": "Failed to load more products"}), 500
+
+
+ASYNC_ROUTES = {
+    ("POST", "/"): index_post,
+    ("POST", "/search_with_url"): search_with_url,
+    ("POST", "/api/search"): api_search,
+    ("POST", "/api/search_with_url"): api_search_with_url,
+    ("POST", "/load_more"): load_more,
+}
+
+
+def _build_environ(scope, body: bytes) -> dict:
+    """WSGI environ for an ASGI http scope (PEP 3333 keys Flask and ProxyFix rely on)."""
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        value = raw_value.decode("latin1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _run_in_flask_context(handler, scope, receive, send):
+    body = await _read_body(receive)
+    environ = _proxy_fix(_build_environ(scope, body), None)
+    ctx = app.request_context(environ)
+    ctx.push()
+    try:
+        try:
+            rv = app.preprocess_request()  # before_request hooks (route limits: see rate_limited)
+            if rv is None:
+                rv = await handler()
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        response = app.process_response(app.make_response(rv))
+    except Exception as e:
+        response = app.make_response(app.handle_exception(e))
+    finally:
+        ctx.pop()
+
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in response.headers.items()],
+    })
+    await send({"type": "http.response.body", "body": response.get_data()})
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                telemetry.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    handler = ASYNC_ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if handler is None:
+        await _wsgi(scope, receive, send)
+    else:
+        await _run_in_flask_context(handler, scope, receive, send)
@@ -0,0 +1,107 @@
+"""Compare the local model-index classifier against the LLM classifier.
+
+Runs every labelled query in benchmarks/classification_queries.jsonl through
+services.model_index.classify_locally and (with --llm, needs OPENAI_API_KEY)
+through classify_query_is_model_specific, then reports accuracy and latency.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_classifier
+    python -m benchmarks.bench_classifier --llm
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from services.model_index import classify_locally, load_model_indexes
+from services.llm_service import classify_query_is_model_specific
+
+QUERY_SET = os.path.join("benchmarks", "classification_queries.jsonl")
+
+
+def load_queries(path: str = QUERY_SET) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(name: str, correct: int, total: int, latencies_ms: list, extra: str = ""):
+    acc = correct / total if total else 0.0
+    print(
+        f"{name:22} accuracy {correct:3}/{total:<3} ({acc:6.1%})  "
+        f"p50 {percentile(latencies_ms, 50):9.3f} ms  p95 {percentile(latencies_ms, 95):9.3f} ms  "
+        f"mean {statistics.mean(latencies_ms):9.3f} ms  {extra}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="also run the gpt-4.1 classifier (costs API calls)")
+    parser.add_argument("--verbose", action="store_true", help="print every misclassified or ambiguous query")
+    args = parser.parse_args()
+
+    rows = load_queries()
+    t0 = time.perf_counter()
+    load_model_indexes()
+    print(f"Index build: {(time.perf_counter() - t0) * 1e3:.1f} ms for {len(rows)} labelled queries\n")
+
+    local_lat, decided, decided_correct, ambiguous = [], 0, 0, []
+    local_results = []
+    for row in rows:
+        t = time.perf_counter()
+        result = classify_locally(row["query"], row["club_type"])
+        local_lat.append((time.perf_counter() - t) * 1e3)
+        local_results.append(result)
+        if result["is_model_specific"] is None:
+            ambiguous.append(row)
+            continue
+        decided += 1
+        ok = int(result["is_model_specific"]) == row["model_specific"]
+        decided_correct += ok
+        if args.verbose and not ok:
+            print(f"  WRONG  {row['query']!r} ({row['club_type']}) -> {result}")
+    if args.verbose:
+        for row in ambiguous:
+            print(f"  AMBIG  {row['query']!r} ({row['club_type']})")
+
+    summarize("local (decided only)", decided_correct, decided, local_lat,
+              f"ambiguous -> LLM: {len(ambiguous)}/{len(rows)}")
+
+    if not args.llm:
+        print("\nRun with --llm to compare against the LLM classifier.")
+        return
+
+    llm_lat, llm_correct, hybrid_correct, hybrid_lat = [], 0, 0, []
+    for row, local in zip(rows, local_results):
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = classify_query_is_model_specific(row["query"], row["club_type"])
+        elapsed = (time.perf_counter() - t) * 1e3
+        llm_lat.append(elapsed)
+        llm_ok = int(result["is_model_specific"]) == row["model_specific"]
+        llm_correct += llm_ok
+        # Production behaviour: local answer when decided, LLM only when ambiguous
+        if local["is_model_specific"] is None:
+            hybrid_correct += llm_ok
+            hybrid_lat.append(elapsed)
+        else:
+            hybrid_correct += int(local["is_model_specific"]) == row["model_specific"]
+            hybrid_lat.append(0.0)
+    summarize("llm", llm_correct, len(rows), llm_lat)
+    summarize("local + llm fallback", hybrid_correct, len(rows), [a + b for a, b in zip(local_lat, hybrid_lat)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""End-to-end benchmark of the search flows, offline, against a stored baseline.
+
+Starts the stand-ins in benchmarks/standins.py (saved 2nd Swing pages and a
+fake OpenAI server with canned answers), points the app at them through
+SCRAPE_ORIGIN and OPENAI_BASE_URL, and drives the real Flask routes through
+the test client for every club type in CLUB_PROMPT_FILES:
+
+    index_rules   POST /  simple query (rule-based fast path)
+    index_llm     POST /  descriptive query (classify + filter extraction)
+    index_model   POST /  model-name query (model mapping + site search)
+    with_url      POST /search_with_url
+    load_more     POST /load_more (page 2)
+
+The query and semantic caches, scrape cache, prefetch, single-flight, rate limits and
+telemetry are off, so every request does the whole classify -> build URL ->
+fetch -> parse -> render path. Per flow it reports p50/p95 latency, per-stage
+p50 from the Server-Timing header, peak traced allocation (tracemalloc, in a
+separate pass) and the generated URL / tile count; overall it reports
+sequential and threaded throughput.
+
+The results are compared against benchmarks/baselines/e2e.json. A flow
+regresses when its p50 or peak allocation grows by more than --tolerance, and
+also when its output changes (a different URL, tile count or path means
+scraping or prompt handling changed). Timings depend on the machine:
+refresh the baseline with --update-baseline on the machine that checks it.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_e2e [--repeat 5] [--threads 8] [--llm-latency-ms 0]
+    python -m benchmarks.bench_e2e --check            # exit 1 on regressions
+    python -m benchmarks.bench_e2e --update-baseline
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.standins import FixtureSite, FakeOpenAI
+
+BASELINE = os.path.join("benchmarks", "baselines", "e2e.json")
+
+# Listing path and query phrasing per club type
+CLUB_FLOWS = {
+    "Driver": ("drivers", "driver", "ping g430 max driver"),
+    "Fairway Woods": ("fairway-woods", "fairway wood", "titleist tsr2 fairway wood"),
+    "Hybrids": ("hybrids", "hybrid", "callaway apex 21 hybrid"),
+    "Iron Sets": ("iron-sets", "irons", "mizuno jpx923 hot metal irons"),
+    "Wedges": ("wedges", "wedge", "cleveland rtx6 wedge"),
+    "Putters": ("putters", "putter", "odyssey 2ball putter"),
+    "Single Irons": ("single-iron", "single iron", "titleist t200 single iron"),
+    "Utility Irons": ("utility-iron", "utility iron", "srixon zx utility iron"),
+}
+
+_TILE_RE = re.compile(r'class="tile"')
+_VIEW_URL_RE = re.compile(r'class="view-button" href="([^"]+)"')
+_STAGE_RE = re.compile(r'([\w-]+);dur=([\d.]+)')
+
+
+def build_flows() -> list:
+    """(name, path, request kwargs) for every club type and flow."""
+    flows = []
+    for club_type, (slug, noun, model_query) in CLUB_FLOWS.items():
+        listing = f"https://www.2ndswing.com/golf-clubs/{slug}"
+        form = lambda q: {"data": {"user_query": q, "club_type": club_type}}
+        flows += [
+            (f"{club_type}/index_rules", "/", form(f"ping left handed {noun}")),
+            (f"{club_type}/index_llm", "/", form(f"forgiving {noun} for a slow swing under $300")),
+            (f"{club_type}/index_model", "/", form(model_query)),
+            (f"{club_type}/with_url", "/search_with_url",
+             {"json": {"url": f"{listing}?g2_brand%5B0%5D=Ping", "club_type": club_type, "user_query": f"ping {noun}"}}),
+            (f"{club_type}/load_more", "/load_more", {"json": {"next_url": f"{listing}?p=2", "club_type": club_type}}),
+        ]
+    return flows
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def start_app(site: FixtureSite, openai: FakeOpenAI):
+    """Import the app configured for the stand-ins (imports must happen after this)."""
+    os.environ["SCRAPE_ORIGIN"] = site.base_url
+    os.environ["OPENAI_BASE_URL"] = openai.api_base
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["MIXPANEL_TOKEN"] = ""  # telemetry off (an empty value also wins over .env)
+    import config
+    config.QUERY_CACHE_ENABLED = False
+    config.SEMANTIC_CACHE_ENABLED = False
+    config.SCRAPE_CACHE_ENABLED = False
+    config.PREFETCH_ENABLED = False
+    config.SINGLEFLIGHT_ENABLED = False
+    config.SCRAPE_RATE_PER_SEC = 0
+    config.OPENAI_MAX_RETRIES = 0
+    import app as app_module
+    app_module.limiter.enabled = False
+    return app_module.app
+
+
+def call(client, path: str, kwargs: dict):
+    """One request; returns (ms, response)."""
+    t = time.perf_counter()
+    resp = client.post(path, **kwargs)
+    ms = (time.perf_counter() - t) * 1000
+    if resp.status_code != 200:
+        raise RuntimeError(f"{path} returned {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+    return ms, resp
+
+
+def describe(resp) -> dict:
+    """What a flow produced: tile count, generated URL and which path built it."""
+    if resp.is_json:
+        data = resp.get_json()
+        return {"tiles": len(data.get("products") or []), "generated_url": None, "path": "load_more"}
+    body = resp.get_data(as_text=True)
+    m = _VIEW_URL_RE.search(body)
+    stages = resp.headers.get("Server-Timing", "")
+    return {
+        "tiles": len(_TILE_RE.findall(body)),
+        "generated_url": m.group(1).replace("&amp;", "&") if m else None,
+        "path": "llm" if "llm_" in stages else "local",
+    }
+
+
+def measure_latency(app, flows: list, repeat: int) -> dict:
+    client = app.test_client()
+    results = {}
+    for name, path, kwargs in flows:
+        _, resp = call(client, path, kwargs)  # warm-up
+        out = describe(resp)
+        samples, stages = [], {}
+        for _ in range(repeat):
+            ms, resp = call(client, path, kwargs)
+            samples.append(ms)
+            for stage, dur in _STAGE_RE.findall(resp.headers.get("Server-Timing", "")):
+                if stage != "total":
+                    stages.setdefault(stage, []).append(float(dur))
+        results[name] = dict(
+            out,
+            p50_ms=round(percentile(samples, 50), 2),
+            p95_ms=round(percentile(samples, 95), 2),
+            stages={stage: round(statistics.median(v), 2) for stage, v in sorted(stages.items())},
+        )
+    return results
+
+
+def measure_memory(app, flows: list) -> dict:
+    """Peak bytes allocated while serving each flow (KiB above the pre-request level)."""
+    client = app.test_client()
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for name, path, kwargs in flows:
+            gc.collect()
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call(client, path, kwargs)
+            peaks[name] = round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def measure_throughput(app, flows: list, repeat: int, threads: int) -> dict:
+    def run_all(_):
+        client = app.test_client()
+        for _, path, kwargs in flows:
+            call(client, path, kwargs)
+
+    t = time.perf_counter()
+    for i in range(repeat):
+        run_all(i)
+    sequential = repeat * len(flows) / (time.perf_counter() - t)
+
+    t = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(run_all, range(threads * repeat)))
+    threaded = threads * repeat * len(flows) / (time.perf_counter() - t)
+    return {"sequential_rps": round(sequential, 1), "threaded_rps": round(threaded, 1), "threads": threads}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Human-readable regressions of current against baseline."""
+    problems = []
+    for name, now in current["flows"].items():
+        then = baseline.get("flows", {}).get(name)
+        if then is None:
+            continue
+        for key in ("generated_url", "tiles", "path"):
+            if now[key] != then[key]:
+                problems.append(f"{name}: {key} changed {then[key]!r} -> {now[key]!r}")
+        if now["p50_ms"] > then["p50_ms"] * (1 + tolerance) and now["p50_ms"] - then["p50_ms"] > 2:
+            problems.append(f"{name}: p50 {then['p50_ms']:.1f} -> {now['p50_ms']:.1f} ms")
+        if now["peak_kib"] > then["peak_kib"] * (1 + tolerance) and now["peak_kib"] - then["peak_kib"] > 64:
+            problems.append(f"{name}: peak allocation {then['peak_kib']:.0f} -> {now['peak_kib']:.0f} KiB")
+    for key in ("sequential_rps", "threaded_rps"):
+        then = baseline.get("throughput", {}).get(key)
+        if then and current["throughput"][key] < then * (1 - tolerance):
+            problems.append(f"throughput: {key} {then} -> {current['throughput'][key]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="fake OpenAI response delay")
+    parser.add_argument("--site-latency-ms", type=float, default=0.0, help="fixture site response delay")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown / growth")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit 1 when a regression is found")
+    args = parser.parse_args()
+
+    site = FixtureSite(latency_ms=args.site_latency_ms).start()
+    openai = FakeOpenAI(latency_ms=args.llm_latency_ms).start()
+    flows = build_flows()
+    # The app logs every stage with print(); silence it for the whole run (threads included)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        app = start_app(site, openai)
+        flow_results = measure_latency(app, flows, args.repeat)
+        for name, kib in measure_memory(app, flows).items():
+            flow_results[name]["peak_kib"] = kib
+        throughput = measure_throughput(app, flows, args.repeat, args.threads)
+    current = {
+        "meta": {
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "llm_latency_ms": args.llm_latency_ms,
+            "site_latency_ms": args.site_latency_ms,
+        },
+        "throughput": throughput,
+        "flows": flow_results,
+    }
+
+    print(f"{'flow':30} {'p50 ms':>8} {'p95 ms':>8} {'peak KiB':>9} {'tiles':>5} {'path':>9}  stages (p50 ms)")
+    for name, r in flow_results.items():
+        stages = " ".join(f"{s}={ms:g}" for s, ms in r["stages"].items())
+        print(f"{name:30} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['peak_kib']:9.1f} {r['tiles']:5} {r['path']:>9}  {stages}")
+    tp = current["throughput"]
+    print(f"\nthroughput: {tp['sequential_rps']} req/s sequential, {tp['threaded_rps']} req/s with {tp['threads']} threads")
+    print(f"stand-in requests: site {site.requests}, openai {openai.requests}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        problems = compare(current, json.load(f), args.tolerance)
+    if problems:
+        print(f"\n{len(problems)} regression(s) against {args.baseline}:")
+        for p in problems:
+            print("  " + p)
+        if args.check:
+            sys.exit(1)
+    else:
+        print(f"\nno regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
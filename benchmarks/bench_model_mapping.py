@@ -0,0 +1,111 @@
+"""Measure the model-mapping prompt before/after top-k candidate retrieval.
+
+For every MODEL_SPECIFIC query in benchmarks/classification_queries.jsonl this
+builds the extract_and_map_models system prompt twice -- with the whole
+model_data list and with only the top-k retrieved names -- and reports prompt
+size per club type. Recall is the share of queries where the top-k list still
+contains a model the local index matched exactly.
+
+With --llm (needs OPENAI_API_KEY) both prompts are sent to the extraction model
+and real prompt-token usage, latency and output agreement are reported.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_model_mapping [--top-k 40] [--llm]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+from collections import defaultdict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from benchmarks.bench_classifier import load_queries
+from config import EXTRACTION_TOP_K
+from services.llm_service import build_model_mapping_prompt, client, EXTRACTION_MODEL
+from services.model_index import classify_locally, top_k_models
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    """Exact token count with tiktoken when installed, else the ~4 chars/token rule of thumb."""
+    return len(_ENCODING.encode(text)) if _ENCODING else len(text) // 4
+
+
+def timed_mapping(user_query: str, club_type: str, top_k: int):
+    """Run the real extraction call and return (output, prompt_tokens, latency_ms)."""
+    system_prompt = build_model_mapping_prompt(user_query, club_type, top_k)
+    t = time.perf_counter()
+    resp = client.chat.completions.create(
+        model=EXTRACTION_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_query},
+        ],
+        temperature=0,
+        max_tokens=400,
+    )
+    elapsed = (time.perf_counter() - t) * 1e3
+    return resp.choices[0].message.content.strip(), resp.usage.prompt_tokens, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=EXTRACTION_TOP_K or 40)
+    parser.add_argument("--llm", action="store_true", help="send both prompts to the extraction model")
+    args = parser.parse_args()
+
+    by_club = defaultdict(list)
+    for row in load_queries():
+        if row["model_specific"]:
+            by_club[row["club_type"]].append(row["query"])
+
+    print(f"Token counts: {'tiktoken o200k_base' if _ENCODING else 'estimated (chars/4)'}; top-k = {args.top_k}\n")
+    print(f"{'club type':15} {'queries':>7} {'full tokens':>12} {'top-k tokens':>13} {'reduction':>10} {'recall':>7} {'retrieval ms':>13}")
+    for club_type, queries in sorted(by_club.items()):
+        full = count_tokens(build_model_mapping_prompt(queries[0], club_type, 0))
+        small, retrieval_ms, hits, checked = [], [], 0, 0
+        for q in queries:
+            small.append(count_tokens(build_model_mapping_prompt(q, club_type, args.top_k)))
+            t = time.perf_counter()
+            candidates = top_k_models(q, club_type, args.top_k)
+            retrieval_ms.append((time.perf_counter() - t) * 1e3)
+            matched = classify_locally(q, club_type)["matched_models"]
+            if matched:
+                checked += 1
+                hits += any(m in candidates for m in matched)
+        avg_small = statistics.mean(small)
+        recall = f"{hits}/{checked}" if checked else "n/a"
+        print(f"{club_type:15} {len(queries):7} {full:12} {avg_small:13.0f} {1 - avg_small / full:10.1%} {recall:>7} {statistics.mean(retrieval_ms):13.3f}")
+
+    if not args.llm:
+        print("\nRun with --llm to measure real prompt tokens and latency against the API.")
+        return
+
+    print(f"\n{'club type':15} {'full tok':>9} {'full ms':>8} {'top-k tok':>10} {'top-k ms':>9} {'same output':>12}")
+    for club_type, queries in sorted(by_club.items()):
+        rows = []
+        for q in queries:
+            with contextlib.redirect_stdout(io.StringIO()):
+                full_out, full_tok, full_ms = timed_mapping(q, club_type, 0)
+                small_out, small_tok, small_ms = timed_mapping(q, club_type, args.top_k)
+            rows.append((full_tok, full_ms, small_tok, small_ms, full_out == small_out))
+        cols = list(zip(*rows))
+        print(
+            f"{club_type:15} {statistics.mean(cols[0]):9.0f} {statistics.median(cols[1]):8.0f} "
+            f"{statistics.mean(cols[2]):10.0f} {statistics.median(cols[3]):9.0f} {sum(cols[4]):>6}/{len(rows):<5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
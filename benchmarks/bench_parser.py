@@ -0,0 +1,52 @@
+"""Microbenchmark parse_listing_html backends on the saved listing-page fixtures.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_parser [--repeat 20]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from benchmarks.check_parser_equivalence import FIXTURE_GLOB
+from services.scraper import parse_listing_html
+
+BACKENDS = ["bs4", "lxml"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(FIXTURE_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+
+    print(f"{'fixture':32} {'KiB':>6} " + " ".join(f"{b + ' ms':>10}" for b in BACKENDS) + f" {'speedup':>8}")
+    totals = {b: [] for b in BACKENDS}
+    for name, page_html in pages:
+        medians = {}
+        for backend in BACKENDS:
+            samples = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(args.repeat):
+                    t = time.perf_counter()
+                    parse_listing_html(page_html, backend=backend)
+                    samples.append((time.perf_counter() - t) * 1000)
+            medians[backend] = statistics.median(samples)
+            totals[backend].append(medians[backend])
+        print(f"{name:32} {len(page_html) / 1024:6.0f} " + " ".join(f"{medians[b]:10.2f}" for b in BACKENDS)
+              + f" {medians['bs4'] / medians['lxml']:7.1f}x")
+    mean = {b: statistics.mean(v) for b, v in totals.items()}
+    print(f"{'mean':32} {'':6} " + " ".join(f"{mean[b]:10.2f}" for b in BACKENDS) + f" {mean['bs4'] / mean['lxml']:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
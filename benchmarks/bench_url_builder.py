@@ -0,0 +1,130 @@
+"""Compare URL_BUILD_MODE="url" (model writes the URL) with "json" (model writes filters).
+
+Offline it checks the local assembler: every prompts_v2 reference URL is parsed
+into filters, run through sanitize_filters and re-assembled, and must come back
+with the same parameters.
+
+With --llm (needs OPENAI_API_KEY) every query in
+benchmarks/classification_queries.jsonl goes through both modes and the report
+shows completion tokens, latency and how many URLs only use parameters and
+values the club type's schema allows.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_url_builder [--llm] [--limit N]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from urllib.parse import urlsplit, parse_qsl
+
+from dotenv import load_dotenv
+
+load_dotenv()
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from benchmarks.bench_classifier import load_queries, percentile
+from config import CLUB_PROMPT_FILES, URL_BUILDING_MODEL
+from services.filter_schema import _REFERENCE_URL_RE, assemble_url, sanitize_filters
+from services.llm_service import JSON_OUTPUT_INSTRUCTIONS, client
+from services.search_pipeline import load_system_prompt
+
+
+def url_filters(url: str):
+    """Split a 2nd Swing URL into ({param: [values]}, sort, q)."""
+    filters, sort, q = {}, None, None
+    for key, value in parse_qsl(urlsplit(url).query):
+        param = key.split("[", 1)[0]
+        if param == "product_list_order":
+            sort = value
+        elif param == "q":
+            q = value
+        elif param != "g2_category":
+            filters.setdefault(param, []).append(value)
+    return filters, sort, q
+
+
+def schema_valid(club_type: str, url: str) -> bool:
+    """True if every parameter and closed-vocabulary value is in the schema."""
+    if not url.startswith("https://www.2ndswing.com/"):
+        return False
+    filters, sort, _ = url_filters(url)
+    clean, _, dropped = sanitize_filters(club_type, filters, sort)
+    return not dropped
+
+
+def check_reference_urls():
+    print(f"{'club type':15} {'params':>6}  round-trip")
+    for club_type, filename in CLUB_PROMPT_FILES.items():
+        with open(os.path.join("textdocs", "prompts_v2", filename), encoding="utf-8") as f:
+            m = _REFERENCE_URL_RE.search(f.read())
+        if not m:
+            print(f"{club_type:15} {'-':>6}  no reference URL")
+            continue
+        filters, sort, _ = url_filters(m.group(0))
+        clean, sort, dropped = sanitize_filters(club_type, filters, sort)
+        rebuilt = url_filters(assemble_url(club_type, clean, sort))[0]
+        same = {k: set(v) for k, v in rebuilt.items()} == {k: set(v) for k, v in filters.items()}  # refs repeat values
+        print(f"{club_type:15} {len(filters):6}  {'ok' if same and not dropped else f'MISMATCH dropped={dropped}'}")
+
+
+def call(system_prompt: str, inputs: str, user_query: str, json_mode: bool):
+    """Same prompt layout as the pipeline: static prompt, output rules, then per-request inputs."""
+    kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+    t = time.perf_counter()
+    resp = client.chat.completions.create(
+        model=URL_BUILDING_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt + ("\n" + JSON_OUTPUT_INSTRUCTIONS if json_mode else "") + "\n" + inputs},
+            {"role": "user", "content": user_query},
+        ],
+        temperature=0,
+        max_tokens=200 if json_mode else 400,
+        **kwargs,
+    )
+    return resp.choices[0].message.content.strip(), resp.usage.completion_tokens, (time.perf_counter() - t) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="run both modes against the API")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N queries")
+    args = parser.parse_args()
+
+    check_reference_urls()
+    if not args.llm:
+        print("\nRun with --llm to compare output tokens and latency of both modes.")
+        return
+
+    rows = load_queries()[: args.limit or None]
+    results = {"url": [], "json": []}
+    for row in rows:
+        club_type = row["club_type"]
+        shape = "MODEL_SPECIFIC" if row["model_specific"] else "GENERIC"
+        system_prompt = load_system_prompt(club_type)
+        inputs = f"CLASSIFICATION: {shape}\nCLUB_TYPE: {club_type}\n"
+
+        url, tokens, ms = call(system_prompt, inputs, row["query"], json_mode=False)
+        results["url"].append((tokens, ms, schema_valid(club_type, url)))
+
+        raw, tokens, ms = call(system_prompt, inputs, row["query"], json_mode=True)
+        t = time.perf_counter()
+        try:
+            data = json.loads(raw)
+            filters, sort, _ = sanitize_filters(club_type, data.get("filters") or {}, data.get("sort"))
+            q = data.get("q") if row["model_specific"] else None
+            url = assemble_url(club_type, filters, sort, q)
+            ok = schema_valid(club_type, url) and (bool(q) or not row["model_specific"])
+        except Exception:
+            ok = False
+        results["json"].append((tokens, ms + (time.perf_counter() - t) * 1e3, ok))
+
+    print(f"\n{'mode':5} {'out tok mean':>12} {'p50 ms':>8} {'p95 ms':>8} {'valid':>9}")
+    for mode, res in results.items():
+        tokens, ms, ok = zip(*res)
+        print(f"{mode:5} {statistics.mean(tokens):12.1f} {percentile(ms, 50):8.0f} {percentile(ms, 95):8.0f} {sum(ok):>4}/{len(ok):<4}")
+
+
+if __name__ == "__main__":
+    main()
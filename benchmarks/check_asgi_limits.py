@@ -0,0 +1,68 @@
+"""Check that the async routes in asgi.py enforce the same rate limits as the Flask app.
+
+Sends RATE_LIMIT + 1 POSTs to /load_more and /api/search_with_url (without a
+URL, so they are answered without any fetch) and SEARCH_RATE_LIMIT + 1 rule
+fast-path searches to POST / and /api/search (against the local stand-ins in
+benchmarks/standins.py) through asgi.application, and expects exactly one 429
+per route, on the last request. Exits non-zero otherwise.
+
+Usage (from the repo root):
+    python -m benchmarks.check_asgi_limits
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+
+import httpx
+from limits import parse
+
+from benchmarks.standins import FixtureSite, FakeOpenAI
+
+ROUTES = [
+    # (path, request kwargs, uses SEARCH_RATE_LIMIT)
+    ("/load_more", {"json": {"club_type": "Driver"}}, False),
+    ("/api/search_with_url", {"json": {"club_type": "Driver"}}, False),
+    ("/", {"data": {"user_query": "ping driver stiff", "club_type": "Driver"}}, True),
+    ("/api/search", {"data": {"user_query": "ping driver stiff", "club_type": "Driver"}}, True),
+]
+
+
+async def count_statuses(transport, path: str, kwargs: dict, n: int, user_agent: str) -> dict:
+    statuses = {}
+    headers = {"User-Agent": user_agent}  # client_key includes it: a fresh bucket per run
+    async with httpx.AsyncClient(transport=transport, base_url="http://check", headers=headers) as client:
+        for _ in range(n):
+            status = (await client.post(path, **kwargs)).status_code
+            key = 429 if status == 429 else "other"
+            if key == 429 and statuses.get("other", 0) < n - 1:
+                key = "early 429"
+            statuses[key] = statuses.get(key, 0) + 1
+    return statuses
+
+
+async def main() -> int:
+    site = FixtureSite().start()
+    openai = FakeOpenAI().start()
+    os.environ.update(SCRAPE_ORIGIN=site.base_url, OPENAI_BASE_URL=openai.api_base, OPENAI_API_KEY="check", MIXPANEL_TOKEN="")
+    with contextlib.redirect_stdout(io.StringIO()):
+        from config import RATE_LIMIT, SEARCH_RATE_LIMIT
+        from asgi import application
+
+    failures = 0
+    transport = httpx.ASGITransport(app=application)
+    for path, kwargs, search in ROUTES:
+        allowed = parse(SEARCH_RATE_LIMIT if search else RATE_LIMIT).amount
+        with contextlib.redirect_stdout(io.StringIO()):
+            statuses = await count_statuses(transport, path, kwargs, allowed + 1, f"limit-check{path}")
+        ok = statuses == {"other": allowed, 429: 1}
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} POST {path:22} {allowed + 1} requests -> {statuses}")
+    site.stop()
+    openai.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
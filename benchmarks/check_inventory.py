@@ -0,0 +1,95 @@
+"""Check that inventory answers match what the live site parse gives for the same listing.
+
+Crawls each club type whose fixture in benchmarks/fixtures/html/ is a
+complete one-page listing into a throwaway snapshot (the crawl's fetch is
+pointed at the fixture), then compares:
+
+- the unfiltered listing URL: the same products, in the same order, as
+  parse_listing_html gives for the fixture;
+- a brand filter: exactly the fixture's products of that brand, parent-model
+  cards included;
+- filters a parent-model card can't answer (condition, dexterity, flex, loft):
+  search() must decline, so the app scrapes the live site instead of
+  dropping the parent cards.
+
+Exits non-zero on any mismatch.
+
+Usage (from the repo root):
+    python -m benchmarks.check_inventory
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from services import inventory, scraper
+from services.filter_schema import get_filter_schema, assemble_url
+
+FIXTURES = {
+    "Driver": "drivers_p1.html",
+    "Fairway Woods": "fairway-woods_p1.html",
+    "Iron Sets": "iron-sets_p1.html",
+}
+LIVE_ONLY = [
+    ("g2_condition", "Mint 9.5"),
+    ("g2_dexterity", "Right Handed"),
+    ("g2_shaft_flex", "Stiff"),
+    ("g2_club_loft", "10.5°"),
+]
+
+
+def live_parse(name: str) -> list:
+    with open(os.path.join("benchmarks", "fixtures", "html", name), encoding="utf-8") as f:
+        return scraper.parse_listing_html(f.read())[0]
+
+
+def main() -> int:
+    inventory.INVENTORY_DB = os.path.join(tempfile.mkdtemp(), "inventory.sqlite3")
+    failures = 0
+
+    def report(ok, label):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+    for club_type, name in FIXTURES.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            live = live_parse(name)
+            # The whole listing is this one page
+            scraper.scrape_2ndswing_uncached = lambda url: ((live, len(live), [], None, False), True)
+            crawled = inventory.crawl(club_type)
+        report(crawled["ok"], f"{club_type}: crawled {crawled.get('products')} products from {name}")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            listing = inventory.search(get_filter_schema(club_type)["listing_url"])
+        report(listing is not None and listing[0] == live and listing[1] == len(live),
+               f"{club_type}: unfiltered listing equals the fixture parse")
+
+        # The brand with the most of both card kinds (parent models and single listings)
+        brand = max(sorted({p["brand"] for p in live}), key=lambda b: min(
+            sum(1 for p in live if p["brand"] == b and p.get("parent_model")),
+            sum(1 for p in live if p["brand"] == b and not p.get("parent_model")),
+        ))
+        expected = [p for p in live if p["brand"] == brand]
+        with contextlib.redirect_stdout(io.StringIO()):
+            by_brand = inventory.search(assemble_url(club_type, {"g2_brand": [brand]}))
+        report(by_brand is not None and by_brand[0] == expected,
+               f"{club_type}: g2_brand={brand} gives the fixture's {len(expected)} {brand} products "
+               f"({sum(1 for p in expected if p.get('parent_model'))} parent cards)")
+
+        params = get_filter_schema(club_type)["params"]
+        for param, value in LIVE_ONLY:
+            if param not in params:
+                continue
+            url = assemble_url(club_type, {param: [value]})
+            with contextlib.redirect_stdout(io.StringIO()):
+                answer = inventory.search(url)
+            report(answer is None, f"{club_type}: {param} left to the live site")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
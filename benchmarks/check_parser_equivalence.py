@@ -0,0 +1,71 @@
+"""Check that every parse_listing_html backend returns exactly what the bs4 parser does.
+
+Runs each saved fixture in benchmarks/fixtures/html/ (plus a minified and a
+CRLF variant of each, to shake out whitespace handling) through every
+backend and compares the full (products, total_count, applied_filters,
+next_page_url, no_results) tuples. Exits non-zero on any difference.
+
+Usage (from the repo root):
+    python -m benchmarks.check_parser_equivalence
+"""
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from services.scraper import parse_listing_html
+
+FIXTURE_GLOB = os.path.join("benchmarks", "fixtures", "html", "*.html")
+BACKENDS = ["lxml"]
+
+
+def variants(page_html: str):
+    yield "as saved", page_html
+    yield "minified", re.sub(r">\s+<", "><", page_html)
+    yield "crlf", page_html.replace("\n", "\r\n")
+
+
+def first_difference(expected, actual) -> str:
+    names = ["products", "total_count", "applied_filters", "next_page_url", "no_results"]
+    for name, a, b in zip(names, expected, actual):
+        if a == b:
+            continue
+        if name == "products":
+            if len(a) != len(b):
+                return f"products: {len(a)} vs {len(b)} items"
+            for i, (x, y) in enumerate(zip(a, b)):
+                if x != y:
+                    diff = {k: (x.get(k), y.get(k)) for k in x.keys() | y.keys() if x.get(k) != y.get(k)}
+                    return f"products[{i}]: {diff}"
+        return f"{name}: {a!r} vs {b!r}"
+    return ""
+
+
+def main():
+    paths = sorted(glob.glob(FIXTURE_GLOB))
+    if not paths:
+        print("No fixtures; run python -m benchmarks.fixtures.make_listing_fixtures")
+        sys.exit(1)
+    failures = 0
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            page_html = f.read()
+        for label, text in variants(page_html):
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = parse_listing_html(text, backend="bs4")
+                results = {b: parse_listing_html(text, backend=b) for b in BACKENDS}
+            for backend, actual in results.items():
+                if actual != expected:
+                    failures += 1
+                    print(f"FAIL {os.path.basename(path)} [{label}] {backend}: {first_difference(expected, actual)}")
+        print(f"ok   {os.path.basename(path):32} {len(expected[0]):3} products")
+    print(f"\n{len(paths)} fixtures x 3 variants x {len(BACKENDS)} backend(s): {failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
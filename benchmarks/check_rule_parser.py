@@ -0,0 +1,60 @@
+"""Check the club-number (g2_subcategory) handling of the rule fast path.
+
+Each case runs build_url_locally against the prompts_v2 schemas and compares
+the g2_subcategory values of the URL it builds (None when the query is left
+to the LLM). Exits non-zero on any mismatch.
+
+Usage (from the repo root):
+    python -m benchmarks.check_rule_parser
+"""
+import os
+import sys
+from urllib.parse import urlsplit, parse_qsl
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from services.rule_parser import build_url_locally
+
+# (query, club type, expected g2_subcategory values, or None for "goes to the LLM")
+CASES = [
+    ("ping 7 iron", "Single Irons", ["7 Iron"]),
+    ("ping sw", "Wedges", ["Sand SW"]),
+    ("titleist gap wedge", "Wedges", ["Gap GW"]),
+    ("callaway 3w", "Fairway Woods", ["3 Wood 3W"]),
+    ("callaway 3 wood", "Fairway Woods", ["3 Wood 3W"]),
+    # "putter" is the club keyword, not the Putters subcategory "Putter"
+    ("ping putter", "Putters", []),
+    ("ping putters", "Putters", []),
+    # Single Irons "52" is a subcategory value but a bare number in a query is not
+    ("ping 52", "Single Irons", None),
+    ("ping 52 sand wedge", "Single Irons", None),
+]
+
+
+def subcategories(url):
+    if url is None:
+        return None
+    return [v for k, v in parse_qsl(urlsplit(url).query) if k.startswith("g2_subcategory")]
+
+
+def main() -> int:
+    failures = 0
+    for query, club_type, expected in CASES:
+        url = build_url_locally(query, club_type)
+        actual = subcategories(url)
+        ok = actual == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {club_type:14} {query!r:24} -> {actual} (expected {expected})")
+        if not ok:
+            print(f"     {url}")
+    # Singular and plural club keywords must give the same search
+    for query_a, query_b, club_type in [("ping putter", "ping putters", "Putters"), ("cobra driver", "cobra drivers", "Driver")]:
+        url_a, url_b = build_url_locally(query_a, club_type), build_url_locally(query_b, club_type)
+        ok = url_a == url_b
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {club_type:14} {query_a!r} == {query_b!r}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Check the near-duplicate query cache on the paraphrases its docstring promises.
+
+Runs each pair through build_search_url (LLM calls answered by the FakeOpenAI
+stand-in in benchmarks/standins.py): the first query must be built by the
+LLM, and the second must then come from the semantic cache, or must not when
+the pair asks for different things. The first pair is the example in
+services/semantic_cache.py. Exits non-zero on any mismatch.
+
+Usage (from the repo root):
+    python -m benchmarks.check_semantic_cache
+"""
+import contextlib
+import io
+import os
+import sys
+
+from benchmarks.standins import FakeOpenAI
+
+# (first query, paraphrase, club type, paraphrase should reuse the first URL)
+PAIRS = [
+    ("forgiving ping driver for a slow swing", "ping drivers that are forgiving for slow swings", "Driver", True),
+    ("forgiving driver for a slow swing that fixes my slice", "forgiving drivers for slow swing speed to fix a slice", "Driver", True),
+    ("ping driver under $300 for a slow swing", "ping driver under $500 for a slow swing", "Driver", False),
+    ("forged irons for a low handicapper", "forged irons for a high handicapper", "Iron Sets", False),
+]
+
+
+def main() -> int:
+    openai = FakeOpenAI().start()
+    os.environ.update(OPENAI_BASE_URL=openai.api_base, OPENAI_API_KEY="check")
+    with contextlib.redirect_stdout(io.StringIO()):
+        from services.model_index import load_model_indexes
+        from services.search_pipeline import build_search_url
+        load_model_indexes()
+
+    failures = 0
+    for first, paraphrase, club_type, should_hit in PAIRS:
+        with contextlib.redirect_stdout(io.StringIO()):
+            sources = [build_search_url(q, club_type)["source"] for q in (first, paraphrase)]
+        ok = sources == ["llm", "semantic" if should_hit else "llm"]
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {first!r} -> {paraphrase!r}: {sources[1]}{'' if ok else f' (first: {sources[0]})'}")
+    openai.stop()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
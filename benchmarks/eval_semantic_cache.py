@@ -0,0 +1,113 @@
+"""Hit rate vs wrong-URL rate of the near-duplicate query cache, per similarity threshold.
+
+Replays logged searches in order through services/semantic_cache.py the way
+search_pipeline uses it: queries the rule fast path answers and exact repeats
+(the exact query cache) are skipped, every other query is looked up first
+and, on a miss, stored with its logged URL. A hit is wrong when the reused
+URL differs from the query's own logged URL (compared with canonical_url).
+
+Each threshold is run twice: with the signature guard (what production does)
+and on similarity alone, to show what the guard catches.
+
+Input is one JSON object per line with "user_query", "club_type" and
+"generated_url", flat or under "properties" (a Mixpanel 'Search Performed'
+export works as is). The default file is a small hand-labelled set of
+paraphrase groups with near-miss negatives (same words, different price,
+loft, model, ...).
+
+Usage (from the repo root):
+    python -m benchmarks.eval_semantic_cache [searches.jsonl] [--thresholds 0.6,0.7,0.8,0.9]
+"""
+import argparse
+import json
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "unused-for-local-benchmark")
+
+from services import model_index, rule_parser, semantic_cache
+from services.cache import normalize_query
+from services.filter_schema import canonical_url
+from services.model_index import load_model_indexes
+
+DEFAULT_QUERIES = os.path.join("benchmarks", "semantic_cache_queries.jsonl")
+
+
+def load_searches(path: str) -> list:
+    searches = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            row = row.get("properties", row)
+            query, club_type, url = row.get("user_query"), row.get("club_type"), row.get("generated_url")
+            if not (query and club_type and url) or query.endswith(" (filter removed)"):
+                continue
+            searches.append((query, club_type, url))
+    return searches
+
+
+def prepare(searches: list, include_fast_path: bool) -> list:
+    """(query, club_type, url, signature) of the searches that would reach the near-duplicate cache."""
+    prepared, seen = [], set()
+    for query, club_type, url in searches:
+        key = (normalize_query(query), club_type)
+        if key in seen:
+            continue  # the exact query cache answers repeats
+        seen.add(key)
+        local = model_index.classify_locally(query, club_type)
+        model_phrase = local["model_phrase"] if local and local["is_model_specific"] else None
+        if not include_fast_path and rule_parser.build_url_locally(query, club_type, model_phrase):
+            continue
+        prepared.append((query, club_type, url, semantic_cache.signature(query, club_type, model_phrase)))
+    return prepared
+
+
+def replay(prepared: list, threshold: float, guard: bool) -> dict:
+    cache = semantic_cache.SemanticCache(max_entries=max(len(prepared), 1), threshold=threshold)
+    hits, wrong = 0, []
+    for query, club_type, url, sig in prepared:
+        sig = sig if guard else None
+        near = cache.lookup(query, club_type, sig)
+        if near is None:
+            cache.add(query, club_type, sig, url)
+            continue
+        hits += 1
+        if canonical_url(near["value"]) != canonical_url(url):
+            wrong.append((query, near["query"], round(near["similarity"], 3)))
+    n = len(prepared) or 1
+    return {"hits": hits, "hit_rate": hits / n, "wrong": wrong, "wrong_rate": len(wrong) / n}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=DEFAULT_QUERIES)
+    parser.add_argument("--thresholds", default="0.5,0.6,0.65,0.7,0.75,0.8,0.85,0.9,0.95")
+    parser.add_argument("--max-wrong", type=float, default=0.01, help="wrong-URL rate the recommendation allows")
+    parser.add_argument("--include-fast-path", action="store_true", help="also count queries the rule parser answers")
+    parser.add_argument("--show-wrong", action="store_true", help="list the wrong hits of the guarded runs")
+    args = parser.parse_args()
+
+    load_model_indexes()
+    prepared = prepare(load_searches(args.path), args.include_fast_path)
+    print(f"{len(prepared)} searches would reach the near-duplicate cache")
+    print(f"{'threshold':>9} {'hit rate':>9} {'wrong':>7} {'hit (no guard)':>15} {'wrong (no guard)':>17}")
+    best = None
+    for threshold in [float(t) for t in args.thresholds.split(",") if t.strip()]:
+        guarded = replay(prepared, threshold, guard=True)
+        bare = replay(prepared, threshold, guard=False)
+        print(f"{threshold:9.2f} {guarded['hit_rate']:9.1%} {guarded['wrong_rate']:7.1%} "
+              f"{bare['hit_rate']:15.1%} {bare['wrong_rate']:17.1%}")
+        if args.show_wrong:
+            for query, matched, similarity in guarded["wrong"]:
+                print(f"          {query!r} reused {matched!r} ({similarity})")
+        if guarded["wrong_rate"] <= args.max_wrong and (best is None or guarded["hit_rate"] > best[1]):
+            best = (threshold, guarded["hit_rate"])
+    if best:
+        print(f"\nhighest hit rate with at most {args.max_wrong:.0%} wrong URLs: threshold {best[0]:.2f} ({best[1]:.1%})")
+    else:
+        print(f"\nno threshold keeps wrong URLs at or below {args.max_wrong:.0%}")
+
+
+if __name__ == "__main__":
+    main()
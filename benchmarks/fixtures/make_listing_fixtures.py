@@ -0,0 +1,274 @@
+"""Generate the saved 2nd Swing listing-page fixtures in benchmarks/fixtures/html/.
+
+The pages follow the Magento markup scrape_2ndswing parses: a heavy header
+and layered-navigation sidebar, toolbar counts, applied-filter chips, the
+product grid (single used items, new/used parent tiles, pre-order tiles,
+attribute blocks with <br> separators) and pagination. Content is seeded, so
+re-running produces identical files.
+
+Usage (from the repo root):
+    python -m benchmarks.fixtures.make_listing_fixtures
+"""
+import html
+import os
+import random
+from urllib.parse import quote_plus
+
+from config import CLUB_PROMPT_FILES, MODEL_DATA_FILES, VISIBLE_ATTRS
+
+OUT_DIR = os.path.join("benchmarks", "fixtures", "html")
+BASE = "https://www.2ndswing.com"
+
+# Fixture name for each club type (listing slug used in URLs)
+CLUB_SLUGS = {
+    "Driver": "drivers",
+    "Fairway Woods": "fairway-woods",
+    "Hybrids": "hybrids",
+    "Iron Sets": "iron-sets",
+    "Wedges": "wedges",
+    "Putters": "putters",
+    "Single Irons": "single-irons",
+    "Utility Irons": "utility-irons",
+}
+
+BRANDS = ["Ping", "TaylorMade", "Titleist", "Callaway", "Cobra", "Mizuno", "Cleveland", "PXG", "Srixon", "Odyssey"]
+ATTR_VALUES = {
+    "dexterity": ["Right Handed", "Left Handed"],
+    "loft": ["9°", "10.5°", "12°", "15°", "56°", "60°"],
+    "flex": ["Stiff", "Regular", "Senior", "X-Stiff", "Ladies"],
+    "shaft": ["Graphite", "Steel", "Fujikura Ventus Blue 6", "Project X HZRDUS Smoke 60", "KBS Tour"],
+    "type": ["3 Wood", "5 Wood", "4 Hybrid", "Gap Wedge", "Sand Wedge"],
+    "makeup": ["4-PW", "5-PW,GW", "5-PW"],
+    "material": ["Steel", "Graphite"],
+    "bounce": ["8°", "10°", "12°"],
+    "length": ['33"', '34"', '35"'],
+}
+CONDITIONS = ["Mint 9.5", "Above Average 9.0", "Average 8.0", "Below Average 7.0"]
+
+
+def esc(text) -> str:
+    return html.escape(str(text), quote=True)
+
+
+def head_and_header(title: str, rng: random.Random) -> str:
+    """The heavy, irrelevant part of a real page: scripts, styles, mega menu."""
+    scripts = "".join(
+        f'<script type="text/x-magento-init">{{"*": {{"Magento_Ui/js/core/app": {{"components": {{"c{i}": '
+        f'{{"component": "js/c{i}", "config": "{"x" * rng.randint(200, 800)}"}}}}}}}}}}</script>\n'
+        for i in range(40)
+    )
+    styles = "".join(f'<link rel="stylesheet" href="{BASE}/static/css/s{i}.css">\n' for i in range(25))
+    menu = "".join(
+        f'<li class="level0 nav-{i} category-item"><a href="{BASE}/c{i}"><span>Category {i}</span></a>'
+        '<ul class="level0 submenu">'
+        + "".join(f'<li class="level1 category-item"><a href="{BASE}/c{i}/{j}"><span>Sub {j} &amp; more</span></a></li>' for j in range(30))
+        + "</ul></li>\n"
+        for i in range(12)
+    )
+    return (
+        f"<!doctype html>\n<html lang=\"en\"><head><meta charset=\"utf-8\"><title>{esc(title)}</title>\n{styles}{scripts}"
+        "<style>.product-box{display:block}</style></head>\n"
+        '<body class="catalog-category-view page-products">\n'
+        '<header class="page-header"><div class="panel wrapper"><ul class="header links"><li><a href="/customer/account">Sign In</a></li></ul></div>'
+        f'<nav class="navigation"><ul>{menu}</ul></nav></header>\n'
+        '<div class="breadcrumbs"><ul class="items"><li class="item home"><a href="/">Home</a></li>'
+        f'<li class="item category"><strong>{esc(title)}</strong></li></ul></div>\n'
+    )
+
+
+def sidebar(rng: random.Random) -> str:
+    """Layered navigation: many ol.items > li.item without filter-label/value (must be ignored)."""
+    blocks = []
+    for name in ["Brand", "Model", "Dexterity", "Loft", "Shaft Flex", "Shaft Material", "Condition", "Location", "Price"]:
+        options = "".join(
+            f'<li class="item"><a href="{BASE}/x?{quote_plus(name)}={k}" rel="nofollow">{esc(name)} option {k}'
+            f'<span class="count">{rng.randint(1, 400)}<span class="filter-count-label"> items</span></span></a></li>'
+            for k in range(rng.randint(8, 40))
+        )
+        blocks.append(
+            f'<div class="filter-options-item"><div class="filter-options-title">{esc(name)}</div>'
+            f'<div class="filter-options-content"><ol class="items">{options}</ol></div></div>'
+        )
+    return '<div class="sidebar sidebar-main"><div class="block filter">' + "".join(blocks) + "</div></div>\n"
+
+
+def applied_filters(filters) -> str:
+    if not filters:
+        return ""
+    chips = "".join(
+        '<li class="item">\n'
+        f'  <span class="filter-label">{esc(label)}</span>\n'
+        f'  <span class="filter-value">{esc(value)}</span>\n'
+        f'  <a class="action remove" href="{BASE}/remove?f={quote_plus(label)}" title="Remove {esc(label)} {esc(value)}"><span>Remove This Item</span></a>\n'
+        "</li>\n"
+        for label, value in filters
+    )
+    return (
+        '<div class="filter-current"><strong class="block-subtitle filter-current-subtitle">Now Shopping by</strong>'
+        f'<ol class="items">\n{chips}</ol></div>\n'
+    )
+
+
+def toolbar(first: int, last: int, total: int) -> str:
+    return (
+        '<div class="toolbar toolbar-products"><p class="toolbar-amount" id="toolbar-amount">\n'
+        f'  Items <span class="toolbar-number">{first}</span>-<span class="toolbar-number">{last}</span> of '
+        f'<span class="toolbar-number">{total:,}</span></p>\n'
+        '<div class="toolbar-sorter sorter"><label class="sorter-label">Sort By</label>'
+        '<select class="sorter-options"><option value="position">Relevance</option><option value="price_asc">Lowest Price</option></select></div></div>\n'
+    )
+
+
+def pagination(slug: str, query: str, page: int, pages: int, next_button: bool = True) -> str:
+    if pages <= 1:
+        return ""
+    items = []
+    for p in range(1, min(pages, 5) + 1):
+        href = f"{BASE}/golf-clubs/{slug}?{query + '&amp;' if query else ''}p={p}"
+        if p == page:
+            items.append(f'<li class="item current"><strong class="page"><span class="label">You\'re currently reading page</span><span>{p}</span></strong></li>')
+        else:
+            items.append(f'<li class="item"><a href="{href}" class="page"><span class="label">Page</span><span>{p}</span></a></li>')
+    if next_button and page < pages:
+        href = f"{BASE}/golf-clubs/{slug}?{query + '&amp;' if query else ''}p={page + 1}"
+        items.append(f'<li class="item pages-item-next"><a class="action  next" href="{href}" title="Next"><span class="label">Page</span><span>Next</span></a></li>')
+    return '<div class="pages"><strong class="label pages-label">Page</strong><ul class="items pages-items">' + "".join(items) + "</ul></div>\n"
+
+
+def attr_block(club_type: str, rng: random.Random) -> str:
+    parts = []
+    for i, key in enumerate(VISIBLE_ATTRS[club_type]):
+        label = key.capitalize()
+        value = rng.choice(ATTR_VALUES[key])
+        style = rng.random()
+        if style < 0.6:
+            parts.append(f'<span class="pmp-attribute-label">{label}:</span> {esc(value)}<br>')
+        elif style < 0.8:
+            # value wrapped in an element after a <br>
+            parts.append(f'<span class="pmp-attribute-label">{label}:</span><br><span class="pmp-attribute-value"> {esc(value)} </span><br>')
+        elif style < 0.9:
+            # no whitespace at all between label and value
+            parts.append(f'<span class="pmp-attribute-label">{label}</span>{esc(value)}<br/>')
+        else:
+            # empty value
+            parts.append(f'<span class="pmp-attribute-label">{label}:</span>\n')
+    return '<div class="pmp-attribute">\n' + "\n".join(parts) + "\n</div>"
+
+
+def product_card(club_type: str, models: list, i: int, rng: random.Random) -> str:
+    brand = rng.choice(BRANDS)
+    model = rng.choice(models) if models else f"Model {i}"
+    slug = quote_plus(f"{brand}-{model}".lower().replace(" ", "-"))
+    url = f"{BASE}/{slug}-{100000 + i}"
+    img = f"{BASE}/media/catalog/product/cache/a1b2c3/{slug}-{i}.jpg"
+    kind = rng.random()
+    title_cls = "pmp-product-category" if rng.random() < 0.8 else "p-title"
+
+    if kind < 0.55:
+        # single used item
+        attrs = {"data-itemhasused": "0", "data-hasnewvariants": "0"}
+        body = (
+            f"{attr_block(club_type, rng)}\n"
+            f'<div class="pmp-product-condition">{rng.choice(CONDITIONS)}</div>\n'
+            f'<div class="price-box price-final_price"><div class="current-price"><span class="price">${rng.randint(40, 700)}.99</span></div></div>'
+        )
+    elif kind < 0.85:
+        # parent model tile with New / Used links
+        attrs = {"data-itemhasused": "1", "data-hasnewvariants": "1"}
+        links = []
+        if rng.random() < 0.8:
+            links.append(
+                f'<a class="new-used-listing-link" href="{BASE}/golf-clubs/{CLUB_SLUGS[club_type]}?g2_model%5B0%5D={quote_plus(model)}&amp;new_used_filter=New">'
+                f'<span class="nu-label">New</span>\n<span class="price">${rng.randint(300, 900)}.99</span></a>'
+            )
+        links.append(
+            f'<a class="new-used-listing-link" href="{BASE}/golf-clubs/{CLUB_SLUGS[club_type]}?g2_model%5B0%5D={quote_plus(model)}&amp;new_used_filter=Used">'
+            f'<span class="nu-label">Used</span> <span class="nu-from">from</span> <span class="old-price"><span class="price">${rng.randint(100, 500)}.99</span></span></a>'
+        )
+        body = f'{attr_block(club_type, rng)}\n<div class="new-used-links">{"".join(links)}</div>'
+    else:
+        # pre-order tile: new variants but no listing links, price in the card
+        attrs = {"data-itemhasused": "0", "data-hasnewvariants": "1"}
+        body = f'<div class="pre-order-label">Pre-Order</div>\n<div class="current-price"><span class="price">${rng.randint(400, 800)}.00</span></div>'
+
+    data = " ".join(f'{k}="{v}"' for k, v in attrs.items())
+    return (
+        f'<li class="item product product-item">\n<div class="product-box product-item-info" data-container="product-grid" {data}>\n'
+        f'<a href="{url}" class="product photo product-item-photo" tabindex="-1">'
+        f'<span class="product-image-container"><span class="product-image-wrapper">'
+        f'<img class="product-image-photo" src="{img}" loading="lazy" width="240" height="300" alt="{esc(brand)} {esc(model)}"/></span></span></a>\n'
+        f'<div class="product details product-item-details">\n<div class="product-brand"> {esc(brand)} </div>\n'
+        f'<div class="{title_cls}"><a class="product-item-link" href="{url}">{esc(model)}</a> <!-- sku {i} --></div>\n'
+        f"{body}\n</div>\n</div>\n</li>\n"
+    )
+
+
+def listing_page(club_type: str, rng: random.Random, page: int = 1, pages: int = 60, cards: int = 24,
+                 filters=None, query: str = "", next_button: bool = True) -> str:
+    slug = CLUB_SLUGS[club_type]
+    with open(os.path.join("model_data", MODEL_DATA_FILES[club_type]), encoding="utf-8") as f:
+        models = [ln.strip() for ln in f if ln.strip()]
+    total = pages * cards - rng.randint(0, cards - 1)
+    first = (page - 1) * cards + 1
+    grid = "".join(product_card(club_type, models, first + i, rng) for i in range(cards))
+    return (
+        head_and_header(f"{club_type} | 2nd Swing Golf", rng)
+        + '<main id="maincontent" class="page-main"><div class="columns"><div class="column main">\n'
+        + applied_filters(filters)
+        + toolbar(first, first + cards - 1, total)
+        + f'<div class="products wrapper grid products-grid"><ol class="products list items product-items">\n{grid}</ol></div>\n'
+        + toolbar(first, first + cards - 1, total)
+        + pagination(slug, query, page, pages, next_button)
+        + "</div>\n"
+        + sidebar(rng)
+        + "</div></main>\n"
+        + '<footer class="page-footer"><div class="footer content"><ul class="footer links">'
+        + "".join(f'<li class="nav item"><a href="/f{i}">Footer link {i}</a></li>' for i in range(60))
+        + "</ul></div></footer>\n</body></html>\n"
+    )
+
+
+def no_results_filter_page(rng: random.Random) -> str:
+    return (
+        head_and_header("Drivers | 2nd Swing Golf", rng)
+        + '<main id="maincontent" class="page-main"><div class="columns"><div class="column main">\n'
+        + applied_filters([("Brand", "Ping"), ("Loft", "7°"), ("Dexterity", "Left Handed")])
+        + '<div class="message info empty"><div>We can\'t find products matching the selection.</div></div>\n'
+        + "</div>\n" + sidebar(rng) + "</div></main></body></html>\n"
+    )
+
+
+def no_results_search_page(rng: random.Random) -> str:
+    return (
+        head_and_header("Search results for: 'zzqx'", rng)
+        + '<main id="maincontent" class="page-main"><div class="columns"><div class="column main">\n'
+        + '<div class="message notice"><div>Your search returned no results.</div></div>\n'
+        + "</div></div></main></body></html>\n"
+    )
+
+
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
+    rng = random.Random(2024)
+    fixtures = {}
+    for club_type in CLUB_PROMPT_FILES:
+        fixtures[f"{CLUB_SLUGS[club_type]}_p1.html"] = listing_page(club_type, rng)
+    fixtures["drivers_filtered_p2.html"] = listing_page(
+        "Driver", rng, page=2, pages=4, filters=[("Brand", "Ping"), ("Dexterity", "Left Handed"), ("Price", "$0.00 - $300.00")],
+        query="g2_brand%5B0%5D=Ping&amp;g2_dexterity%5B0%5D=Left+Handed&amp;price=0-300",
+    )
+    fixtures["putters_no_next_button.html"] = listing_page("Putters", rng, pages=3, cards=12, next_button=False)
+    fixtures["wedges_last_page.html"] = listing_page("Wedges", rng, page=3, pages=3, cards=7)
+    fixtures["drivers_search_g430.html"] = listing_page(
+        "Driver", rng, pages=2, cards=18, query="g2_category=Driver&amp;q=g430", filters=[("Category", "Driver")],
+    )
+    fixtures["no_results_filters.html"] = no_results_filter_page(rng)
+    fixtures["no_results_search.html"] = no_results_search_page(rng)
+    for name, text in fixtures.items():
+        with open(os.path.join(OUT_DIR, name), "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"{name:32} {len(text) / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
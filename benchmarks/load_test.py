@@ -0,0 +1,249 @@
+"""Concurrent-load harness: the real app under gunicorn, against the local stand-ins.
+
+Starts the fixture site and fake OpenAI server from benchmarks/standins.py
+(with optional injected latency), launches gunicorn on the app pointed at
+them, then sweeps concurrency levels with a closed-loop load generator: each
+virtual user sends a request, waits for the answer and sends the next one.
+Traffic is the same the page sends (see templates/index.html):
+
+    search     POST /api/search?format=html         new search (rule or LLM path)
+    load_more  POST /load_more                      infinite scroll, page 2..30
+    filter     POST /api/search_with_url?format=html  filter removal
+
+mixed by --profile (or --mix search=60,load_more=30,filter=10). Prices in
+the queries and URLs are randomised so the query and scrape caches see
+realistic miss rates instead of one hot entry. Each virtual user has its own
+User-Agent, which flask_limiter keys on, so 429s show up when a user's
+hourly limit is exhausted; they are reported apart from other errors.
+
+For every level it prints throughput (successful req/s), p50/p95/p99
+latency, error and 429 rates and p50 per request type, and marks the knee
+where p95 first exceeds twice the lowest level's p95.
+
+Usage (from the repo root):
+    python -m benchmarks.load_test --workers 2 --threads 4 --concurrency 1,2,4,8,16,32
+    python -m benchmarks.load_test --llm-latency-ms 600 --site-latency-ms 250 --profile browse
+    python -m benchmarks.load_test --asgi --workers 1 --concurrency 8,32,128 --json curve.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.standins import FixtureSite, FakeOpenAI
+
+PROFILES = {
+    "search": {"search": 100},
+    "browse": {"search": 50, "load_more": 35, "filter": 15},
+    "scroll": {"search": 20, "load_more": 70, "filter": 10},
+}
+
+CLUB_TYPES = {
+    "Driver": ("drivers", "driver"),
+    "Fairway Woods": ("fairway-woods", "fairway wood"),
+    "Hybrids": ("hybrids", "hybrid"),
+    "Iron Sets": ("iron-sets", "irons"),
+    "Wedges": ("wedges", "wedge"),
+    "Putters": ("putters", "putter"),
+    "Single Irons": ("single-iron", "single iron"),
+    "Utility Irons": ("utility-iron", "utility iron"),
+}
+BRANDS = ["Ping", "TaylorMade", "Titleist", "Callaway", "Cobra", "Mizuno"]
+QUERY_TEMPLATES = [
+    "{brand} left handed {noun} under ${price}",  # rule fast path
+    "{brand} {noun} stiff flex under ${price}",
+    "forgiving {noun} for a slow swing under ${price}",  # LLM path
+]
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in PROFILES["browse"]:
+            raise SystemExit(f"unknown request type {kind!r} in --mix")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def make_request(kind: str, rng: random.Random):
+    """(method, path, kwargs) for one request of the given kind."""
+    club_type, (slug, noun) = rng.choice(list(CLUB_TYPES.items()))
+    brand = rng.choice(BRANDS)
+    price = rng.randrange(150, 1500, 5)
+    listing = f"https://www.2ndswing.com/golf-clubs/{slug}"
+    if kind == "search":
+        query = rng.choice(QUERY_TEMPLATES).format(brand=brand, noun=noun, price=price)
+        return "/api/search?format=html", {"data": {"user_query": query, "club_type": club_type}}
+    if kind == "load_more":
+        next_url = f"{listing}?price=0-{price}&p={rng.randint(2, 30)}"
+        return "/load_more", {"json": {"next_url": next_url, "club_type": club_type}}
+    url = f"{listing}?g2_brand%5B0%5D={brand}&price=0-{price}"
+    return "/api/search_with_url?format=html", {"json": {"url": url, "club_type": club_type, "user_query": f"{brand} {noun}"}}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, site: FixtureSite, openai: FakeOpenAI):
+    """Launch gunicorn on the app and wait until it answers; returns (process, base_url)."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        SCRAPE_ORIGIN=site.base_url,
+        OPENAI_BASE_URL=openai.api_base,
+        OPENAI_API_KEY="bench",
+        MIXPANEL_TOKEN="",  # telemetry off (an empty value also wins over .env)
+    )
+    cmd = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}", "-w", str(args.workers), "--timeout", "120"]
+    if args.asgi:
+        cmd += ["-k", "uvicorn.workers.UvicornWorker", "asgi:application"]
+    else:
+        cmd += ["-k", "gthread", "--threads", str(args.threads), "app:app"]
+    log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 90
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"gunicorn exited with {proc.returncode} (use --server-log to see why)")
+        try:
+            if requests.get(base_url + "/stats", timeout=2).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise SystemExit("gunicorn did not become ready within 90 s")
+
+
+def run_level(base_url: str, concurrency: int, duration: float, mix: dict, seed: int) -> list:
+    """Closed loop with `concurrency` virtual users for `duration` s; returns (kind, status, ms) per request."""
+    kinds, weights = zip(*mix.items())
+    samples = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def user(n: int):
+        rng = random.Random(seed * 100003 + concurrency * 1009 + n)
+        session = requests.Session()
+        session.headers["User-Agent"] = f"load-test-user-{concurrency}-{n}-{seed}"
+        local = []
+        while time.monotonic() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            path, kwargs = make_request(kind, rng)
+            t = time.perf_counter()
+            try:
+                status = session.post(base_url + path, timeout=120, **kwargs).status_code
+            except requests.RequestException:
+                status = 0  # connection error / timeout
+            local.append((kind, status, (time.perf_counter() - t) * 1000))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(concurrency: int, samples: list, duration: float) -> dict:
+    ok = [ms for _, status, ms in samples if 200 <= status < 400]
+    limited = sum(1 for _, status, _ in samples if status == 429)
+    errors = sum(1 for _, status, _ in samples if not (200 <= status < 400) and status != 429)
+    total = len(samples) or 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "rps": round(len(ok) / duration, 1),
+        "p50_ms": round(percentile(ok, 50), 1),
+        "p95_ms": round(percentile(ok, 95), 1),
+        "p99_ms": round(percentile(ok, 99), 1),
+        "error_rate": round(errors / total, 4),
+        "rate_limited": round(limited / total, 4),
+        "p50_by_type": {
+            kind: round(percentile([ms for k, status, ms in samples if k == kind and 200 <= status < 400], 50), 1)
+            for kind in sorted({k for k, _, _ in samples})
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4, help="threads per gthread worker")
+    parser.add_argument("--asgi", action="store_true", help="serve asgi:application with uvicorn workers instead")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma-separated virtual-user counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per level")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="browse")
+    parser.add_argument("--mix", help="custom weights, e.g. search=60,load_more=30,filter=10")
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0, help="fake OpenAI response delay")
+    parser.add_argument("--site-latency-ms", type=float, default=200.0, help="fixture site response delay")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-log", help="write gunicorn/app output here")
+    parser.add_argument("--json", help="also write the curve to this file")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else PROFILES[args.profile]
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    site = FixtureSite(latency_ms=args.site_latency_ms).start()
+    openai = FakeOpenAI(latency_ms=args.llm_latency_ms).start()
+    proc, base_url = start_server(args, site, openai)
+    server = f"asgi, {args.workers} uvicorn worker(s)" if args.asgi else f"{args.workers} gthread worker(s) x {args.threads} threads"
+    print(f"{server}; mix {mix}; injected latency: LLM {args.llm_latency_ms:g} ms, site {args.site_latency_ms:g} ms")
+
+    curve = []
+    try:
+        print(f"{'users':>5} {'reqs':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'429s':>7}  p50 by type")
+        for level in levels:
+            row = summarize(level, run_level(base_url, level, args.duration, mix, args.seed), args.duration)
+            curve.append(row)
+            by_type = " ".join(f"{k}={v:g}" for k, v in row["p50_by_type"].items())
+            print(f"{level:5} {row['requests']:6} {row['rps']:7.1f} {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} "
+                  f"{row['p99_ms']:8.1f} {row['error_rate']:7.1%} {row['rate_limited']:7.1%}  {by_type}")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        site.stop()
+        openai.stop()
+
+    served = [r for r in curve if r["p95_ms"]]
+    if served:
+        floor = min(r["p95_ms"] for r in served)
+        knee = next((r for r in served if r["p95_ms"] > 2 * floor), None)
+        best = max(served, key=lambda r: r["rps"])
+        print(f"\npeak {best['rps']} req/s at {best['concurrency']} users; "
+              + (f"p95 doubles at {knee['concurrency']} users ({knee['p95_ms']} ms)" if knee else "p95 never doubled"))
+    print(f"stand-in requests: site {site.requests}, openai {openai.requests}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"server": server, "mix": mix, "llm_latency_ms": args.llm_latency_ms,
+                       "site_latency_ms": args.site_latency_ms, "duration": args.duration, "curve": curve}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
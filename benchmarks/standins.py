@@ -0,0 +1,207 @@
+"""Local stand-ins for 2nd Swing and the OpenAI API, for benchmarks that must not touch the network.
+
+FixtureSite serves the saved listing pages in benchmarks/fixtures/html/ for
+the same paths the app requests on www.2ndswing.com (point SCRAPE_ORIGIN at
+it). FakeOpenAI is an OpenAI-compatible /v1/chat/completions endpoint that
+streams deterministic canned answers, chosen from the request the same way
+the real model would read it (point OPENAI_BASE_URL at it). Both can add a
+fixed latency to every response.
+
+Usage (from the repo root), to run the app against them by hand:
+    python -m benchmarks.standins [--site-port 8801] [--openai-port 8802] [--latency-ms 0]
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURE_DIR = os.path.join("benchmarks", "fixtures", "html")
+
+# Listing path on 2nd Swing -> (page 1 fixture, later pages fixture)
+PATH_FIXTURES = {
+    "/golf-clubs/drivers": ("drivers_p1.html", "drivers_filtered_p2.html"),
+    "/golf-clubs/fairway-woods": ("fairway-woods_p1.html", "fairway-woods_p1.html"),
+    "/golf-clubs/hybrids": ("hybrids_p1.html", "hybrids_p1.html"),
+    "/golf-clubs/iron-sets": ("iron-sets_p1.html", "iron-sets_p1.html"),
+    "/golf-clubs/wedges": ("wedges_p1.html", "wedges_last_page.html"),
+    "/golf-clubs/putters": ("putters_p1.html", "putters_no_next_button.html"),
+    "/golf-clubs/single-iron": ("single-irons_p1.html", "single-irons_p1.html"),
+    "/golf-clubs/utility-iron": ("utility-irons_p1.html", "utility-irons_p1.html"),
+    "/catalogsearch/result": ("drivers_search_g430.html", "drivers_search_g430.html"),
+}
+
+BRANDS = ["Ping", "TaylorMade", "Titleist", "Callaway", "Cobra", "Mizuno", "Cleveland", "PXG", "Srixon", "Odyssey", "Scotty Cameron"]
+_MODEL_TOKEN_RE = re.compile(r"\b(?=[a-z]*\d)(?=\d*[a-z])[a-z0-9]{2,}\b", re.I)  # g430, p790, qi10
+_UNDER_RE = re.compile(r"under \$?(\d+)", re.I)
+_REFERENCE_URL_RE = re.compile(r"https://www\.2ndswing\.com/golf-clubs/[^\s?\"]+")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _StandIn:
+    """A ThreadingHTTPServer on a background thread; base_url is known after start()."""
+
+    handler = None
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0):
+        self.port = port
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        stand_in = self
+
+        class Handler(self.handler):
+            pass
+
+        Handler.stand_in = stand_in
+        self._server = _Server(("127.0.0.1", self.port), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _count(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real site and API
+    stand_in = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _SiteHandler(_QuietHandler):
+    def do_GET(self):
+        self.stand_in._count()
+        parts = urlsplit(self.path)
+        fixtures = PATH_FIXTURES.get(parts.path.rstrip("/"))
+        if fixtures is None:
+            self._send(404, b"not found", "text/plain")
+            return
+        page = int((parse_qs(parts.query).get("p") or ["1"])[0] or 1)
+        with open(os.path.join(FIXTURE_DIR, fixtures[0] if page <= 1 else fixtures[1]), "rb") as f:
+            self._send(200, f.read(), "text/html; charset=utf-8")
+
+
+class FixtureSite(_StandIn):
+    """Saved 2nd Swing listing pages served by path (page 2+ gets the later-page fixture)."""
+
+    handler = _SiteHandler
+
+
+def canned_answer(request: dict) -> str:
+    """The deterministic reply for one chat request, keyed on what the app asked for."""
+    system = request["messages"][0]["content"]
+    query = request["messages"][-1]["content"]
+    if request.get("max_tokens") == 2:  # classify: model-specific?
+        return "1" if _MODEL_TOKEN_RE.search(query) else "0"
+    if "List of official models:" in system:  # extract_models: map to the first candidate
+        candidates = [line.strip() for line in system.split("List of official models:", 1)[1].splitlines() if line.strip()]
+        return f"{query}={candidates[0]}" if candidates else ""
+    if (request.get("response_format") or {}).get("type") == "json_object":  # build_filters
+        filters = {}
+        brand = next((b for b in BRANDS if b.lower() in query.lower()), None)
+        if brand:
+            filters["g2_brand"] = [brand]
+        if "left" in query.lower():
+            filters["g2_dexterity"] = ["Left Handed"]
+        m = _UNDER_RE.search(query)
+        if m:
+            filters["price"] = [f"0-{m.group(1)}"]
+        model = _MODEL_TOKEN_RE.search(query)
+        return json.dumps({"filters": filters, "sort": None, "q": model.group(0) if model else None})
+    m = _REFERENCE_URL_RE.search(system)  # build_url: the prompt's first listing URL
+    return m.group(0) if m else "https://www.2ndswing.com/golf-clubs/drivers"
+
+
+class _OpenAIHandler(_QuietHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, b'{"error": {"message": "not found"}}', "application/json")
+            return
+        self.stand_in._count()
+        answer = canned_answer(body)
+        prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": max(1, len(answer) // 4),
+            "total_tokens": prompt_tokens + max(1, len(answer) // 4),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0, "model": body.get("model", "")}
+        if not body.get("stream"):
+            reply = dict(base, object="chat.completion", usage=usage, choices=[
+                {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"},
+            ])
+            self._send(200, json.dumps(reply).encode(), "application/json")
+            return
+        events = [
+            dict(base, choices=[{"index": 0, "delta": {"role": "assistant", "content": answer}, "finish_reason": None}]),
+            dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]),
+        ]
+        if (body.get("stream_options") or {}).get("include_usage"):
+            events.append(dict(base, choices=[], usage=usage))
+        payload = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        self._send(200, payload.encode(), "text/event-stream")
+
+
+class FakeOpenAI(_StandIn):
+    """OpenAI-compatible chat completions (streamed or not) answering with canned_answer()."""
+
+    handler = _OpenAIHandler
+
+    @property
+    def api_base(self) -> str:
+        return self.base_url + "/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--site-port", type=int, default=8801)
+    parser.add_argument("--openai-port", type=int, default=8802)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response of both servers")
+    args = parser.parse_args()
+
+    site = FixtureSite(args.site_port, args.latency_ms).start()
+    openai = FakeOpenAI(args.openai_port, args.latency_ms).start()
+    print(f"SCRAPE_ORIGIN={site.base_url} OPENAI_BASE_URL={openai.api_base} OPENAI_API_KEY=bench")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
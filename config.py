@@ -8,6 +8,7 @@ FLASK_DEBUG = True
 
 # Rate Limiting
 RATE_LIMIT = "350 per hour"
+SEARCH_RATE_LIMIT = "100 per hour"  # routes that may call the LLM (POST / and /api/search)
 
 # OpenAI Configuration
 OPENAI_MODEL = "gpt-4.1"  # Default model
@@ -17,6 +18,136 @@ CLASSIFICATION_MODEL = "gpt-4.1"  # Fast model for classification (model-specifi
 EXTRACTION_MODEL = "gpt-4.1"  # Model for extracting/mapping model names
 URL_BUILDING_MODEL = "gpt-4.1"  # Model for building search URLs
 
+# Query -> URL cache (skips both LLM calls for repeat searches)
+QUERY_CACHE_ENABLED = True
+QUERY_CACHE_TTL_SECS = 24 * 3600  # Listings change, URL mappings don't; a day is plenty
+QUERY_CACHE_MAX_ENTRIES = 5000  # In-process backend only; Redis relies on its maxmemory policy
+
+# PRG results store behind ?rid= (render-once); shared via Redis when REDIS_URL is set
+RESULTS_STORE_TTL_SECS = 300
+RESULTS_STORE_MAX_ENTRIES = 2000  # oldest results are evicted beyond this
+
+# When the query names another club type than the selected one ("ping putter" with Driver
+# selected), search that club type too, in the background, and keep its results in the
+# results store so "Yes, search with Putters" shows them without a second search
+ALTERNATE_SEARCH_ENABLED = True
+ALTERNATE_SEARCH_WORKERS = 4
+
+# Rule-based URL builder for queries made only of known filter vocabulary (skips the LLM)
+RULE_FAST_PATH_ENABLED = True
+
+# Local model-name index (model_data/*.txt) replaces the classification LLM call;
+# the LLM classifier only runs when the local match is ambiguous
+LOCAL_CLASSIFIER_ENABLED = True
+
+# Model-name mapping (extract_and_map_models): only the top-k most similar official
+# names go into the prompt; 0 sends the whole model_data list
+EXTRACTION_TOP_K = 40
+# Append exact g2_model[i] filters for MODEL_SPECIFIC queries (listing page) instead of q=
+USE_MODEL_FILTERS = False
+
+# How the URL-building LLM call answers: "json" returns {"filters", "sort", "q"} and the
+# URL is assembled from the prompts_v2 schema; "url" has the model write the URL itself
+URL_BUILD_MODE = "json"
+
+# Speculative mode: when the LLM classifier is needed, start it together with both
+# URL-builder variants (MODEL_SPECIFIC and GENERIC) and keep the one it picks.
+# ~2x URL-building tokens for one fewer round-trip on the critical path.
+SPECULATIVE_URL_BUILD = False
+SPECULATIVE_POOL_SIZE = 24  # 3 calls per in-flight request
+
+# Scrape result cache keyed by canonical URL, with stale-while-revalidate
+SCRAPE_CACHE_ENABLED = True
+SCRAPE_CACHE_BACKEND = "memory"  # "memory", "redis" (uses REDIS_URL) or "disk"
+SCRAPE_CACHE_TTL_SECS = 120  # served as fresh for this long
+SCRAPE_CACHE_STALE_SECS = 600  # then served stale (instantly) while a background refresh runs
+SCRAPE_CACHE_MAX_ENTRIES = 500  # ~25 products per page; memory/disk backends only
+SCRAPE_CACHE_DIR = ".cache"  # disk backend writes to <dir>/scrape/
+SCRAPE_REFRESH_WORKERS = 4
+SCRAPE_PARSER = "lxml"  # "lxml" (C parser, falls back to bs4 if not installed) or "bs4"
+SCRAPE_PARSE_WORKERS = 4  # threads parsing HTML for the async app (asgi.py)
+# Check every URL against the club type's filter schema before fetching it: unknown params
+# and values are dropped, spelling fixed, the rest re-encoded canonically; other hosts are
+# never fetched (services/filter_schema.py validate_url)
+URL_VALIDATION_ENABLED = True
+
+# Single-flight: concurrent identical searches share one LLM build (keyed on normalized
+# query + club type) and one upstream fetch (keyed on canonical URL) (services/singleflight.py)
+SINGLEFLIGHT_ENABLED = True
+SINGLEFLIGHT_REDIS = False  # also coalesce across workers with a Redis lock (needs REDIS_URL)
+SINGLEFLIGHT_LOCK_TTL_SECS = 30  # lock expiry if the holder dies
+SINGLEFLIGHT_WAIT_SECS = 20  # max wait for another worker before computing it ourselves
+SINGLEFLIGHT_POLL_SECS = 0.05
+
+# Near-duplicate query cache (services/semantic_cache.py): a paraphrase of an earlier
+# LLM-built query reuses its URL; tune with benchmarks/eval_semantic_cache.py
+SEMANTIC_CACHE_ENABLED = True
+SEMANTIC_CACHE_THRESHOLD = 0.7  # min cosine similarity; 0 wrong URLs down to 0.5 on the bundled eval set
+SEMANTIC_CACHE_MAX_ENTRIES = 2000  # per process, oldest replaced first
+SEMANTIC_CACHE_DIMS = 1024  # hashed feature buckets (2000 x 1024 float32 = 8 MB with numpy)
+
+# Background prefetch of next_page_url for /load_more (services/prefetch.py); prefetched
+# pages are kept in the scrape cache, so this needs SCRAPE_CACHE_ENABLED
+PREFETCH_ENABLED = True
+PREFETCH_DEPTH = 1  # pages ahead to prefetch after each search / load_more
+PREFETCH_WORKERS = 4
+PREFETCH_MAX_INFLIGHT = 32  # beyond this, new prefetches are dropped
+
+# Opt-in "fetch all" mode (POST /load_all, services/fetch_all.py): pages 2..N of a
+# search fetched concurrently and merged, sorted and filtered locally
+FETCH_ALL_ENABLED = True
+FETCH_ALL_MAX_PAGES = 10  # larger result sets are truncated (reported as truncated)
+FETCH_ALL_CONCURRENCY = 4  # page fetches in flight per process (still under SCRAPE_MAX_CONCURRENCY)
+
+# Batch search (services/batch.py): many (query, club type) pairs through classify -> build
+# -> scrape for prompt evaluation and cache warm-up, via `python -m services.batch` or
+# POST /api/batch; the endpoint only exists when BATCH_API_TOKEN is set
+BATCH_API_TOKEN = os.environ.get("BATCH_API_TOKEN")  # sent as "Authorization: Bearer <token>"
+BATCH_CONCURRENCY = 4  # default searches in flight per batch
+BATCH_MAX_CONCURRENCY = 16  # upper bound a request or --concurrency can ask for
+BATCH_MAX_ITEMS = 1000  # per /api/batch request (the CLI has no limit)
+
+# Local inventory snapshot (services/inventory.py): every listing product of each club type
+# crawled into SQLite; listing URLs whose filters it can evaluate are answered from it,
+# everything else (and stale snapshots) falls back to the live scrape
+INVENTORY_ENABLED = False  # needs a crawl first: python -m services.inventory crawl
+INVENTORY_DB = ".cache/inventory.sqlite3"
+INVENTORY_MAX_AGE_SECS = 6 * 3600  # older snapshots are not served
+INVENTORY_CRAWL_MAX_PAGES = 250  # per club type
+INVENTORY_COMPLETE_TOLERANCE = 0.02  # fraction of the site's total a crawl may miss (the listing shifts mid-walk)
+INVENTORY_CRAWL_IN_APP = False  # also re-crawl on a background thread in each app process
+INVENTORY_CRAWL_INTERVAL_SECS = 3 * 3600
+
+# Outbound HTTP to www.2ndswing.com (services/http_client.py)
+SCRAPE_ORIGIN = os.environ.get("SCRAPE_ORIGIN", "https://www.2ndswing.com")  # where fetches go; links keep the real site (benchmarks point this at a local stand-in)
+SCRAPE_POOL_SIZE = 20  # keep-alive connections per process
+SCRAPE_MAX_CONCURRENCY = 8  # simultaneous upstream requests per process
+SCRAPE_RATE_PER_SEC = 10.0  # token bucket refill rate; 0 disables the bucket
+SCRAPE_BURST = 20
+SCRAPE_RETRIES = 2  # extra attempts on 429/5xx and connection errors
+SCRAPE_BACKOFF_SECS = 0.5  # doubled per attempt (with jitter); Retry-After wins
+SCRAPE_TIMEOUT_SECS = 10
+
+# OpenAI client timeouts and connection limits
+OPENAI_TIMEOUT_SECS = 30
+OPENAI_CONNECT_TIMEOUT_SECS = 5
+OPENAI_MAX_RETRIES = 2
+OPENAI_MAX_CONNECTIONS = 50
+OPENAI_MAX_KEEPALIVE = 20
+
+# Prompt registry: seconds between mtime checks on textdocs/ and model_data/ files
+PROMPT_RELOAD_CHECK_SECS = 2.0
+
+# Mixpanel events are queued and sent in batches by a background thread (services/telemetry.py)
+TELEMETRY_QUEUE_SIZE = 1000  # events beyond this are dropped instead of blocking requests
+TELEMETRY_BATCH_SIZE = 50  # flush when this many events are buffered (Mixpanel max is 50)...
+TELEMETRY_FLUSH_SECS = 5.0  # ...or after this many seconds, whichever comes first
+TELEMETRY_TIMEOUT_SECS = 5  # per batch POST to api.mixpanel.com
+TELEMETRY_SHUTDOWN_SECS = 5.0  # max wait to flush the queue at exit
+
+# Latency histogram buckets (ms) for /metrics (services/metrics.py)
+METRICS_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
 # Debug Configuration
 DEBUG_DUMP_SYSTEM_PROMPT = True  # Set to False to disable system prompt logging
 
@@ -0,0 +1,231 @@
+"""Batch search: many (query, club type) pairs through classify -> build -> scrape.
+
+For re-running a query set after a prompt edit, or warming the query and
+scrape caches ahead of traffic. Items run on a bounded thread pool (at most
+`concurrency` searches in flight, capped at BATCH_MAX_CONCURRENCY) through
+the same build_search_url and scrape_with_status the app uses, so the
+rule fast path, caches, single-flight and the upstream concurrency limits
+all apply. Results are yielded in completion order, one dict per item with
+its index, generated URL, source and per-stage timings.
+
+Batch searches are not sent to Mixpanel: they are not user searches.
+
+Usage (from the repo root; JSONL on stdout, app logging on stderr):
+    python -m services.batch --placeholders                   # every placeholder line, its own club type
+    python -m services.batch queries.jsonl --concurrency 8 --out run.jsonl
+    python -m services.batch --placeholders --no-scrape --baseline run.jsonl   # which URLs a prompt edit changed
+
+An input file has one JSON object per line with "user_query" (or "query")
+and "club_type". The same runs over HTTP with POST /api/batch when
+BATCH_API_TOKEN is set (see app.py).
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from config import (
+    PLACEHOLDERS, CLUB_PROMPT_FILES, BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY,
+    QUERY_CACHE_ENABLED, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECS,
+)
+from services.cache import make_cache
+from services.model_index import load_model_indexes
+from services.search_pipeline import build_search_url
+from services.scraper import scrape_with_status
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# textdocs/placeholder-text/<slug>.txt -> club type (same map as the page's placeholder rotator)
+PLACEHOLDER_CLUB_TYPES = {
+    "driver": "Driver",
+    "fairway": "Fairway Woods",
+    "hybrid": "Hybrids",
+    "ironset": "Iron Sets",
+    "wedge": "Wedges",
+    "putter": "Putters",
+    "singleiron": "Single Irons",
+    "utility": "Utility Irons",
+}
+
+STATS = {"batches": 0, "items": 0, "errors": 0, "empty_urls": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        STATS[key] += n
+
+
+def batch_stats() -> dict:
+    with _stats_lock:
+        return dict(STATS)
+
+
+def placeholder_items(club_types=None) -> list:
+    """(query, club_type) for every placeholder line, optionally only for some club types."""
+    items = []
+    for slug, club_type in PLACEHOLDER_CLUB_TYPES.items():
+        if club_types and club_type not in club_types:
+            continue
+        items.extend((query, club_type) for query in PLACEHOLDERS.get(slug, []))
+    return items
+
+
+def parse_items(rows) -> list:
+    """(query, club_type) from dicts with "user_query" (or "query") and "club_type".
+
+    Raises ValueError naming the first row that is missing either or has an unknown club type.
+    """
+    items = []
+    for n, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"item {n}: expected an object")
+        query = (row.get("user_query") or row.get("query") or "").strip()
+        club_type = row.get("club_type")
+        if not query:
+            raise ValueError(f"item {n}: user_query is required")
+        if club_type not in CLUB_PROMPT_FILES:
+            raise ValueError(f"item {n}: unknown club_type {club_type!r}")
+        items.append((query, club_type))
+    return items
+
+
+def load_items(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return parse_items(json.loads(line) for line in f if line.strip())
+
+
+def run_item(index: int, user_query: str, club_type: str, cache=None, scrape: bool = True) -> dict:
+    """One search; errors are reported in the result instead of raised."""
+    t_start = time.perf_counter()
+    result = {"index": index, "user_query": user_query, "club_type": club_type}
+    try:
+        search = build_search_url(user_query, club_type, cache=cache)
+        result["generated_url"] = search["generated_url"]
+        result["source"] = search["source"]
+        result["is_model_specific"] = search["classification"].get("is_model_specific")
+        timings = {stage: round(ms, 1) for stage, ms in search["timings"].items()}
+        if not search["generated_url"]:
+            _count("empty_urls")
+        elif scrape:
+            t_scrape = time.perf_counter()
+            (products, total_count, _, _, no_results), ok = scrape_with_status(search["generated_url"])
+            timings["scrape_ms"] = round((time.perf_counter() - t_scrape) * 1000, 1)
+            result.update(scrape_ok=ok, total_count=total_count, product_count=len(products), no_results=no_results)
+        result["timings"] = timings
+    except Exception as e:
+        print(f"[BATCH] item {index} error:", e)
+        _count("errors")
+        result["error"] = str(e)
+    result["elapsed_ms"] = round((time.perf_counter() - t_start) * 1000, 1)
+    return result
+
+
+def run_batch(items, concurrency: int = BATCH_CONCURRENCY, cache=None, scrape: bool = True):
+    """Yield run_item results for (query, club_type) items as they finish, with at most
+    `concurrency` in flight; items are submitted as slots free up, not all at once."""
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    _count("batches")
+    pending = set()
+    items = iter(enumerate(items))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+        while True:
+            for index, (user_query, club_type) in items:
+                pending.add(pool.submit(run_item, index, user_query, club_type, cache, scrape))
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                _count("items")
+                yield future.result()
+
+
+def to_jsonl(result: dict) -> bytes:
+    line = orjson.dumps(result) if orjson is not None else json.dumps(result).encode("utf-8")
+    return line + b"\n"
+
+
+def summarize(results: list, wall_secs: float) -> dict:
+    elapsed = sorted(r["elapsed_ms"] for r in results)
+    sources = {}
+    for r in results:
+        sources[r.get("source", "error")] = sources.get(r.get("source", "error"), 0) + 1
+
+    def pct(p):
+        return elapsed[min(len(elapsed) - 1, int(round(p / 100 * (len(elapsed) - 1))))] if elapsed else 0.0
+
+    return {
+        "items": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "empty_urls": sum(1 for r in results if "error" not in r and not r["generated_url"]),
+        "sources": sources,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "wall_secs": round(wall_secs, 2),
+        "items_per_sec": round(len(results) / wall_secs, 2) if wall_secs else 0.0,
+    }
+
+
+def load_baseline(path: str) -> dict:
+    """(query, club_type) -> generated_url from an earlier run's output."""
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return {(r["user_query"], r["club_type"]): r.get("generated_url") for r in rows if "user_query" in r}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="JSONL of {user_query, club_type}")
+    parser.add_argument("--placeholders", action="store_true", help="run every line of textdocs/placeholder-text/")
+    parser.add_argument("--club-type", action="append", choices=list(CLUB_PROMPT_FILES), help="only these club types")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--no-scrape", action="store_true", help="stop after building the URL")
+    parser.add_argument("--no-cache", action="store_true", help="skip the query cache (always rebuild)")
+    parser.add_argument("--baseline", help="earlier output; adds url_changed to each result")
+    parser.add_argument("--out", help="write JSONL here instead of stdout")
+    args = parser.parse_args()
+    if not args.path and not args.placeholders:
+        parser.error("give an input file or --placeholders")
+
+    items = placeholder_items() if args.placeholders else []
+    if args.path:
+        items += load_items(args.path)
+    if args.club_type:
+        items = [item for item in items if item[1] in args.club_type]
+    baseline = load_baseline(args.baseline) if args.baseline else None
+
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    # The pipeline logs with print(); keep stdout for the JSONL
+    with contextlib.redirect_stdout(sys.stderr):
+        load_model_indexes()
+        # Same backend the app picks, so a warm-up run with REDIS_URL set fills the shared cache
+        cache = None
+        if QUERY_CACHE_ENABLED and not args.no_cache:
+            cache = make_cache("q2u", QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_TTL_SECS, os.environ.get("REDIS_URL"))
+
+        results = []
+        t_start = time.perf_counter()
+        for result in run_batch(items, args.concurrency, cache, scrape=not args.no_scrape):
+            if baseline is not None and (result["user_query"], result["club_type"]) in baseline:
+                result["url_changed"] = result.get("generated_url") != baseline[(result["user_query"], result["club_type"])]
+            out.write(to_jsonl(result))
+            out.flush()
+            results.append(result)
+        summary = summarize(results, time.perf_counter() - t_start)
+        if baseline is not None:
+            summary["url_changed"] = sum(1 for r in results if r.get("url_changed"))
+    if args.out:
+        out.close()
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
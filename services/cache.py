@@ -0,0 +1,413 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-process cache with LRU eviction and per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_secs: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_secs = ttl_secs
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at < now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            # Mark as most recently used
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str) -> bool:
+        """True if key holds an unexpired value (doesn't touch LRU order or counters)."""
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[0] >= time.time()
+
+    def set(self, key: str, value, ttl_secs: int = None):
+        expires_at = time.time() + (ttl_secs if ttl_secs is not None else self.ttl_secs)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class RedisCache:
+    """Redis-backed cache shared across workers. Values are stored as JSON with a TTL.
+
+    LRU eviction is left to the Redis server's maxmemory policy (e.g. allkeys-lru).
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, redis_client, prefix: str, ttl_secs: int = 3600):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.ttl_secs = ttl_secs
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get(self, key: str):
+        try:
+            raw = self.redis.get(self._key(key))
+        except Exception as e:
+            print("Redis cache get error:", e)
+            self.errors += 1
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value, ttl_secs: int = None):
+        try:
+            self.redis.setex(self._key(key), ttl_secs if ttl_secs is not None else self.ttl_secs, json.dumps(value))
+        except Exception as e:
+            print("Redis cache set error:", e)
+            self.errors += 1
+
+    def delete(self, key: str):
+        try:
+            self.redis.delete(self._key(key))
+        except Exception as e:
+            print("Redis cache delete error:", e)
+            self.errors += 1
+
+    def clear(self):
+        try:
+            for k in self.redis.scan_iter(f"{self.prefix}:*"):
+                self.redis.delete(k)
+        except Exception as e:
+            print("Redis cache clear error:", e)
+            self.errors += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "prefix": self.prefix,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class DiskCache:
+    """JSON-file-per-key cache in a local directory; survives restarts, shared by workers on one host.
+
+    Oldest files are pruned once the directory holds more than max_entries.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1024, ttl_secs: int = 3600):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl_secs = ttl_secs
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                item = json.load(f)
+        except FileNotFoundError:
+            item = None
+        except Exception as e:
+            print("Disk cache get error:", e)
+            self.errors += 1
+            item = None
+        if item is None or item["expires_at"] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item["value"]
+
+    def set(self, key: str, value, ttl_secs: int = None):
+        expires_at = time.time() + (ttl_secs if ttl_secs is not None else self.ttl_secs)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "value": value}, f)
+            os.replace(tmp, path)  # atomic, so readers never see a half-written file
+        except Exception as e:
+            print("Disk cache set error:", e)
+            self.errors += 1
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 64 == 0
+        if prune:
+            self._prune()
+
+    def _prune(self):
+        try:
+            files = [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(".json")]
+            if len(files) <= self.max_entries:
+                return
+            files.sort(key=os.path.getmtime)
+            for path in files[:len(files) - self.max_entries]:
+                os.remove(path)
+                self.evictions += 1
+        except Exception as e:
+            print("Disk cache prune error:", e)
+            self.errors += 1
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "disk",
+            "directory": self.directory,
+            "entries": sum(1 for n in os.listdir(self.directory) if n.endswith(".json")),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class ResultStore:
+    """Render-once store for PRG results (?rid=): size-capped, fixed TTL, O(1) amortized expiry.
+
+    Every entry has the same TTL, so insertion order is expiry order: expired
+    entries are always at the front of the OrderedDict and are popped from
+    there, never found by scanning. Values are kept as JSON so their size is
+    known exactly (reported as bytes).
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_secs: int = 300):
+        self.max_entries = max_entries
+        self.ttl_secs = ttl_secs
+        self._data = OrderedDict()  # rid -> (expires_at, json), oldest first
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def _drop_oldest(self):
+        _, (_, raw) = self._data.popitem(last=False)
+        self.bytes -= len(raw)
+
+    def _expire(self, now: float):
+        while self._data and next(iter(self._data.values()))[0] < now:
+            self._drop_oldest()
+            self.expired += 1
+
+    def put(self, rid: str, data: dict):
+        raw = json.dumps(data)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._data[rid] = (now + self.ttl_secs, raw)
+            self.bytes += len(raw)
+            self.puts += 1
+            while len(self._data) > self.max_entries:
+                self._drop_oldest()
+                self.evictions += 1
+
+    def pop(self, rid: str):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            item = self._data.pop(rid, None)
+            if item is None:
+                self.misses += 1
+                return None
+            self.bytes -= len(item[1])
+            self.hits += 1
+        return json.loads(item[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.time())
+            entries = len(self._data)
+        return {
+            "backend": "memory",
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "puts": self.puts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+class RedisResultStore:
+    """ResultStore shared across workers and instances; Redis expires keys itself."""
+
+    def __init__(self, redis_client, prefix: str = "rid", ttl_secs: int = 300):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.ttl_secs = ttl_secs
+        self.bytes_written = 0
+        self.puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def put(self, rid: str, data: dict):
+        raw = json.dumps(data)
+        try:
+            self.redis.setex(f"{self.prefix}:{rid}", self.ttl_secs, raw)
+            self.puts += 1
+            self.bytes_written += len(raw)
+        except Exception as e:
+            print("Redis result store put error:", e)
+            self.errors += 1
+
+    def pop(self, rid: str):
+        key = f"{self.prefix}:{rid}"
+        try:
+            pipe = self.redis.pipeline()  # GET + DEL in one MULTI, works on Redis < 6.2 (no GETDEL)
+            pipe.get(key)
+            pipe.delete(key)
+            raw = pipe.execute()[0]
+        except Exception as e:
+            print("Redis result store pop error:", e)
+            self.errors += 1
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def stats(self) -> dict:
+        out = {
+            "backend": "redis",
+            "prefix": self.prefix,
+            "puts": self.puts,
+            "bytes_written": self.bytes_written,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+        try:
+            out["redis_used_memory"] = self.redis.info("memory").get("used_memory")
+        except Exception:
+            pass
+        return out
+
+
+def make_result_store(max_entries: int, ttl_secs: int, redis_url: str = None):
+    """RedisResultStore when redis_url is reachable (so ?rid= works on any worker), else a ResultStore."""
+    if redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url, socket_timeout=2)
+            client.ping()
+            print("[CACHE] results: using Redis backend")
+            return RedisResultStore(client, "rid", ttl_secs)
+        except Exception as e:
+            print(f"[CACHE] results: Redis unavailable ({e}), falling back to in-process store")
+    return ResultStore(max_entries=max_entries, ttl_secs=ttl_secs)
+
+
+def make_cache(prefix: str, max_entries: int, ttl_secs: int, redis_url: str = None, disk_dir: str = None):
+    """Return a Redis-backed cache when redis_url is reachable, a DiskCache when disk_dir
+    is given, else an in-process TTLCache."""
+    if redis_url:
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url, socket_timeout=2)
+            client.ping()
+            print(f"[CACHE] {prefix}: using Redis backend")
+            return RedisCache(client, prefix, ttl_secs)
+        except Exception as e:
+            print(f"[CACHE] {prefix}: Redis unavailable ({e}), falling back to in-process cache")
+    if disk_dir:
+        try:
+            cache = DiskCache(os.path.join(disk_dir, prefix), max_entries=max_entries, ttl_secs=ttl_secs)
+            print(f"[CACHE] {prefix}: using disk backend at {cache.directory}")
+            return cache
+        except Exception as e:
+            print(f"[CACHE] {prefix}: disk cache unavailable ({e}), falling back to in-process cache")
+    return TTLCache(max_entries=max_entries, ttl_secs=ttl_secs)
+
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(user_query: str) -> str:
+    """Lowercase, trim and collapse whitespace so trivially different queries share a key."""
+    return _WS_RE.sub(" ", (user_query or "").strip().lower())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:12]
+
+
+def query_cache_key(user_query: str, club_type: str, prompt_hash: str) -> str:
+    """Cache key for LLM results: normalized query + club type + prompt file hash."""
+    raw = f"{normalize_query(user_query)}|{club_type}|{prompt_hash}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
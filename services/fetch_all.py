@@ -0,0 +1,157 @@
+"""Opt-in "fetch all" mode: every result page of a search, merged locally.
+
+Page 1 tells us total_count and the page size, so the remaining pages 2..N
+are known up front and fetched concurrently (FETCH_ALL_CONCURRENCY at a
+time, still going through the scrape cache and the outbound limiter in
+services/http_client.py). The product dicts are merged in page order,
+de-duplicated, and price sorting / attribute filters are applied here
+instead of round-tripping through 2nd Swing for each change.
+"""
+import math
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+from config import FETCH_ALL_MAX_PAGES, FETCH_ALL_CONCURRENCY
+from services.filter_schema import encode_params
+from services.scraper import scrape_with_status
+
+_pool = ThreadPoolExecutor(max_workers=FETCH_ALL_CONCURRENCY, thread_name_prefix="fetch-all")
+_PRICE_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+LOCAL_SORTS = ("price_asc", "price_desc")
+
+STATS = {"requests": 0, "pages_fetched": 0, "page_errors": 0, "truncated": 0, "duplicates_dropped": 0}
+_lock = threading.Lock()
+
+
+def page_url(url: str, page: int) -> str:
+    """Return url pointing at result page `page` (p=1 is dropped, like 2nd Swing does)."""
+    parts = urlsplit(url)
+    pairs = [(k, v) for k, v in parse_qsl(parts.query) if k != "p"]
+    if page > 1:
+        pairs.append(("p", page))
+    base = f"{parts.scheme}://{parts.netloc}{parts.path}"
+    return f"{base}?{encode_params(pairs)}" if pairs else base
+
+
+def product_price(product: dict):
+    """Lowest dollar amount shown on a tile (price, or used/new for parent models), or None."""
+    amounts = []
+    for field in ("price", "used_price", "new_price"):
+        m = _PRICE_RE.search(product.get(field) or "")
+        if m:
+            amounts.append(float(m.group(0).replace(",", "")))
+    return min(amounts) if amounts else None
+
+
+def _identity(product: dict):
+    return product.get("url") or (product.get("brand"), product.get("model"), product.get("price"), product.get("condition"))
+
+
+def merge_pages(pages: list):
+    """Concatenate product lists in page order, dropping repeats; return (products, duplicates)."""
+    seen = set()
+    merged = []
+    for products in pages:
+        for product in products:
+            key = _identity(product)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(product)
+    return merged, sum(len(p) for p in pages) - len(merged)
+
+
+def apply_local(products: list, sort: str = None, attr_filters: dict = None) -> list:
+    """Filter on attrs / condition (case-insensitive equality) and sort by price."""
+    if attr_filters:
+        wanted = {k.lower(): str(v).strip().lower() for k, v in attr_filters.items() if v}
+
+        def keep(product):
+            for key, value in wanted.items():
+                actual = product.get("condition") if key == "condition" else (product.get("attrs") or {}).get(key)
+                if (actual or "").strip().lower() != value:
+                    return False
+            return True
+
+        products = [p for p in products if keep(p)]
+    if sort in LOCAL_SORTS:
+        priced = [p for p in products if product_price(p) is not None]
+        unpriced = [p for p in products if product_price(p) is None]
+        priced.sort(key=product_price, reverse=sort == "price_desc")
+        products = priced + unpriced  # tiles without a price stay at the end either way
+    return products
+
+
+def fetch_all_pages(url: str, max_pages: int = FETCH_ALL_MAX_PAGES, sort: str = None, attr_filters: dict = None) -> dict:
+    """Fetch every page of a search (up to max_pages) and merge them.
+
+    Returns a dict with products, total_count, applied_filters, no_results,
+    pages (fetched), page_count (reported by the site), truncated and
+    failed_pages. If page 1 fails nothing else is fetched (its total_count is
+    what sizes the rest) and failed_pages is [1].
+    """
+    with _lock:
+        STATS["requests"] += 1
+    first_url = page_url(url, 1)
+    (products, total_count, applied_filters, _, no_results), ok = scrape_with_status(first_url)
+    if not ok:
+        with _lock:
+            STATS["page_errors"] += 1
+        print(f"Fetch all: page 1 failed, not fetching the rest: {first_url}")
+        return {
+            "products": [],
+            "total_count": 0,
+            "applied_filters": applied_filters,
+            "no_results": no_results,
+            "pages": 0,
+            "page_count": 0,
+            "truncated": False,
+            "failed_pages": [1],
+        }
+    page_size = len(products)
+    page_count = math.ceil(total_count / page_size) if total_count and page_size else 1
+    pages_to_fetch = min(page_count, max(1, max_pages))
+
+    futures = {page: _pool.submit(scrape_with_status, page_url(url, page)) for page in range(2, pages_to_fetch + 1)}
+    pages = [products]
+    failed = []
+    for page, future in futures.items():
+        try:
+            result, ok = future.result()
+        except Exception as e:
+            print(f"Fetch all: page {page} error:", e)
+            result, ok = None, False
+        if not ok:
+            failed.append(page)
+        if result:
+            pages.append(result[0])
+
+    merged, duplicates = merge_pages(pages)
+    with _lock:
+        STATS["pages_fetched"] += 1 + len(futures) - len(failed)
+        STATS["page_errors"] += len(failed)
+        STATS["duplicates_dropped"] += duplicates
+        if pages_to_fetch < page_count:
+            STATS["truncated"] += 1
+    print(f"Fetch all: {pages_to_fetch}/{page_count} pages, {len(merged)} products ({duplicates} duplicates), failed={failed}")
+
+    return {
+        "products": apply_local(merged, sort, attr_filters),
+        "total_count": total_count,
+        "applied_filters": applied_filters,
+        "no_results": no_results,
+        "pages": pages_to_fetch,
+        "page_count": page_count,
+        "truncated": pages_to_fetch < page_count,
+        "failed_pages": failed,
+    }
+
+
+def fetch_all_stats() -> dict:
+    with _lock:
+        out = dict(STATS)
+    out["max_pages"] = FETCH_ALL_MAX_PAGES
+    out["concurrency"] = FETCH_ALL_CONCURRENCY
+    return out
@@ -0,0 +1,349 @@
+import re
+import threading
+from urllib.parse import quote, quote_plus, unquote_plus, urlsplit, urlunsplit, parse_qsl
+from config import CLUB_PROMPT_FILES
+from services import prompt_registry
+
+SEARCH_URL = "https://www.2ndswing.com/catalogsearch/result"
+
+# Parameters that take a single bare value; everything else is bracket-indexed (param[0]=..)
+SINGLE_VALUE_PARAMS = {"price", "q", "g2_category", "product_list_order", "p"}
+
+# Parameters the prompts don't list under Filters but which are always legal
+EXTRA_PARAMS = {"q", "g2_category", "g2_model", "p", "product_list_order"}
+
+_FILTER_LINE_RE = re.compile(r"^-\s*(?P<label>[^→]+?)\s*→\s*(?P<param>\w+)(?P<rest>.*)$")
+_SORT_LINE_RE = re.compile(r"^-\s*(?P<phrases>.+?)\s*→\s*&?product_list_order=(?P<order>\w+)")
+_CATEGORY_RE = re.compile(r"Include g2_category=(\S+?)\.?$", re.M)
+_REFERENCE_URL_RE = re.compile(r"^https://www\.2ndswing\.com/golf-clubs/\S+\?\S+$", re.M)
+_LISTING_URL_RE = re.compile(r"listing base URL:\s*\n\s*(https://\S+)")
+
+SITE_HOSTS = {"www.2ndswing.com", "2ndswing.com"}
+
+# 2nd Swing's own paging / display parameters, kept on next-page links without a schema check
+SITE_PARAMS = {"p", "product_list_order", "product_list_dir", "product_list_limit", "product_list_mode"}
+
+
+def _split_values(raw: str) -> list:
+    """Split a '(A | B | C)' or '(e.g., A, B)' value list into decoded values."""
+    sep = "|" if "|" in raw else ","
+    values = []
+    for v in raw.split(sep):
+        v = v.strip().rstrip(".").strip()
+        if not v or v == "etc":
+            continue
+        v = unquote_plus(v)
+        if "\ufffd" in v:
+            continue  # mis-encoded example in the prompt text
+        values.append(v)
+    return values
+
+
+def parse_prompt_schema(prompt_text: str) -> dict:
+    """Derive the filter schema for one club type from its prompts_v2 text.
+
+    Returns:
+        {
+            "listing_url": str,      # GENERIC base URL
+            "category": str,         # g2_category for MODEL_SPECIFIC catalog search
+            "params": {param: {"label": str, "values": [str], "open": bool}},
+            "sort_orders": {order: [phrase, ...]}
+        }
+    """
+    params = {}
+    sort_orders = {}
+    section = None
+    for line in prompt_text.splitlines():
+        line = line.strip()
+        if line.startswith(("Filters", "Sorting", "Heuristics", "Encoding")):
+            section = line.split(None, 1)[0]
+            continue
+        if section == "Sorting":
+            m = _SORT_LINE_RE.match(line)
+            if m:
+                phrases = [p.strip().strip('"').lower() for p in m.group("phrases").split(",")]
+                sort_orders[m.group("order")] = [p for p in phrases if p]
+            continue
+        if section != "Filters":
+            continue
+        m = _FILTER_LINE_RE.match(line)
+        if not m or m.group("param") in params:
+            continue
+        rest = m.group("rest")
+        values, is_open = [], True
+        vm = re.search(r"\(([^)]*)\)", rest)
+        if vm and m.group("param") != "price":
+            raw = vm.group(1)
+            # "(e.g., ...)" lists are examples only; "(A | B)" lists are the full vocabulary
+            is_open = raw.lstrip().startswith(("e.g.", "including"))
+            raw = re.sub(r"^\s*(e\.g\.,?|including)\s*", "", raw)
+            values = _split_values(raw)
+        params[m.group("param")] = {"label": m.group("label"), "values": values, "open": is_open}
+
+    # The reference example URL enumerates real values for most filters
+    listing_url = None
+    ref = _REFERENCE_URL_RE.search(prompt_text)
+    if ref:
+        parts = urlsplit(ref.group(0))
+        listing_url = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        for key, value in parse_qsl(parts.query):
+            param = key.split("[", 1)[0]
+            spec = params.setdefault(param, {"label": param, "values": [], "open": True})
+            if param != "price" and value not in spec["values"]:
+                spec["values"].append(value)
+    if not listing_url:
+        lm = _LISTING_URL_RE.search(prompt_text)
+        listing_url = lm.group(1) if lm else ""
+
+    for param in EXTRA_PARAMS:
+        params.setdefault(param, {"label": param, "values": [], "open": True})
+    if "g2_brand" in params:
+        for brand in load_brand_list():
+            if brand not in params["g2_brand"]["values"]:
+                params["g2_brand"]["values"].append(brand)
+    if "price" in params:
+        params["price"]["open"] = True
+
+    cm = _CATEGORY_RE.search(prompt_text)
+    return {
+        "listing_url": listing_url,
+        "category": unquote_plus(cm.group(1)) if cm else "",
+        "params": params,
+        "sort_orders": sort_orders,
+    }
+
+
+def load_brand_list() -> list:
+    """Return the brand names from textdocs/brandlist.txt."""
+    return [ln.strip() for ln in prompt_registry.brand_list().splitlines() if ln.strip()]
+
+
+_SCHEMAS = {}  # club type -> (prompt text it was parsed from, schema)
+
+
+def get_filter_schema(club_type: str) -> dict:
+    """Return the filter schema for a club type, re-parsed when its prompt file changes."""
+    prompt_text = prompt_registry.club_prompt(club_type)
+    cached = _SCHEMAS.get(club_type)
+    if cached is None or cached[0] is not prompt_text:
+        cached = (prompt_text, parse_prompt_schema(prompt_text))
+        _SCHEMAS[club_type] = cached
+    return cached[1]
+
+
+def encode_params(pairs: list) -> str:
+    """Encode (key, value) pairs the way 2nd Swing does: %5B/%5D brackets, + for spaces."""
+    return "&".join(f"{quote(k, safe='')}={quote_plus(str(v), safe='')}" for k, v in pairs)
+
+
+def assemble_url(club_type: str, filters: dict, sort: str = None, model_query: str = None) -> str:
+    """Build a canonical 2nd Swing URL from {param: [values]} filters.
+
+    With model_query the catalog search endpoint is used (MODEL_SPECIFIC shape),
+    otherwise the club type's dedicated listing page (GENERIC shape).
+    """
+    schema = get_filter_schema(club_type)
+    pairs = []
+    if model_query:
+        base = SEARCH_URL
+        pairs.append(("g2_category", schema["category"]))
+    else:
+        base = schema["listing_url"]
+    for param in sorted(filters):
+        values = filters[param]
+        if isinstance(values, str):
+            values = [values]
+        if param in SINGLE_VALUE_PARAMS:
+            if values:
+                pairs.append((param, values[0]))
+            continue
+        for i, value in enumerate(values):
+            pairs.append((f"{param}[{i}]", value))
+    if sort:
+        pairs.append(("product_list_order", sort))
+    if model_query:
+        pairs.append(("q", model_query))
+    return f"{base}?{encode_params(pairs)}" if pairs else base
+
+
+_PRICE_RE = re.compile(r"^\d+(\.\d+)?-\d+(\.\d+)?$")
+
+
+def sanitize_filters(club_type: str, filters: dict, sort: str = None):
+    """Keep only filters the club type's schema allows, in canonical spelling.
+
+    Accepts loosely formatted model output ("g2_brand[0]", "Left+Handed",
+    "ping") and returns (filters, sort, dropped) where dropped lists the
+    "param=value" pairs that were discarded.
+    """
+    schema = get_filter_schema(club_type)
+    params = schema["params"]
+    clean, dropped = {}, []
+    for raw_param, values in (filters or {}).items():
+        param = unquote_plus(str(raw_param)).split("[", 1)[0].strip()
+        if values is None:
+            continue
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        spec = params.get(param)
+        if spec is None or param in ("q", "g2_category", "product_list_order", "p"):
+            dropped.extend(f"{param}={v}" for v in values)
+            continue
+        canonical = {v.lower(): v for v in spec["values"]}
+        for value in values:
+            value = str(value).strip()
+            if value.lower() not in canonical:
+                value = unquote_plus(value).strip()  # "Left+Handed" -> "Left Handed", but keep "+1/2\""
+            if param == "price":
+                value = value.replace("$", "").replace(",", "").replace(" ", "")
+                ok = bool(_PRICE_RE.match(value))
+            elif value.lower() in canonical:
+                value, ok = canonical[value.lower()], True
+            else:
+                ok = bool(value) and spec["open"]
+            if ok and value not in clean.setdefault(param, []):
+                clean[param].append(value)
+            elif not ok:
+                dropped.append(f"{param}={value}")
+        if not clean.get(param):
+            clean.pop(param, None)
+    if sort and sort not in schema["sort_orders"]:
+        dropped.append(f"product_list_order={sort}")
+        sort = None
+    return clean, sort or None, dropped
+
+
+def canonical_url(url: str) -> str:
+    """Normalise a 2nd Swing URL so equivalent searches compare equal.
+
+    Lowercases scheme/host, drops the fragment and trailing slash, sorts
+    parameters and multi-values, re-indexes brackets and re-encodes the way
+    encode_params does. "?g2_brand=Ping" and "?g2_brand%5B0%5D=Ping" match.
+    """
+    parts = urlsplit((url or "").strip())
+    values = {}
+    for key, value in parse_qsl(parts.query):
+        param = key.split("[", 1)[0]
+        if value and value not in values.setdefault(param, []):
+            values[param].append(value)
+    pairs = []
+    for param in sorted(values):
+        if param in SINGLE_VALUE_PARAMS:
+            pairs.append((param, values[param][0]))
+        else:
+            pairs.extend((f"{param}[{i}]", v) for i, v in enumerate(sorted(values[param])))
+    base = f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    return f"{base}?{encode_params(pairs)}" if pairs else base
+
+
+URL_STATS = {"checked": 0, "repaired": 0, "rejected": 0, "dropped_params": 0}
+_url_stats_lock = threading.Lock()
+
+
+def _club_type_for_path(path: str):
+    path = path.rstrip("/")
+    for club_type in CLUB_PROMPT_FILES:
+        listing = get_filter_schema(club_type)["listing_url"]
+        if listing and urlsplit(listing).path.rstrip("/") == path:
+            return club_type
+    return None
+
+
+def _club_type_for_category(category: str):
+    for club_type in CLUB_PROMPT_FILES:
+        if category and get_filter_schema(club_type)["category"].lower() == category.lower():
+            return club_type
+    return None
+
+
+def _validated(url: str, club_type: str = None):
+    """(url, dropped) for validate_url; url is None when the URL can't be repaired."""
+    parts = urlsplit((url or "").strip())
+    if not parts.netloc and parts.path.startswith("/"):
+        parts = urlsplit(f"https://www.2ndswing.com{url.strip()}")  # a relative link
+    if parts.scheme.lower() not in ("http", "https") or parts.netloc.lower() not in SITE_HOSTS:
+        return None, [f"host={parts.netloc or url}"]
+
+    filters, site, dropped = {}, [], []
+    for key, value in parse_qsl(parts.query):
+        param = unquote_plus(key).split("[", 1)[0].strip()
+        value = value.strip()
+        if not value:
+            continue
+        if param in SITE_PARAMS:
+            site.append((param, value))
+        else:
+            filters.setdefault(param, []).append(value)
+
+    search_path = urlsplit(SEARCH_URL).path
+    is_search = parts.path.rstrip("/") == search_path
+    if is_search:
+        query = (filters.pop("q", None) or [""])[0]
+        url_club_type = _club_type_for_category((filters.pop("g2_category", None) or [""])[0]) or club_type
+    else:
+        query = None
+        url_club_type = _club_type_for_path(parts.path)
+        if url_club_type is None and club_type is not None:
+            url_club_type = club_type
+            dropped.append(f"path={parts.path}")  # e.g. "/golf-clubs/driver": use the club type's listing
+    if url_club_type is None:
+        # Another 2nd Swing page (its own links use paths like /golf-clubs/single-irons):
+        # nothing to check it against, so only normalise it
+        return canonical_url(urlunsplit(("https", "www.2ndswing.com", parts.path, parts.query, ""))), dropped
+    if is_search and not query:
+        dropped.append("q=")  # a model search without a model is the listing page
+
+    sort = None
+    page = None
+    extra = []
+    if not is_search:
+        # The site sends catalog searches on to the category page with q and g2_category kept
+        extra += [(param, filters.pop(param)[0]) for param in ("g2_category", "q") if param in filters]
+    for param, value in site:
+        if param == "product_list_order":
+            sort = value
+        elif param == "p":
+            if value.isdigit() and int(value) > 1:
+                page = value
+            elif value != "1":
+                dropped.append(f"p={value}")
+        else:
+            extra.append((param, value))
+    clean, sort, bad = sanitize_filters(url_club_type, filters, sort)
+    dropped += bad
+
+    fixed = assemble_url(url_club_type, clean, sort=sort, model_query=query or None)
+    tail = extra + ([("p", page)] if page else [])
+    if tail:
+        fixed += ("&" if "?" in fixed else "?") + encode_params(tail)
+    return canonical_url(fixed), dropped
+
+
+def validate_url(url: str, club_type: str = None):
+    """Check a 2nd Swing search URL against the club type's filter schema before it is fetched.
+
+    Parameters and values the schema doesn't allow are dropped, spelling is
+    fixed ("ping" -> "Ping", "Left+Handed" -> "Left Handed") and the result is
+    re-encoded as canonical_url. The club type comes from the listing path or
+    the catalog search's g2_category, else from club_type.
+
+    Other 2nd Swing pages that can't be placed in a club type are only
+    normalised. Returns (url, dropped): url is None when the URL can't be
+    fetched from 2nd Swing at all; dropped lists what was removed.
+    """
+    fixed, dropped = _validated(url, club_type)
+    with _url_stats_lock:
+        URL_STATS["checked"] += 1
+        if fixed is None:
+            URL_STATS["rejected"] += 1
+        elif dropped or fixed != canonical_url(url):
+            URL_STATS["repaired"] += 1
+        URL_STATS["dropped_params"] += len(dropped)
+    if fixed is None or dropped:
+        print(f"[URLCHECK] {'rejected' if fixed is None else 'repaired'} {url}" + (f" (dropped {', '.join(dropped)})" if dropped else ""))
+    return fixed, dropped
+
+
+def url_check_stats() -> dict:
+    with _url_stats_lock:
+        return dict(URL_STATS)
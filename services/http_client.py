@@ -0,0 +1,212 @@
+"""Shared outbound HTTP client for www.2ndswing.com.
+
+One pooled keep-alive requests.Session per process (TCP/TLS handshakes are
+paid once per connection, not per scrape), a concurrency cap plus token
+bucket so bursts of searches don't get us throttled, and retry with
+exponential backoff on 429/5xx and connection errors.
+
+aget() is the same for the ASGI app (asgi.py): one pooled httpx.AsyncClient,
+an asyncio semaphore and the same token bucket, awaited instead of blocking.
+
+With SCRAPE_ORIGIN set (e.g. the benchmark fixture server) requests for
+https://www.2ndswing.com/... are sent there instead; URLs everywhere else,
+including cache keys and links shown to users, stay on the real site.
+"""
+import asyncio
+import random
+import threading
+import time
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    SCRAPE_POOL_SIZE, SCRAPE_MAX_CONCURRENCY, SCRAPE_RATE_PER_SEC, SCRAPE_BURST,
+    SCRAPE_RETRIES, SCRAPE_BACKOFF_SECS, SCRAPE_TIMEOUT_SECS, SCRAPE_ORIGIN,
+)
+
+SITE_ORIGIN = "https://www.2ndswing.com"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+STATS = {"requests": 0, "retries": 0, "retry_statuses": 0, "connection_errors": 0, "throttle_wait_ms": 0.0}
+_stats_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Allow rate requests/sec on average with bursts up to capacity."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token and return 0, or return how long until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> float:
+        """Block until a token is available; return seconds waited."""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self) -> float:
+        """acquire() that awaits instead of blocking the event loop."""
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+_session = None
+_session_lock = threading.Lock()
+_concurrency = threading.BoundedSemaphore(SCRAPE_MAX_CONCURRENCY)
+_bucket = TokenBucket(SCRAPE_RATE_PER_SEC, SCRAPE_BURST) if SCRAPE_RATE_PER_SEC > 0 else None
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session with a connection pool of SCRAPE_POOL_SIZE."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SCRAPE_POOL_SIZE, pool_block=False)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def upstream_url(url: str) -> str:
+    """url with the 2nd Swing origin swapped for SCRAPE_ORIGIN (unchanged by default)."""
+    if SCRAPE_ORIGIN != SITE_ORIGIN and url.startswith(SITE_ORIGIN):
+        return SCRAPE_ORIGIN.rstrip("/") + url[len(SITE_ORIGIN):]
+    return url
+
+
+def _record_throttle(waited: float):
+    if waited:
+        with _stats_lock:
+            STATS["throttle_wait_ms"] += waited * 1000
+
+
+def _backoff(attempt: int, retry_after: str = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), 10.0)
+        except ValueError:
+            pass
+    return SCRAPE_BACKOFF_SECS * (2 ** attempt) * (0.5 + random.random())
+
+
+def get(url: str, timeout: float = SCRAPE_TIMEOUT_SECS) -> requests.Response:
+    """Rate-limited GET with retries on 429/5xx and connection errors.
+
+    Returns the last response (possibly still a 5xx) or raises the last
+    connection error once SCRAPE_RETRIES is exhausted.
+    """
+    session = get_session()
+    url = upstream_url(url)
+    for attempt in range(SCRAPE_RETRIES + 1):
+        # Token first: a request waiting on the rate limit mustn't hold a concurrency slot
+        if _bucket is not None:
+            _record_throttle(_bucket.acquire())
+        with _concurrency:
+            with _stats_lock:
+                STATS["requests"] += 1
+                if attempt:
+                    STATS["retries"] += 1
+            try:
+                resp = session.get(url, timeout=timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                with _stats_lock:
+                    STATS["connection_errors"] += 1
+                if attempt == SCRAPE_RETRIES:
+                    raise
+                print(f"[HTTP] {type(e).__name__} for {url}, retrying")
+                delay = _backoff(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == SCRAPE_RETRIES:
+                    return resp
+                with _stats_lock:
+                    STATS["retry_statuses"] += 1
+                print(f"[HTTP] {resp.status_code} for {url}, retrying")
+                delay = _backoff(attempt, resp.headers.get("Retry-After"))
+        time.sleep(delay)  # outside the semaphore so waiting retries don't hold a slot
+
+
+_async_client = None
+_async_concurrency = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Process-wide keep-alive AsyncClient (created on first use inside the event loop)."""
+    global _async_client, _async_concurrency
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=SCRAPE_TIMEOUT_SECS,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=SCRAPE_POOL_SIZE, max_keepalive_connections=SCRAPE_POOL_SIZE),
+        )
+        _async_concurrency = asyncio.Semaphore(SCRAPE_MAX_CONCURRENCY)
+    return _async_client
+
+
+async def aget(url: str, timeout: float = SCRAPE_TIMEOUT_SECS) -> httpx.Response:
+    """Async get(): same limiter, retries and backoff, on the shared AsyncClient."""
+    client = get_async_client()
+    url = upstream_url(url)
+    for attempt in range(SCRAPE_RETRIES + 1):
+        if _bucket is not None:
+            _record_throttle(await _bucket.acquire_async())
+        async with _async_concurrency:
+            with _stats_lock:
+                STATS["requests"] += 1
+                if attempt:
+                    STATS["retries"] += 1
+            try:
+                resp = await client.get(url, timeout=timeout)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                with _stats_lock:
+                    STATS["connection_errors"] += 1
+                if attempt == SCRAPE_RETRIES:
+                    raise
+                print(f"[HTTP] {type(e).__name__} for {url}, retrying")
+                delay = _backoff(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == SCRAPE_RETRIES:
+                    return resp
+                with _stats_lock:
+                    STATS["retry_statuses"] += 1
+                print(f"[HTTP] {resp.status_code} for {url}, retrying")
+                delay = _backoff(attempt, resp.headers.get("Retry-After"))
+        await asyncio.sleep(delay)  # outside the semaphore so waiting retries don't hold a slot
+
+
+def http_stats() -> dict:
+    with _stats_lock:
+        out = dict(STATS)
+    out["throttle_wait_ms"] = round(out["throttle_wait_ms"], 1)
+    out["pool_size"] = SCRAPE_POOL_SIZE
+    out["max_concurrency"] = SCRAPE_MAX_CONCURRENCY
+    return out
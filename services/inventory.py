@@ -0,0 +1,323 @@
+"""Local inventory snapshot: every listing product in SQLite, queried instead of a live scrape.
+
+crawl() walks a club type's listing base URL (from its prompts_v2 file, via
+filter_schema) page by page and swaps in that club type's rows in one
+transaction, so readers always see a complete snapshot. Run it from cron
+with `python -m services.inventory crawl`, or set INVENTORY_CRAWL_IN_APP to
+re-crawl on a background thread.
+
+search(url) answers a listing URL from the snapshot when every parameter in
+it can be evaluated locally (brand, price, price sorts and p) and the
+snapshot is younger than INVENTORY_MAX_AGE_SECS.
+It returns the same tuple as scrape_2ndswing, with the full total_count.
+Anything else returns None and the caller scrapes the live site.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+from config import (
+    CLUB_PROMPT_FILES, INVENTORY_DB, INVENTORY_MAX_AGE_SECS, INVENTORY_CRAWL_MAX_PAGES, INVENTORY_CRAWL_INTERVAL_SECS,
+    INVENTORY_COMPLETE_TOLERANCE,
+)
+from services import metrics
+from services.filter_schema import get_filter_schema
+
+# URL filter parameter -> indexed column. Only what every card shows: a parent-model card
+# stands for all its listings but has no condition, and its dexterity / flex / loft (when
+# it shows any) are one variant's, so the site's matches for those filters can't be
+# reproduced from the cards; such URLs go to the live site
+FILTER_COLUMNS = {
+    "g2_brand": "brand",
+}
+# Chip labels for applied_filters (the ones the page's filter-removal map knows)
+FILTER_LABELS = {
+    "g2_brand": "Brand",
+    "price": "Price",
+}
+SORTS = {
+    None: "position",
+    "price_asc": "price IS NULL, price, position",
+    "price_desc": "price IS NULL, price DESC, position",
+}
+DEFAULT_PAGE_SIZE = 24
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    club_type TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    brand TEXT COLLATE NOCASE,
+    price REAL,
+    product TEXT NOT NULL,
+    PRIMARY KEY (club_type, position)
+);
+CREATE INDEX IF NOT EXISTS products_brand ON products (club_type, brand);
+CREATE INDEX IF NOT EXISTS products_price ON products (club_type, price);
+CREATE TABLE IF NOT EXISTS snapshots (
+    club_type TEXT PRIMARY KEY,
+    crawled_at REAL NOT NULL,
+    pages INTEGER NOT NULL,
+    products INTEGER NOT NULL,
+    page_size INTEGER NOT NULL,
+    site_total INTEGER,
+    complete INTEGER NOT NULL
+);
+"""
+
+STATS = {"served": 0, "unsupported": 0, "stale": 0, "errors": 0, "query_ms": 0.0, "crawls": 0, "crawl_errors": 0}
+_stats_lock = threading.Lock()
+_local = threading.local()
+
+
+def _count(key: str, n=1):
+    with _stats_lock:
+        STATS[key] += n
+
+
+def _connect() -> sqlite3.Connection:
+    """This thread's connection (WAL: readers keep the old snapshot while a crawl commits)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(INVENTORY_DB) or ".", exist_ok=True)
+        conn = sqlite3.connect(INVENTORY_DB, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _club_type_for(path: str):
+    path = path.rstrip("/")
+    for club_type in CLUB_PROMPT_FILES:
+        listing = get_filter_schema(club_type)["listing_url"]
+        if listing and urlsplit(listing).path.rstrip("/") == path:
+            return club_type
+    return None
+
+
+def _snapshot(club_type: str):
+    row = _connect().execute(
+        "SELECT crawled_at, page_size, complete FROM snapshots WHERE club_type = ?", (club_type,)
+    ).fetchone()
+    if row is None or not row[2] or time.time() - row[0] > INVENTORY_MAX_AGE_SECS:
+        return None  # a crawl cut short by max_pages would report wrong totals
+    return row
+
+
+def _parse_price(value: str):
+    low, _, high = value.replace("$", "").replace(",", "").partition("-")
+    try:
+        return float(low or 0), float(high) if high else float("inf")
+    except ValueError:
+        return None
+
+
+def search(url: str):
+    """(products, total_count, applied_filters, next_page_url, no_results) from the snapshot, or None."""
+    t = time.perf_counter()
+    parts = urlsplit(url)
+    club_type = _club_type_for(parts.path)
+    if club_type is None:
+        _count("unsupported")
+        return None
+
+    filters, price, sort, page = {}, None, None, 1
+    for key, value in parse_qsl(parts.query):
+        param = key.split("[", 1)[0]
+        if param in FILTER_COLUMNS:
+            filters.setdefault(param, []).append(value)
+        elif param == "price":
+            price = _parse_price(value)
+            if price is None:
+                _count("unsupported")
+                return None
+        elif param == "product_list_order" and value in SORTS:
+            sort = value
+        elif param == "p" and value.isdigit():
+            page = max(1, int(value))
+        else:
+            _count("unsupported")  # locations, length, model search, ... need the live site
+            return None
+
+    try:
+        snapshot = _snapshot(club_type)
+        if snapshot is None:
+            _count("stale")
+            return None
+        page_size = snapshot[1] or DEFAULT_PAGE_SIZE
+        where, args = ["club_type = ?"], [club_type]
+        for param, values in filters.items():
+            where.append(f"{FILTER_COLUMNS[param]} IN ({', '.join('?' * len(values))})")
+            args += values
+        if price is not None:
+            where.append("price BETWEEN ? AND ?")
+            args += list(price)
+        conn = _connect()
+        clause = " AND ".join(where)
+        total = conn.execute(f"SELECT COUNT(*) FROM products WHERE {clause}", args).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT product FROM products WHERE {clause} ORDER BY {SORTS[sort]} LIMIT ? OFFSET ?",
+            args + [page_size, (page - 1) * page_size],
+        ).fetchall()
+    except sqlite3.Error as e:
+        print("[INVENTORY] query error:", e)
+        _count("errors")
+        return None
+
+    # Imported here: fetch_all imports the scraper, which imports this module
+    from services.fetch_all import page_url
+    applied_filters = [{"label": FILTER_LABELS[param], "value": v} for param, values in filters.items() for v in values]
+    if price is not None:
+        high = "" if price[1] == float("inf") else f"${price[1]:,.2f}"
+        applied_filters.append({"label": FILTER_LABELS["price"], "value": f"${price[0]:,.2f} - {high}".rstrip(" -")})
+    products = [json.loads(row[0]) for row in rows]
+    next_page_url = page_url(url, page + 1) if page * page_size < total else None
+
+    ms = (time.perf_counter() - t) * 1000
+    with _stats_lock:
+        STATS["served"] += 1
+        STATS["query_ms"] += ms
+    metrics.observe("inventory_query", ms)
+    print(f"[INVENTORY] {club_type}: {total} matches, page {page} ({ms:.1f} ms)")
+    if not total:
+        return [], None, applied_filters, None, True
+    return products, total, applied_filters, next_page_url, False
+
+
+def _row(club_type: str, position: int, product: dict, product_price) -> tuple:
+    return club_type, position, product.get("brand"), product_price(product), json.dumps(product)
+
+
+def crawl(club_type: str, max_pages: int = INVENTORY_CRAWL_MAX_PAGES) -> dict:
+    """Walk every listing page of a club type and replace its snapshot.
+
+    The old snapshot stays when a page fails, when max_pages cuts the walk short and
+    when fewer products were collected than the site's total (within INVENTORY_COMPLETE_TOLERANCE).
+    """
+    # Imported here: the scraper imports this module
+    from services.scraper import scrape_2ndswing_uncached
+    from services.fetch_all import product_price
+
+    t = time.perf_counter()
+    url = get_filter_schema(club_type)["listing_url"]
+    products, seen, pages, page_size, site_total = [], set(), 0, 0, None
+    while url and pages < max_pages:
+        (items, total_count, _, next_url, _), ok = scrape_2ndswing_uncached(url)
+        if not ok:
+            print(f"[INVENTORY] crawl of {club_type} failed at page {pages + 1}; keeping the previous snapshot")
+            _count("crawl_errors")
+            return {"club_type": club_type, "ok": False, "pages": pages}
+        if pages == 0:
+            page_size, site_total = len(items), total_count
+        pages += 1
+        before = len(products)
+        for product in items:
+            key = product.get("url") or json.dumps(product, sort_keys=True)
+            if key not in seen:  # the listing shifts while we walk it
+                seen.add(key)
+                products.append(product)
+        # Past the last page the site repeats what we have (the "p=2" link fallback)
+        url = next_url if len(products) > before else None
+
+    # A page that comes back empty also ends the walk; only a walk that reached the
+    # site's own product count replaces the snapshot
+    if url is not None or not site_total or len(products) < site_total * (1 - INVENTORY_COMPLETE_TOLERANCE):
+        print(f"[INVENTORY] crawl of {club_type} incomplete ({len(products)} of {site_total} products in "
+              f"{pages} pages); keeping the previous snapshot")
+        _count("crawl_errors")
+        return {"club_type": club_type, "ok": False, "pages": pages, "products": len(products), "site_total": site_total}
+
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM products WHERE club_type = ?", (club_type,))
+        conn.executemany(
+            # Named columns: snapshots from before the attribute columns were dropped still load
+            "INSERT INTO products (club_type, position, brand, price, product) VALUES (?, ?, ?, ?, ?)",
+            (_row(club_type, i, p, product_price) for i, p in enumerate(products)),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (club_type, time.time(), pages, len(products), page_size or DEFAULT_PAGE_SIZE, site_total, True),
+        )
+    _count("crawls")
+    secs = time.perf_counter() - t
+    print(f"[INVENTORY] crawled {club_type}: {pages} pages, {len(products)} products in {secs:.1f} s")
+    return {"club_type": club_type, "ok": True, "pages": pages, "products": len(products),
+            "site_total": site_total, "complete": True}
+
+
+def crawl_all(max_pages: int = INVENTORY_CRAWL_MAX_PAGES) -> list:
+    results = []
+    for club_type in CLUB_PROMPT_FILES:
+        try:
+            results.append(crawl(club_type, max_pages))
+        except Exception as e:
+            print(f"[INVENTORY] crawl of {club_type} error:", e)
+            _count("crawl_errors")
+            results.append({"club_type": club_type, "ok": False, "error": str(e)})
+    return results
+
+
+_crawler = None
+
+
+def start_crawler():
+    """Re-crawl every club type every INVENTORY_CRAWL_INTERVAL_SECS on a daemon thread."""
+    global _crawler
+    if _crawler is not None:
+        return
+
+    def loop():
+        while True:
+            crawl_all()
+            time.sleep(INVENTORY_CRAWL_INTERVAL_SECS)
+
+    _crawler = threading.Thread(target=loop, name="inventory-crawler", daemon=True)
+    _crawler.start()
+
+
+def inventory_stats() -> dict:
+    with _stats_lock:
+        out = dict(STATS)
+    out["query_ms"] = round(out["query_ms"], 1)
+    try:
+        out["snapshots"] = {
+            club_type: {"products": n, "pages": pages, "site_total": site_total, "complete": bool(complete),
+                        "age_secs": round(time.time() - crawled_at)}
+            for club_type, crawled_at, pages, n, site_total, complete in _connect().execute(
+                "SELECT club_type, crawled_at, pages, products, site_total, complete FROM snapshots"
+            )
+        }
+    except sqlite3.Error as e:
+        out["snapshots"] = {"error": str(e)}
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl or query the local inventory snapshot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    crawl_cmd = sub.add_parser("crawl", help="crawl listing pages into the snapshot")
+    crawl_cmd.add_argument("--club-type", choices=list(CLUB_PROMPT_FILES), help="default: all club types")
+    crawl_cmd.add_argument("--max-pages", type=int, default=INVENTORY_CRAWL_MAX_PAGES)
+    query_cmd = sub.add_parser("query", help="answer a listing URL from the snapshot")
+    query_cmd.add_argument("url")
+    args = parser.parse_args()
+
+    if args.command == "crawl":
+        results = [crawl(args.club_type, args.max_pages)] if args.club_type else crawl_all(args.max_pages)
+        print(json.dumps(results, indent=2))
+    else:
+        result = search(args.url)
+        if result is None:
+            print("not answerable from the snapshot (unsupported filter or stale); the app would scrape it live")
+        else:
+            products, total_count, applied_filters, next_page_url, no_results = result
+            print(json.dumps({"total_count": total_count, "applied_filters": applied_filters,
+                              "next_page_url": next_page_url, "products": products}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
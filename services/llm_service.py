@@ -1,10 +1,133 @@
+import json
 import os
+import threading
+import time
 from urllib.parse import quote_plus
-from openai import OpenAI
-from config import OPENAI_MODEL, MODEL_DATA_FILES, DEBUG_DUMP_SYSTEM_PROMPT, CLASSIFICATION_MODEL, EXTRACTION_MODEL, URL_BUILDING_MODEL
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from config import (
+    DEBUG_DUMP_SYSTEM_PROMPT, CLASSIFICATION_MODEL, EXTRACTION_MODEL, URL_BUILDING_MODEL,
+    EXTRACTION_TOP_K, OPENAI_TIMEOUT_SECS, OPENAI_CONNECT_TIMEOUT_SECS, OPENAI_MAX_RETRIES, OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE,
+)
+from services import metrics, prompt_registry
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# Initialize OpenAI client (one pooled keep-alive connection pool, explicit timeouts)
+client = OpenAI(
+    api_key=os.environ.get("OPENAI_API_KEY"),
+    timeout=httpx.Timeout(OPENAI_TIMEOUT_SECS, connect=OPENAI_CONNECT_TIMEOUT_SECS),
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=DefaultHttpxClient(
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_KEEPALIVE),
+    ),
+)
+
+# Async twin for the ASGI app (asgi.py); created on first use so sync deployments never open it
+_async_client = None
+
+def get_async_client() -> AsyncOpenAI:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            timeout=httpx.Timeout(OPENAI_TIMEOUT_SECS, connect=OPENAI_CONNECT_TIMEOUT_SECS),
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_KEEPALIVE),
+            ),
+        )
+    return _async_client
+
+# Per-step call metrics: prompt-cache hit ratio and time to first token (see /stats)
+LLM_STATS = {}
+_llm_stats_lock = threading.Lock()
+
+def _chat(step: str, model: str, system_prompt: str, user_content: str, **kwargs) -> str:
+    """Streamed chat completion that logs time-to-first-token and cached prompt tokens.
+
+    Keep system_prompt's static text first: the provider only caches an identical
+    prefix (1024+ tokens), so per-request values belong at the end.
+    """
+    t0 = time.perf_counter()
+    stream = client.chat.completions.create(**_chat_request(model, system_prompt, user_content, kwargs))
+    parts, ttft_ms, usage = [], None, None
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - t0) * 1000
+            parts.append(chunk.choices[0].delta.content)
+        if chunk.usage:
+            usage = chunk.usage
+    return _finish_chat(step, t0, ttft_ms, parts, usage)
+
+async def _achat(step: str, model: str, system_prompt: str, user_content: str, **kwargs) -> str:
+    """_chat on the async client (same request, logging and metrics)."""
+    t0 = time.perf_counter()
+    stream = await get_async_client().chat.completions.create(**_chat_request(model, system_prompt, user_content, kwargs))
+    parts, ttft_ms, usage = [], None, None
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - t0) * 1000
+            parts.append(chunk.choices[0].delta.content)
+        if chunk.usage:
+            usage = chunk.usage
+    return _finish_chat(step, t0, ttft_ms, parts, usage)
+
+def _chat_request(model: str, system_prompt: str, user_content: str, kwargs: dict) -> dict:
+    return dict(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ],
+        temperature=0,
+        stream=True,
+        stream_options={"include_usage": True},
+        **kwargs,
+    )
+
+def _finish_chat(step: str, t0: float, ttft_ms, parts: list, usage) -> str:
+    """Log and record one streamed call; return its text."""
+    total_ms = (time.perf_counter() - t0) * 1000
+    ttft_ms = total_ms if ttft_ms is None else ttft_ms
+
+    prompt_tokens = usage.prompt_tokens if usage else 0
+    completion_tokens = usage.completion_tokens if usage else 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    ratio = cached_tokens / prompt_tokens if prompt_tokens else 0.0
+    print(
+        f"[LLM] {step}: ttft {ttft_ms:.0f} ms, total {total_ms:.0f} ms, prompt {prompt_tokens} tokens "
+        f"(cached {cached_tokens}, {ratio:.0%}), completion {completion_tokens} tokens"
+    )
+    with _llm_stats_lock:
+        st = LLM_STATS.setdefault(step, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "ttft_ms": 0.0, "total_ms": 0.0,
+        })
+        st["calls"] += 1
+        st["prompt_tokens"] += prompt_tokens
+        st["cached_tokens"] += cached_tokens
+        st["completion_tokens"] += completion_tokens
+        st["ttft_ms"] += ttft_ms
+        st["total_ms"] += total_ms
+    metrics.observe(f"llm_{step}", total_ms)
+    metrics.add_tokens(step, prompt_tokens, completion_tokens, cached_tokens)
+    return "".join(parts)
+
+def llm_stats() -> dict:
+    """Per-step totals plus cached-token ratio and mean latencies."""
+    out = {}
+    with _llm_stats_lock:
+        for step, st in LLM_STATS.items():
+            calls = st["calls"] or 1
+            out[step] = {
+                **st,
+                "cached_ratio": round(st["cached_tokens"] / st["prompt_tokens"], 4) if st["prompt_tokens"] else 0.0,
+                "mean_ttft_ms": round(st["ttft_ms"] / calls, 1),
+                "mean_total_ms": round(st["total_ms"] / calls, 1),
+            }
+    return out
 
 CLUB_TYPE_KEYWORDS = {
     "Driver": ["driver", "drivers", "drive"],
@@ -31,22 +154,37 @@ CLUB_TYPE_KEYWORDS = {
     "Putters": ["putter", "putters", "mallet", "putt", "scotty", "putting"],
 }
 
-def classify_query_is_model_specific(user_query: str, selected_club_type: str) -> dict:
-    """Return dict with model-specific classification and club type mismatch detection.
+def detect_club_type_mismatch(user_query: str, selected_club_type: str):
+    """Return (potential_clubtype_mismatch, intended_club_type) from the keyword map."""
+    # Pure-Python club type mismatch detection using keyword map
+    # NOTE: We explicitly ignore Utility Irons entirely in mismatch logic to avoid confusion.
+    potential_clubtype_mismatch = False
+    intended_club_type = None
     
-    Returns:
-        {
-            "is_model_specific": bool,
-            "potential_clubtype_mismatch": bool,
-            "intended_club_type": str or None
-        }
-    """
-    try:
-        with open(os.path.join("textdocs", "brandlist.txt"), encoding="utf‑8") as f:
-            brand_list = f.read().strip()
-    except Exception as e:
-        print("Error reading brandlist.txt:", e)
-        brand_list = ""
+    # Skip mismatch detection entirely if Utility Irons is selected
+    if selected_club_type != "Utility Irons":
+        query_lc = user_query.lower()
+        selected_keywords = CLUB_TYPE_KEYWORDS.get(selected_club_type, [])
+        mentioned_types = []
+        for ctype, keywords in CLUB_TYPE_KEYWORDS.items():
+            if ctype == "Utility Irons":
+                continue  # do not use Utility Irons for mismatch detection
+            for kw in keywords:
+                if kw in query_lc:
+                    mentioned_types.append(ctype)
+                    break
+
+        # If the query clearly mentions a different club type than selected
+        for ctype in mentioned_types:
+            if ctype != selected_club_type:
+                potential_clubtype_mismatch = True
+                intended_club_type = ctype
+                break
+
+    return potential_clubtype_mismatch, intended_club_type
+
+def _classification_prompt(user_query: str, selected_club_type: str) -> str:
+    brand_list = prompt_registry.brand_list()
 
     system_prompt = (
         "You are the first step in a natural-language golf-search tool. "
@@ -71,123 +209,200 @@ def classify_query_is_model_specific(user_query: str, selected_club_type: str) -
         print("-"*80)
         print(system_prompt)
         print("="*80 + "\n")
+    return system_prompt
 
+def classify_query_is_model_specific(user_query: str, selected_club_type: str) -> dict:
+    """Return dict with model-specific classification and club type mismatch detection.
+    
+    Returns:
+        {
+            "is_model_specific": bool,
+            "potential_clubtype_mismatch": bool,
+            "intended_club_type": str or None,
+            "classification_error": bool
+        }
+    """
+    system_prompt = _classification_prompt(user_query, selected_club_type)
     try:
-        resp = client.chat.completions.create(
-            model=CLASSIFICATION_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_query},
-            ],
-            temperature=0,
-            max_tokens=2,
-        )
-        result = resp.choices[0].message.content.lstrip()[:1]
-        print(f"[DEBUG] classification result: {result}")
-        is_model_specific = result == "1"
+        result = _chat("classify", CLASSIFICATION_MODEL, system_prompt, user_query, max_tokens=2)
     except Exception as e:
         print("OpenAI classification error:", e)
-        is_model_specific = False
+        result = None
+    return _classification_result(result, user_query, selected_club_type)
 
-    # Pure-Python club type mismatch detection using keyword map
-    # NOTE: We explicitly ignore Utility Irons entirely in mismatch logic to avoid confusion.
-    potential_clubtype_mismatch = False
-    intended_club_type = None
-    
-    # Skip mismatch detection entirely if Utility Irons is selected
-    if selected_club_type != "Utility Irons":
-        query_lc = user_query.lower()
-        selected_keywords = CLUB_TYPE_KEYWORDS.get(selected_club_type, [])
-        mentioned_types = []
-        for ctype, keywords in CLUB_TYPE_KEYWORDS.items():
-            if ctype == "Utility Irons":
-                continue  # do not use Utility Irons for mismatch detection
-            for kw in keywords:
-                if kw in query_lc:
-                    mentioned_types.append(ctype)
-                    break
+async def classify_query_is_model_specific_async(user_query: str, selected_club_type: str) -> dict:
+    """classify_query_is_model_specific on the async OpenAI client."""
+    system_prompt = _classification_prompt(user_query, selected_club_type)
+    try:
+        result = await _achat("classify", CLASSIFICATION_MODEL, system_prompt, user_query, max_tokens=2)
+    except Exception as e:
+        print("OpenAI classification error:", e)
+        result = None
+    return _classification_result(result, user_query, selected_club_type)
 
-        # If the query clearly mentions a different club type than selected
-        for ctype in mentioned_types:
-            if ctype != selected_club_type:
-                potential_clubtype_mismatch = True
-                intended_club_type = ctype
-                break
+def _classification_result(result, user_query: str, selected_club_type: str) -> dict:
+    """Classification dict from the model's raw reply (None when the call failed)."""
+    classification_error = result is None
+    if not classification_error:
+        result = result.lstrip()[:1]
+        print(f"[DEBUG] classification result: {result}")
+    is_model_specific = result == "1"
+
+    potential_clubtype_mismatch, intended_club_type = detect_club_type_mismatch(user_query, selected_club_type)
 
     return {
         "is_model_specific": is_model_specific,
         "potential_clubtype_mismatch": potential_clubtype_mismatch,
         "intended_club_type": intended_club_type,
+        "classification_error": classification_error,
     }
 
-def extract_and_map_models(user_query: str, club_type: str) -> str:
-    """Return comma‑separated pairs userReference=OfficialName (≤7)."""
-    try:
-        model_file = MODEL_DATA_FILES.get(club_type, "drivers.txt")
-        with open(os.path.join("model_data", model_file), "r") as f:
-            model_list = f.read().strip()
-    except Exception as e:
-        print("Error reading model_data file:", e)
-        model_list = ""
+def build_model_mapping_prompt(user_query: str, club_type: str, top_k: int = EXTRACTION_TOP_K) -> str:
+    """System prompt for extract_and_map_models.
 
-    system_prompt = f"""
+    With top_k, only the top_k official names most similar to the query are listed
+    instead of the whole model_data file (2,000+ lines for putters).
+    """
+    if top_k:
+        # Imported here: model_index imports this module for CLUB_TYPE_KEYWORDS
+        from services.model_index import top_k_models
+        model_list = "\n".join(top_k_models(user_query, club_type, top_k))
+    else:
+        model_list = prompt_registry.model_list(club_type)
+
+    return f"""
 You identify {club_type} model names in the user's query and map them to the official list below.
 Return pairs in the format userReference=officialModel, comma‑separated, max 7.
 List of official models:
 {model_list}
 """
+
+def extract_and_map_models(user_query: str, club_type: str, top_k: int = EXTRACTION_TOP_K) -> str:
+    """Return comma‑separated pairs userReference=OfficialName (≤7)."""
+    system_prompt = build_model_mapping_prompt(user_query, club_type, top_k)
     try:
-        resp = client.chat.completions.create(
-            model=EXTRACTION_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_query},
-            ],
-            temperature=0,
-            max_tokens=400,
-        )
-        out = resp.choices[0].message.content.strip()
+        out = _chat("extract_models", EXTRACTION_MODEL, system_prompt, user_query, max_tokens=400).strip()
         print(f"[DEBUG] extraction+mapping output: {out}")
         return out
     except Exception as e:
         print("OpenAI extraction error:", e)
         return ""
 
-def build_url_with_llm(user_query: str, system_prompt: str, mapped_models: str) -> str:
-    """Build URL using LLM with deterministic model parameters."""
-    # Build model filter chunk ourselves
-    model_chunk = ""
+async def extract_and_map_models_async(user_query: str, club_type: str, top_k: int = EXTRACTION_TOP_K) -> str:
+    """extract_and_map_models on the async OpenAI client."""
+    system_prompt = build_model_mapping_prompt(user_query, club_type, top_k)
+    try:
+        out = (await _achat("extract_models", EXTRACTION_MODEL, system_prompt, user_query, max_tokens=400)).strip()
+        print(f"[DEBUG] extraction+mapping output: {out}")
+        return out
+    except Exception as e:
+        print("OpenAI extraction error:", e)
+        return ""
+
+def parse_mapped_models(mapped_models: str) -> list:
+    """Official names from 'ref=Official, ...' extraction output (deduped, ≤7)."""
+    uniq = []
     if mapped_models:
         names = [pair.split("=", 1)[1].strip() for pair in mapped_models.split(",") if "=" in pair]
-        seen, uniq = set(), []
         for n in names:
-            if n not in seen:
-                seen.add(n)
+            if n not in uniq:
                 uniq.append(n)
             if len(uniq) == 7:
                 break
-        model_chunk = "".join(f"&g2_model[{i}]={quote_plus(name)}" for i, name in enumerate(uniq))
+    return uniq
 
-    llm_prompt = system_prompt + "\n\nDo NOT include any g2_model parameters; they will be appended later."
+def build_url_with_llm(user_query: str, system_prompt: str, mapped_models: str, request_inputs: str = "") -> str:
+    """Build URL using LLM with deterministic model parameters.
 
+    request_inputs (CLASSIFICATION/CLUB_TYPE lines) go after the static prompt.
+    """
     try:
-        resp = client.chat.completions.create(
-            model=URL_BUILDING_MODEL,
-            messages=[
-                {"role": "system", "content": llm_prompt},
-                {"role": "user", "content": user_query},
-            ],
-            temperature=0,
-            max_tokens=400,
-        )
-        base_url = resp.choices[0].message.content.strip()
+        base_url = _chat("build_url", URL_BUILDING_MODEL, _url_prompt(system_prompt, request_inputs), user_query, max_tokens=400).strip()
     except Exception as e:
         print("OpenAI URL‑building error:", e)
         return ""
+    return _append_model_filters(base_url, mapped_models)
 
+async def build_url_with_llm_async(user_query: str, system_prompt: str, mapped_models: str, request_inputs: str = "") -> str:
+    """build_url_with_llm on the async OpenAI client."""
+    try:
+        base_url = (await _achat("build_url", URL_BUILDING_MODEL, _url_prompt(system_prompt, request_inputs), user_query, max_tokens=400)).strip()
+    except Exception as e:
+        print("OpenAI URL‑building error:", e)
+        return ""
+    return _append_model_filters(base_url, mapped_models)
+
+def _url_prompt(system_prompt: str, request_inputs: str) -> str:
+    llm_prompt = system_prompt + "\n\nDo NOT include any g2_model parameters; they will be appended later."
+    if request_inputs:
+        llm_prompt += "\n\n" + request_inputs
+    return llm_prompt
+
+def _append_model_filters(base_url: str, mapped_models: str) -> str:
+    # Build model filter chunk ourselves
+    uniq = parse_mapped_models(mapped_models)
+    model_chunk = "".join(f"&g2_model[{i}]={quote_plus(name)}" for i, name in enumerate(uniq))
     if model_chunk:
         sep = "&" if "?" in base_url and not base_url.endswith("&") else ""
         final_url = f"{base_url}{sep}{model_chunk.lstrip('&')}" if "?" in base_url else f"{base_url}?{model_chunk.lstrip('&')}"
     else:
         final_url = base_url
-    return final_url 
\ No newline at end of file
+    return final_url
+
+JSON_OUTPUT_INSTRUCTIONS = """
+OUTPUT FORMAT (overrides "Output ONLY a single URL" above):
+Do not write a URL. Return ONLY a JSON object:
+{"filters": {"<param>": ["<value>", ...]}, "sort": "<product_list_order value>" or null, "q": "<model phrase>" or null}
+- Use the parameter names listed under Filters, without brackets (g2_brand, not g2_brand%5B0%5D).
+- Write values decoded: spaces not +, ° not %C2%B0 ("Left Handed", "10.5°", "Scottsdale (S)").
+- price is a single "low-high" string inside the list, e.g. ["0-300"].
+- Set q only when CLASSIFICATION is MODEL_SPECIFIC; otherwise null.
+- Do NOT include g2_category, g2_model or product_list_order inside filters.
+"""
+
+def extract_filters_with_llm(user_query: str, system_prompt: str, request_inputs: str = ""):
+    """Ask the URL-building model for {"filters", "sort", "q"} JSON instead of a URL.
+
+    Returns the parsed dict, or None on an OpenAI error or unparseable output
+    (the caller then falls back to build_url_with_llm).
+    """
+    try:
+        raw = _chat(
+            "build_filters", URL_BUILDING_MODEL, _filters_prompt(system_prompt, request_inputs), user_query,
+            max_tokens=200, response_format={"type": "json_object"},
+        )
+    except Exception as e:
+        print("OpenAI structured filter error:", e)
+        return None
+    return _parse_filters(raw)
+
+async def extract_filters_with_llm_async(user_query: str, system_prompt: str, request_inputs: str = ""):
+    """extract_filters_with_llm on the async OpenAI client."""
+    try:
+        raw = await _achat(
+            "build_filters", URL_BUILDING_MODEL, _filters_prompt(system_prompt, request_inputs), user_query,
+            max_tokens=200, response_format={"type": "json_object"},
+        )
+    except Exception as e:
+        print("OpenAI structured filter error:", e)
+        return None
+    return _parse_filters(raw)
+
+def _filters_prompt(system_prompt: str, request_inputs: str) -> str:
+    llm_prompt = system_prompt + "\n" + JSON_OUTPUT_INSTRUCTIONS
+    if request_inputs:
+        llm_prompt += "\n" + request_inputs
+    return llm_prompt
+
+def _parse_filters(raw: str):
+    raw = raw.strip()
+    print(f"[DEBUG] structured filters: {raw}")
+    try:
+        data = json.loads(raw)
+    except Exception as e:
+        print("OpenAI structured filter error:", e)
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("filters", {}), dict):
+        print("OpenAI structured filter error: unexpected shape", data)
+        return None
+    return data
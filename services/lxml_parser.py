@@ -0,0 +1,219 @@
+"""lxml backend for parse_listing_html (SCRAPE_PARSER = "lxml").
+
+A line-for-line port of the BeautifulSoup parser in services/scraper.py that
+returns identical results (checked by benchmarks/check_parser_equivalence.py
+over the saved fixtures). The document is parsed by libxml2 in C and every
+CSS selector / find() is a precompiled XPath evaluated in C, so the Python
+work is limited to the fields we actually keep.
+"""
+import html
+import lxml.html
+from lxml import etree
+
+
+def _cls(name: str) -> str:
+    """XPath predicate equivalent to BeautifulSoup's class_=name / CSS .name."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_MAIN = etree.XPath("//*[@id='maincontent']")
+_NO_RESULTS_EMPTY = etree.XPath(f".//div[{_cls('message')} and {_cls('info')} and {_cls('empty')}]")
+_NO_RESULTS_SEARCH = etree.XPath(
+    f"./div[{_cls('columns')}]/div[{_cls('column')} and {_cls('main')}]/div[{_cls('message')} and {_cls('notice')}]"
+)
+_FILTER_ITEMS = etree.XPath(f".//ol[{_cls('items')}]//li[{_cls('item')}]")
+_FILTER_LABEL = etree.XPath(f".//*[{_cls('filter-label')}]")
+_FILTER_VALUE = etree.XPath(f".//*[{_cls('filter-value')}]")
+_TOTAL_COUNT = etree.XPath(f".//p[{_cls('toolbar-amount')}]//span[{_cls('toolbar-number')} and not(following-sibling::*)]")
+_NEXT_LINK = etree.XPath(f".//ul[{_cls('pages-items')}]//li[{_cls('pages-item-next')}]//a[{_cls('next')}]")
+_PAGE2_LINK = etree.XPath(f".//ul[{_cls('pages-items')}]//li[{_cls('item')}]//a[contains(@href, 'p=2')]")
+_CARDS = etree.XPath(f".//div[{_cls('product-box')} and {_cls('product-item-info')}]")
+_BRAND = etree.XPath(f".//div[{_cls('product-brand')}]")
+_CATEGORY = etree.XPath(f".//div[{_cls('pmp-product-category')}]")
+_TITLE = etree.XPath(f".//div[{_cls('p-title')}]")
+_IMG = etree.XPath(f".//img[{_cls('product-image-photo')}]")
+_PHOTO_LINK = etree.XPath(f".//a[{_cls('product')} and {_cls('photo')} and {_cls('product-item-photo')}]")
+_VARIANT_LINKS = etree.XPath(f".//a[{_cls('new-used-listing-link')}]")
+_ATTR_BLOCK = etree.XPath(f".//div[{_cls('pmp-attribute')}]")
+_ATTR_LABELS = etree.XPath(f".//span[{_cls('pmp-attribute-label')}]")
+_CURRENT_PRICE = etree.XPath(f".//div[{_cls('current-price')}]")
+_CONDITION = etree.XPath(f".//div[{_cls('pmp-product-condition')}]")
+_PRICE_SPAN = etree.XPath(f".//span[{_cls('price')}]")
+_OLD_PRICE_SPAN = etree.XPath(f".//span[{_cls('old-price')}]")
+
+
+def _first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+
+def _text(el, separator: str = "", strip: bool = True) -> str:
+    """BeautifulSoup get_text(separator, strip) semantics (comments excluded)."""
+    if strip:
+        return separator.join(t.strip() for t in _iter_text(el) if t.strip())
+    return separator.join(_iter_text(el))
+
+
+def _iter_text(el):
+    """Text nodes under el in document order, like BeautifulSoup's _all_strings (no comments)."""
+    if el.text and isinstance(el.tag, str):
+        yield el.text
+    for child in el:
+        if isinstance(child.tag, str):
+            yield from _iter_text(child)
+        if child.tail:
+            yield child.tail
+
+
+class _Text(str):
+    """A tail string that remembers the element it follows (to continue sibling walks)."""
+
+    def __new__(cls, value, owner):
+        obj = super().__new__(cls, value)
+        obj.owner = owner
+        return obj
+
+
+def _next_sibling(node):
+    """BeautifulSoup next_sibling: the tail text if any, else the next element."""
+    if isinstance(node, str):
+        return node.owner.getnext() if node.owner is not None else None
+    if node.tail:
+        return _Text(node.tail, node)
+    return node.getnext()
+
+
+def parse_listing_html(page_html: str):
+    """Parse a 2nd Swing listing page into (products, total_count, applied_filters, next_page_url, no_results)."""
+    doc = lxml.html.document_fromstring(page_html)
+    all_data = []
+    total_count = None
+    applied_filters = []
+    next_page_url = None
+    no_results = False
+
+    no_results_element = _first(_NO_RESULTS_EMPTY, doc)
+    if no_results_element is not None and "We can't find products matching the selection" in _text(no_results_element, strip=False):
+        no_results = True
+    for main in _MAIN(doc):
+        if _first(_NO_RESULTS_SEARCH, main) is not None:
+            no_results = True
+
+    for li in _FILTER_ITEMS(doc):
+        label_el = _first(_FILTER_LABEL, li)
+        value_el = _first(_FILTER_VALUE, li)
+        if label_el is not None and value_el is not None:
+            label = _text(label_el)
+            value = _text(value_el)
+            if label and value:
+                applied_filters.append({
+                    "label": label,
+                    "value": value,
+                })
+    if no_results:
+        return [], None, applied_filters, None, True
+
+    count_tag = _first(_TOTAL_COUNT, doc)
+    if count_tag is not None:
+        try:
+            total_count = int(_text(count_tag).replace(',', ''))
+        except ValueError:
+            total_count = None
+
+    next_link = _first(_NEXT_LINK, doc)
+    if next_link is None:
+        next_link = _first(_PAGE2_LINK, doc)
+    if next_link is not None and next_link.get('href'):
+        href = html.unescape(next_link.get('href'))
+        if href.startswith('/'):
+            next_page_url = 'https://www.2ndswing.com' + href
+        elif href.startswith('http'):
+            next_page_url = href
+        else:
+            next_page_url = None
+        print(f"Next page URL found: {next_page_url}")
+    else:
+        print("No next page URL found")
+
+    for card in _CARDS(doc):
+        brand = _first(_BRAND, card)
+        brand = _text(brand) if brand is not None else "N/A"
+
+        model_tag = _first(_CATEGORY, card)
+        if model_tag is None:
+            model_tag = _first(_TITLE, card)
+        model = _text(model_tag) if model_tag is not None else "N/A"
+
+        img_tag = _first(_IMG, card)
+        img_url = img_tag.attrib["src"] if img_tag is not None else ""
+
+        link_tag = _first(_PHOTO_LINK, card)
+        product_url = link_tag.attrib["href"] if link_tag is not None else ""
+
+        variant_links = _VARIANT_LINKS(card)
+        has_used_variants = card.get("data-itemhasused") == "1"
+        has_new_variants = card.get("data-hasnewvariants") == "1"
+        parent_model = bool(has_new_variants or (has_used_variants and has_new_variants) or variant_links)
+
+        attrs = {}
+        attr_block = _first(_ATTR_BLOCK, card)
+        if attr_block is not None:
+            for lbl in _ATTR_LABELS(attr_block):
+                key = _text(lbl).rstrip(":").lower()
+                val = _next_sibling(lbl)
+                while val is not None and not isinstance(val, str) and val.tag == "br":
+                    val = _next_sibling(val)
+                if isinstance(val, str):
+                    attrs[key] = val.strip()
+                elif val is not None:
+                    attrs[key] = _text(val) if isinstance(val.tag, str) else (val.text or "").strip()
+
+        price = condition = "N/A"
+        new_price = new_url = used_price = used_url = None
+
+        if not parent_model:
+            price_div = _first(_CURRENT_PRICE, card)
+            price = _text(price_div) if price_div is not None else "N/A"
+            cond_div = _first(_CONDITION, card)
+            condition = _text(cond_div) if cond_div is not None else "N/A"
+        else:
+            for link in variant_links:
+                href = link.get("href", "")
+                price_span = _first(_PRICE_SPAN, link)
+                if price_span is None:
+                    price_span = _first(_OLD_PRICE_SPAN, link)
+                label_text = _text(link, " ").lower()
+
+                is_new = ("new_used_filter=New" in href) or ("new" in label_text and "used" not in label_text)
+                is_used = ("new_used_filter=Used" in href) or ("used" in label_text)
+
+                if is_new and price_span is not None:
+                    new_price = _text(price_span)
+                    new_url = href
+                elif is_used and price_span is not None:
+                    used_price = _text(price_span)
+                    used_url = href
+
+            if not new_price:
+                price_div = _first(_CURRENT_PRICE, card)
+                if price_div is None:
+                    price_div = _first(_PRICE_SPAN, card)
+                if price_div is not None:
+                    new_price = _text(price_div)
+                    new_url = product_url
+
+        all_data.append({
+            "brand": brand,
+            "model": model,
+            "img_url": img_url,
+            "url": product_url,
+            "price": price,
+            "condition": condition,
+            "parent_model": parent_model,
+            "new_price": new_price,
+            "new_url": new_url,
+            "used_price": used_price,
+            "used_url": used_url,
+            "attrs": attrs,
+        })
+    return all_data, total_count, applied_filters, next_page_url, no_results
@@ -0,0 +1,122 @@
+"""Per-stage latency histograms, token counters and the Server-Timing header.
+
+Stages (classification / URL-build LLM calls, upstream fetch, HTML parse,
+template render, telemetry enqueue, ...) call observe(stage, ms). Every
+observation goes into a process-wide histogram exported in the Prometheus
+text format by GET /metrics, and, when it happens inside a request (its
+thread, or an asyncio task of it in asgi.py), into that request's list of
+timings, which app.py sends back as a Server-Timing
+header so a single slow response can be broken down in the browser.
+
+Metrics are per process: with several gunicorn workers each /metrics scrape
+sees the worker that answered it.
+"""
+import contextvars
+import threading
+from config import METRICS_BUCKETS_MS
+
+PREFIX = "nlf"
+
+_lock = threading.Lock()
+_stage_hist = {}  # stage -> [cumulative bucket counts..., count, sum_ms]
+_request_hist = {}  # (endpoint, status) -> same layout
+_tokens = {}  # (step, kind) -> count
+_callbacks = []  # (name, type, help, fn) sampled at scrape time
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _add(hist: dict, key, ms: float):
+    row = hist.get(key)
+    if row is None:
+        row = hist[key] = [0] * (len(METRICS_BUCKETS_MS) + 1) + [0.0]
+    for i, bound in enumerate(METRICS_BUCKETS_MS):
+        if ms <= bound:
+            row[i] += 1
+    row[-2] += 1
+    row[-1] += ms
+
+
+def observe(stage: str, ms: float):
+    """Record a stage duration in the histogram and in the current request's timings."""
+    with _lock:
+        _add(_stage_hist, stage, ms)
+    note(stage, ms)
+
+
+def note(stage: str, ms: float):
+    """Add a timing to the current request's Server-Timing only (already counted elsewhere)."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, ms))
+
+
+def add_tokens(step: str, prompt: int, completion: int, cached: int = 0):
+    with _lock:
+        for kind, n in (("prompt", prompt), ("completion", completion), ("cached", cached)):
+            _tokens[(step, kind)] = _tokens.get((step, kind), 0) + n
+
+
+def observe_request(endpoint: str, status: int, ms: float):
+    with _lock:
+        _add(_request_hist, (endpoint, str(status)), ms)
+
+
+def register(name: str, metric_type: str, help_text: str, fn):
+    """Export fn() (a number) as a gauge or counter sampled on each /metrics scrape."""
+    _callbacks.append((name, metric_type, help_text, fn))
+
+
+def start_request():
+    _request_timings.set([])
+
+
+def end_request() -> list:
+    """Return the current request's [(stage, ms)] and stop collecting."""
+    timings = _request_timings.get() or []
+    _request_timings.set(None)
+    return timings
+
+
+def server_timing(timings: list, total_ms: float = None) -> str:
+    """Server-Timing header value; repeated stages (e.g. several fetches) are summed."""
+    merged = {}
+    for stage, ms in timings:
+        dur, count = merged.get(stage, (0.0, 0))
+        merged[stage] = (dur + ms, count + 1)
+    parts = [
+        f'{stage};dur={dur:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for stage, (dur, count) in merged.items()
+    ]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+def _histogram_lines(name: str, help_text: str, hist: dict, label_names: tuple) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, row in sorted(hist.items()):
+        values = key if isinstance(key, tuple) else (key,)
+        labels = ",".join(f'{k}="{v}"' for k, v in zip(label_names, values))
+        for bound, count in zip(METRICS_BUCKETS_MS, row):
+            lines.append(f'{name}_bucket{{{labels},le="{bound / 1000:g}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {row[-2]}')
+        lines.append(f"{name}_sum{{{labels}}} {row[-1] / 1000:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {row[-2]}")
+    return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        lines = _histogram_lines(f"{PREFIX}_stage_duration_seconds", "Duration of each pipeline stage.", _stage_hist, ("stage",))
+        lines += _histogram_lines(f"{PREFIX}_request_duration_seconds", "HTTP request duration by endpoint and status.", _request_hist, ("endpoint", "status"))
+        lines += [f"# HELP {PREFIX}_llm_tokens_total OpenAI tokens by step and kind.", f"# TYPE {PREFIX}_llm_tokens_total counter"]
+        lines += [f'{PREFIX}_llm_tokens_total{{step="{step}",kind="{kind}"}} {n}' for (step, kind), n in sorted(_tokens.items())]
+    for name, metric_type, help_text, fn in _callbacks:
+        try:
+            value = fn()
+        except Exception as e:
+            print(f"[METRICS] {name} failed:", e)
+            continue
+        lines += [f"# HELP {PREFIX}_{name} {help_text}", f"# TYPE {PREFIX}_{name} {metric_type}", f"{PREFIX}_{name} {value}"]
+    return "\n".join(lines) + "\n"
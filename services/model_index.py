@@ -0,0 +1,263 @@
+import math
+import re
+from collections import defaultdict
+from config import MODEL_DATA_FILES
+from services import rule_parser, prompt_registry
+from services.filter_schema import get_filter_schema
+from services.llm_service import CLUB_TYPE_KEYWORDS
+
+MAX_SPAN_TOKENS = 4
+FUZZY_ACCEPT = 0.75  # trigram similarity at or above which a fuzzy hit counts as a model
+FUZZY_REJECT = 0.3   # below this an unknown word is treated as a plain descriptive word
+MIN_CONFIDENCE = 0.75  # local answers below this defer to the LLM classifier
+
+# Words that appear inside model names but mean nothing on their own in a query
+GENERIC_WORDS = {
+    "high", "low", "launch", "spin", "speed", "max", "tour", "pro", "plus", "lite", "light",
+    "forged", "hot", "black", "white", "big", "classic", "select", "special", "series", "super",
+    "game", "improvement", "distance", "players", "custom", "standard", "mid", "draw", "fade",
+    "offset", "one", "long", "short", "oversize", "smoke", "x", "g", "z", "s", "i", "ls", "sf",
+    "hl", "ti", "hd", "mini", "deep", "face", "center", "shaft", "neck", "slant", "bend",
+    "cheap", "best", "good", "great", "forgiving", "lightweight", "beginner", "beginners",
+    "budget", "fast", "strong", "bounce", "chrome", "finish", "alignment", "aid", "armlock",
+    "style", "firm", "turf", "replacement", "practice", "build", "versatile", "combo", "milled",
+    "like", "golfer", "handicap", "handicapper", "swing", "mph", "pair", "adjustable",
+} | {kw for keywords in CLUB_TYPE_KEYWORDS.values() for kw in keywords}
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]")
+
+
+def _compact(tokens) -> str:
+    return _NON_ALNUM_RE.sub("", "".join(tokens).lower())
+
+
+def _trigrams(s: str) -> set:
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def build_index(model_names: list) -> dict:
+    """Index every contiguous sub-phrase (≤4 tokens) of every model name by its compact form.
+
+    "JPX 923 Hot Metal" is reachable as "jpx923", "923hot", "hotmetal", ... so
+    "jpx923", "jpx 923" and "JPX-923" all hit the same key.
+    """
+    phrases = defaultdict(set)   # compact phrase -> {official model names}
+    leading = set()              # compact phrases that start a model name ("spider", "white hot")
+    trigram_index = defaultdict(set)  # trigram -> {single-token compact phrases}
+    for name in model_names:
+        tokens = name.lower().split()
+        for i in range(len(tokens)):
+            for n in range(1, min(MAX_SPAN_TOKENS, len(tokens) - i) + 1):
+                key = _compact(tokens[i:i + n])
+                if key:
+                    phrases[key].add(name)
+                    if i == 0:
+                        leading.add(key)
+        for tok in tokens:
+            key = _compact([tok])
+            if len(key) >= 3:
+                for tg in _trigrams(key):
+                    trigram_index[tg].add(key)
+    return {"phrases": phrases, "leading": leading, "trigrams": trigram_index}
+
+
+_INDEXES = {}  # club type -> (model list text it was built from, index)
+
+
+def load_model_indexes():
+    """Build the in-memory indexes for every club type (called once at startup)."""
+    return {club_type: get_model_index(club_type) for club_type in MODEL_DATA_FILES}
+
+
+def get_model_index(club_type: str) -> dict:
+    """The club type's model index, rebuilt when its model_data file changes."""
+    if club_type not in MODEL_DATA_FILES:
+        club_type = "Driver"
+    text = prompt_registry.model_list(club_type)
+    cached = _INDEXES.get(club_type)
+    if cached is None or cached[0] != text:  # model_list strips, so compare contents
+        cached = (text, build_index([ln.strip() for ln in text.splitlines() if ln.strip()]))
+        _INDEXES[club_type] = cached
+    return cached[1]
+
+
+_BRAND_TAILS = {}  # club type -> (schema it was built from, tails)
+
+
+def _brand_tails(club_type: str) -> set:
+    """Last word of every brand name ("ping", "taylormade", "cameron")."""
+    schema = get_filter_schema(club_type)
+    cached = _BRAND_TAILS.get(club_type)
+    if cached is None or cached[0] is not schema:  # prompt file was edited
+        brands = schema["params"].get("g2_brand", {}).get("values", [])
+        cached = (schema, {b.lower().split()[-1] for b in brands if b.strip()})
+        _BRAND_TAILS[club_type] = cached
+    return cached[1]
+
+
+def _fuzzy_best(index: dict, token: str):
+    """Return (score, compact phrase) of the closest single-token model phrase."""
+    key = _compact([token])
+    if len(key) < 3:
+        return 0.0, None
+    grams = _trigrams(key)
+    counts = defaultdict(int)
+    for tg in grams:
+        for cand in index["trigrams"].get(tg, ()):
+            counts[cand] += 1
+    best, best_key = 0.0, None
+    for cand, shared in counts.items():
+        score = 2 * shared / (len(grams) + len(_trigrams(cand)))
+        if score > best:
+            best, best_key = score, cand
+    return best, best_key
+
+
+def classify_locally(user_query: str, club_type: str) -> dict:
+    """Decide MODEL_SPECIFIC vs GENERIC from the model index without calling the LLM.
+
+    Returns:
+        {
+            "is_model_specific": bool, or None when the local match is ambiguous,
+            "model_phrase": str or None,   # phrase to use for q= when model-specific
+            "matched_models": [official model names],
+            "confidence": float
+        }
+    """
+    index = get_model_index(club_type)
+    parsed = rule_parser.parse_query(user_query, club_type)
+    tokens = parsed["tokens"]
+    unknown = set(parsed["leftover_positions"])
+
+    def is_hit(i, n):
+        positions = range(i, i + n)
+        key = _compact(tokens[i:i + n])
+        if key not in index["phrases"]:
+            return False
+        # Need at least one token the filter vocabulary doesn't explain that isn't just
+        # a descriptive word ("tour", "black") or a bare number ("38")...
+        distinctive = any(
+            p in unknown and tokens[p] not in GENERIC_WORDS and not tokens[p].replace(".", "").isdigit()
+            for p in positions
+        )
+        # ...though multi-word names made of plain words ("white hot") still count
+        if not (distinctive or (n > 1 and all(p in unknown for p in positions))):
+            return False
+        # Plain-word spans only count at the start of a model name: "spider" is a
+        # model line, "chrome" in "0311 Chrome" is a finish
+        return any(ch.isdigit() for ch in key) or key in index["leading"]
+
+    def strength(i, n):
+        # Alphanumeric ("g430") and multi-word ("white hot") matches are unambiguous.
+        # A single plain word ("spider", "apex") is only trusted straight after a brand.
+        if n > 1 or any(ch.isdigit() for ch in tokens[i]):
+            return 1.0
+        return 0.9 if i > 0 and tokens[i - 1] in _brand_tails(club_type) else 0.6
+
+    # Strongest, then longest, exact model span wins
+    best_span, best_strength = None, 0.0
+    covered = set()
+    i = 0
+    while i < len(tokens):
+        for n in range(min(MAX_SPAN_TOKENS, len(tokens) - i), 0, -1):
+            positions = range(i, i + n)
+            if is_hit(i, n):
+                covered.update(positions)
+                st = strength(i, n)
+                if (st, n) > (best_strength, best_span[1] if best_span else 0):
+                    best_span, best_strength = (i, n), st
+                i += n
+                break
+        else:
+            i += 1
+
+    if best_span:
+        i, n = best_span
+        phrase_tokens = tokens[i:i + n]
+        return {
+            "is_model_specific": True if best_strength >= MIN_CONFIDENCE else None,
+            "model_phrase": " ".join(phrase_tokens),
+            "matched_models": sorted(index["phrases"][_compact(phrase_tokens)])[:7],
+            "confidence": best_strength,
+        }
+
+    remaining = [tokens[p] for p in sorted(unknown - covered) if tokens[p] not in GENERIC_WORDS]
+    if not remaining:
+        return {"is_model_specific": False, "model_phrase": None, "matched_models": [], "confidence": 1.0}
+
+    # Unknown words left over: typo'd model names ("spyder"), unlisted models ("qi35"),
+    # or plain descriptive words ("adjustable"). Bare numbers ("200-400", "2023") would
+    # match model sub-phrases exactly; they leave the decision to the LLM (below)
+    best_score, best_tok, best_key = 0.0, None, None
+    for tok in remaining:
+        if tok.replace(".", "").isdigit():
+            continue
+        score, key = _fuzzy_best(index, tok)
+        if score > best_score:
+            best_score, best_tok, best_key = score, tok, key
+    if best_score >= FUZZY_ACCEPT:
+        return {
+            "is_model_specific": True,
+            "model_phrase": best_tok,
+            "matched_models": sorted(index["phrases"][best_key])[:7],
+            "confidence": round(best_score, 3),
+        }
+    if best_score < FUZZY_REJECT and not any(ch.isdigit() for tok in remaining for ch in tok):
+        return {"is_model_specific": False, "model_phrase": None, "matched_models": [], "confidence": round(1 - best_score, 3)}
+    return {"is_model_specific": None, "model_phrase": None, "matched_models": [], "confidence": round(best_score, 3)}
+
+
+_TFIDF = {}  # club type -> (model list text it was built from, index)
+
+
+def _tfidf_index(club_type: str) -> dict:
+    """Character-trigram TF-IDF vectors over the full official names for a club type."""
+    text = prompt_registry.model_list(club_type)
+    cached = _TFIDF.get(club_type)
+    if cached is not None and cached[0] == text:
+        return cached[1]
+    names = [ln.strip() for ln in text.splitlines() if ln.strip()]
+    postings = defaultdict(list)  # trigram -> [name ids]
+    for i, name in enumerate(names):
+        for tg in _trigrams(_compact([name])):
+            postings[tg].append(i)
+    n = len(names) or 1
+    idf = {tg: math.log(n / len(ids)) + 1.0 for tg, ids in postings.items()}
+    norms = [0.0] * len(names)
+    for tg, ids in postings.items():
+        for i in ids:
+            norms[i] += idf[tg] ** 2
+    index = {
+        "names": names,
+        "postings": postings,
+        "idf": idf,
+        "norms": [math.sqrt(v) or 1.0 for v in norms],
+    }
+    _TFIDF[club_type] = (text, index)
+    return index
+
+
+def top_k_models(user_query: str, club_type: str, k: int) -> list:
+    """Return the k official model names most similar to the query (cosine over trigram TF-IDF).
+
+    Only the words the filter vocabulary doesn't explain are scored, so "left handed
+    ping g430 stiff" retrieves by "g430" rather than by "stiff".
+    """
+    index = _tfidf_index(club_type)
+    parsed = rule_parser.parse_query(user_query, club_type)
+    words = parsed["leftover"] or list(parsed["tokens"])
+    query_grams = set()
+    for i in range(len(words)):
+        query_grams |= _trigrams(_compact(words[i:i + 1]))
+        if i + 1 < len(words):
+            query_grams |= _trigrams(_compact(words[i:i + 2]))  # "jpx 923" -> "jpx923"
+    scores = defaultdict(float)
+    for tg in query_grams:
+        weight = index["idf"].get(tg)
+        if weight is None:
+            continue
+        for i in index["postings"][tg]:
+            scores[i] += weight * weight
+    ranked = sorted(scores, key=lambda i: scores[i] / index["norms"][i], reverse=True)
+    return [index["names"][i] for i in ranked[:k]]
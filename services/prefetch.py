@@ -0,0 +1,88 @@
+"""Background prefetch of the next results page for /load_more.
+
+When a search (or a /load_more) finds next_page_url, that page is fetched
+and parsed on a small bounded worker pool through scrape_with_status, which
+stores it in the scrape cache, so the infinite-scroll request that follows
+is a scrape cache hit. A /load_more that arrives while its prefetch is still
+running waits for that fetch instead of starting a second one. Without the
+scrape cache (SCRAPE_CACHE_ENABLED = False) there is nowhere to keep the
+page, so nothing is prefetched.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import PREFETCH_ENABLED, PREFETCH_DEPTH, PREFETCH_WORKERS, PREFETCH_MAX_INFLIGHT, SCRAPE_TIMEOUT_SECS
+from services.filter_schema import canonical_url
+from services.scraper import scrape_with_status, get_scrape_cache
+
+_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_inflight = {}  # canonical URL -> Future
+_lock = threading.Lock()
+
+STATS = {"scheduled": 0, "completed": 0, "failed": 0, "dropped": 0, "inflight_hits": 0, "not_inflight": 0}
+
+
+def _count(key: str):
+    with _lock:
+        STATS[key] += 1
+
+
+def _job(url: str, key: str, depth: int):
+    try:
+        result, ok = scrape_with_status(url)  # a fresh scrape cache entry makes this a no-op
+        if not ok:
+            _count("failed")
+            return None
+        _count("completed")
+        next_page_url = result[3]
+        if depth > 1 and next_page_url:
+            schedule(next_page_url, depth - 1)
+        return result
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+
+def schedule(next_page_url: str, depth: int = PREFETCH_DEPTH):
+    """Start prefetching next_page_url (and up to depth-1 pages after it) into the scrape cache."""
+    if not PREFETCH_ENABLED or not next_page_url or depth <= 0 or get_scrape_cache() is None:
+        return
+    key = canonical_url(next_page_url)
+    with _lock:
+        if key in _inflight:
+            return
+        if len(_inflight) >= PREFETCH_MAX_INFLIGHT:
+            STATS["dropped"] += 1  # pool is saturated; /load_more will fetch on demand
+            return
+        STATS["scheduled"] += 1
+        _inflight[key] = _pool.submit(_job, next_page_url, key, depth)
+
+
+def take(url: str):
+    """Wait for a running prefetch of url and return its result, or None.
+
+    None means no prefetch is running: the caller scrapes as usual, which is a
+    scrape cache hit when an earlier prefetch finished.
+    """
+    if not PREFETCH_ENABLED:
+        return None
+    key = canonical_url(url)
+    with _lock:
+        future = _inflight.get(key)
+    if future is not None:
+        try:
+            result = future.result(timeout=SCRAPE_TIMEOUT_SECS)
+        except Exception as e:
+            print("Prefetch wait error:", e)
+            result = None
+        if result is not None:
+            _count("inflight_hits")
+            return result
+    _count("not_inflight")
+    return None
+
+
+def prefetch_stats() -> dict:
+    with _lock:
+        out = dict(STATS)
+        out["inflight"] = len(_inflight)
+    return out
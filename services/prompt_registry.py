@@ -0,0 +1,85 @@
+"""In-memory registry for the prompt text files.
+
+Every prompts_v2 file, the brand list and the model_data lists are read once
+(preload() at startup) and served from memory. A file is re-read when its
+mtime changes, checked at most every PROMPT_RELOAD_CHECK_SECS, so prompt
+edits go live without a restart.
+"""
+import os
+import threading
+import time
+from config import CLUB_PROMPT_FILES, MODEL_DATA_FILES, PROMPT_RELOAD_CHECK_SECS
+
+PROMPT_DIR = os.path.join("textdocs", "prompts_v2")
+BRAND_LIST_PATH = os.path.join("textdocs", "brandlist.txt")
+
+_FILES = {}  # path -> {"text": str, "mtime": float, "checked": float}
+_lock = threading.Lock()
+STATS = {"loads": 0, "reloads": 0, "errors": 0}
+
+
+def _read(path: str):
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, encoding="utf-8") as f:
+            return f.read(), mtime
+    except Exception as e:
+        print(f"[PROMPTS] error reading {path}:", e)
+        STATS["errors"] += 1
+        return None, 0.0
+
+
+def get_text(path: str, default: str = "") -> str:
+    """Return the file's contents from memory, re-reading it if it changed on disk."""
+    now = time.time()
+    entry = _FILES.get(path)
+    if entry and now - entry["checked"] < PROMPT_RELOAD_CHECK_SECS:
+        return entry["text"]
+    with _lock:
+        entry = _FILES.get(path)
+        if entry:
+            entry["checked"] = now
+            try:
+                if os.path.getmtime(path) == entry["mtime"]:
+                    return entry["text"]
+            except OSError:
+                return entry["text"]  # file vanished; keep serving the last good copy
+        text, mtime = _read(path)
+        if text is None:
+            return entry["text"] if entry else default
+        if entry:
+            print(f"[PROMPTS] reloaded {path}")
+            STATS["reloads"] += 1
+        else:
+            STATS["loads"] += 1
+        _FILES[path] = {"text": text, "mtime": mtime, "checked": now}
+        return text
+
+
+def club_prompt(club_type: str) -> str:
+    """Static prompts_v2 URL-building prompt for a club type."""
+    path = os.path.join(PROMPT_DIR, CLUB_PROMPT_FILES.get(club_type, "driver.txt"))
+    return get_text(path, "Build a URL for the chosen club type.")
+
+
+def brand_list() -> str:
+    """textdocs/brandlist.txt, stripped."""
+    return get_text(BRAND_LIST_PATH).strip()
+
+
+def model_list(club_type: str) -> str:
+    """model_data list of official model names for a club type, stripped."""
+    return get_text(os.path.join("model_data", MODEL_DATA_FILES.get(club_type, "drivers.txt"))).strip()
+
+
+def preload():
+    """Read every prompt, the brand list and all model lists into memory."""
+    for club_type in CLUB_PROMPT_FILES:
+        club_prompt(club_type)
+        model_list(club_type)
+    brand_list()
+    return stats()
+
+
+def stats() -> dict:
+    return {**STATS, "files": len(_FILES), "chars": sum(len(e["text"]) for e in _FILES.values())}
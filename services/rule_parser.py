@@ -0,0 +1,321 @@
+"""Deterministic URL builder for simple generic queries.
+
+Queries made up entirely of known filter vocabulary ("left handed stiff ping
+drivers under 300 cheapest") are mapped straight to a 2nd Swing URL using the
+same vocabularies the prompts_v2 files describe, skipping both LLM calls.
+Anything the parser doesn't recognise sends the whole query down the LLM path.
+
+Usage (coverage report over exported production queries, one JSON object per
+line with "user_query" and "club_type" keys, e.g. Mixpanel 'Search Performed'):
+    python -m services.rule_parser searches.jsonl
+"""
+import json
+import re
+import sys
+import threading
+from services.filter_schema import get_filter_schema, assemble_url
+from services.llm_service import CLUB_TYPE_KEYWORDS
+
+MAX_PHRASE_TOKENS = 4
+
+# Words that carry no filter meaning on their own
+FILLER_WORDS = {
+    "a", "an", "the", "for", "with", "and", "in", "of", "to", "by", "on", "or",
+    "flex", "shaft", "shafted", "handed", "hand", "golf", "club", "clubs", "condition",
+    "show", "me", "find", "i", "want", "need", "looking", "please", "any", "some",
+    "first", "sorted", "sort", "order", "price", "priced", "dollars", "set", "sets",
+}
+
+# Brand names that are also ordinary English words; leave these to the LLM
+AMBIGUOUS_BRANDS = {"yes", "ram", "void", "cure", "bell", "swag", "see more", "never compromise", "royalty", "pyramid"}
+
+BRAND_ALIASES = {
+    "taylor made": "TaylorMade",
+    "scotty cameron": "Titleist Scotty Cameron",
+    "lab golf": "L.A.B. Golf",
+    "lab": "L.A.B. Golf",
+}
+
+# (phrase, param, value) — value is only used if the club type's schema allows it
+SYNONYMS = [
+    ("left", "g2_dexterity", "Left Handed"),
+    ("lefty", "g2_dexterity", "Left Handed"),
+    ("lh", "g2_dexterity", "Left Handed"),
+    ("right", "g2_dexterity", "Right Handed"),
+    ("righty", "g2_dexterity", "Right Handed"),
+    ("rh", "g2_dexterity", "Right Handed"),
+    ("reg", "g2_shaft_flex", "Regular"),
+    ("extra stiff", "g2_shaft_flex", "X-Stiff"),
+    ("xstiff", "g2_shaft_flex", "X-Stiff"),
+    ("lady", "g2_shaft_flex", "Ladies"),
+    ("women", "g2_shaft_flex", "Ladies"),
+    ("womens", "g2_shaft_flex", "Ladies"),
+    ("woman", "g2_shaft_flex", "Ladies"),
+    ("new", "new_used_filter", "New"),
+    ("brand new", "new_used_filter", "New"),
+    ("used", "new_used_filter", "Used"),
+    ("pre owned", "new_used_filter", "Used"),
+    ("mint", "g2_condition", "Mint 9.5"),
+    ("above average", "g2_condition", "Above Average 9.0"),
+    ("average", "g2_condition", "Average 8.0"),
+    ("below average", "g2_condition", "Below Average 7.0"),
+    ("poor", "g2_condition", "Poor 6.0"),
+    ("muscleback", "g2_club_headsize", "Blade"),
+    ("muscle back", "g2_club_headsize", "Blade"),
+    ("zero torque", "g2_club_toehang", "Zero Torque"),
+    ("no torque", "g2_club_toehang", "Zero Torque"),
+    ("low torque", "g2_club_toehang", "Zero Torque"),
+    ("scottsdale", "g2_locations", "Scottsdale (S)"),
+    ("mallet", "g2_club_putterheadstyle", "Mallet"),
+    ("mallets", "g2_club_putterheadstyle", "Mallet"),
+]
+
+_PRICE_UNDER_RE = re.compile(r"\b(?:under|below|less than|max|up to|<)\s*\$?\s*(\d[\d,]*)\b")
+_PRICE_RANGE_RE = re.compile(r"\b(?:between|from)?\s*\$?\s*(\d[\d,]*)\s*(?:and|to|-)\s*\$?\s*(\d[\d,]*)\b")
+_LOFT_RE = re.compile(r"\b(\d{1,2}(?:\.\d)?)\s*(?:°|deg\b|degrees?\b)")
+_LENGTH_RE = re.compile(r"\b(\d{2}(?:\.\d{1,2})?)\s*(?:\"|in\b|inch\b|inches\b)")
+_TOKEN_RE = re.compile(r"[a-z0-9.]+")
+
+STATS = {"fast_path": 0, "llm": 0}
+_stats_lock = threading.Lock()
+
+
+def _normalize(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r"[‐-―]", "-", text)  # non-breaking / en / em dashes
+    text = text.replace("’", "'").replace("'", "")
+    return text
+
+
+def _tokens(text: str) -> tuple:
+    return tuple(_TOKEN_RE.findall(text.replace("-", " ")))
+
+
+_VOCAB = {}  # club type -> (schema it was built from, vocab)
+
+_CLUB_NUMBER_RE = re.compile(r"\d|^[a-z]w$")
+_CLUB_ABBREV_RE = re.compile(r"^(?:\d+|[A-Z])W$")
+
+
+def _subcategory_phrases(values: list) -> list:
+    """(phrase, value) for each club number value and its short forms.
+
+    "3 Wood 3W" is also "3 wood" and "3w"; "Sand SW" is also "sand", "sw" and "sand wedge".
+    A short form shared by two values ("gap" in "Gap AW" and "Gap GW") is left out.
+    """
+    phrases = {}
+    for value in values:
+        words = value.split()
+        forms = {value}
+        if len(words) > 1 and _CLUB_ABBREV_RE.match(words[-1]):
+            name = " ".join(words[:-1])
+            forms.update((name, words[-1]))
+            if not name[0].isdigit() and "wedge" not in name.lower():
+                forms.add(f"{name} wedge")
+        for form in forms:
+            phrases.setdefault(form.lower(), set()).add(value)
+    return [(phrase, next(iter(vals))) for phrase, vals in phrases.items() if len(vals) == 1]
+
+
+def _build_vocab(club_type: str) -> dict:
+    """Map token tuples to ("filter", param, value) / ("sort", order) / ("filler",)."""
+    schema = get_filter_schema(club_type)
+    params = schema["params"]
+    vocab = {}
+
+    def add(phrase, entry):
+        key = _tokens(_normalize(phrase))
+        if key and len(key) <= MAX_PHRASE_TOKENS and key not in vocab:
+            vocab[key] = entry
+
+    # Synonyms first so e.g. "mallet" is a head style rather than a putter keyword
+    for phrase, param, value in SYNONYMS:
+        if param in params and (params[param]["open"] or value in params[param]["values"]):
+            add(phrase, ("filter", param, value))
+
+    for word in FILLER_WORDS:
+        add(word, ("filler",))
+
+    # Club numbers before the club keywords, which would otherwise swallow them as filler.
+    # A phrase that is a plain club keyword ("putter" for the Putters value "Putter") or a
+    # bare number (Single Irons "52") names no particular club and stays out
+    club_keywords = CLUB_TYPE_KEYWORDS.get(club_type, [])
+    if "g2_subcategory" in params:
+        for phrase, value in _subcategory_phrases(params["g2_subcategory"]["values"]):
+            if phrase.replace(".", "").isdigit():
+                continue
+            if phrase in club_keywords and not _CLUB_NUMBER_RE.search(phrase):
+                continue
+            add(phrase, ("filter", "g2_subcategory", value))
+    # "8 iron" or "aw" without a matching subcategory names a club the parser can't filter
+    # on; left unrecognised, such queries go to the LLM
+    for kw in club_keywords:
+        if not _CLUB_NUMBER_RE.search(kw):
+            add(kw, ("filler",))
+
+    for order, phrases in schema["sort_orders"].items():
+        for phrase in phrases:
+            add(phrase, ("sort", order))
+
+    if "g2_brand" in params:
+        for alias, brand in BRAND_ALIASES.items():
+            if brand in params["g2_brand"]["values"]:
+                add(alias, ("filter", "g2_brand", brand))
+        for brand in params["g2_brand"]["values"]:
+            if brand.lower() not in AMBIGUOUS_BRANDS:
+                add(brand, ("filter", "g2_brand", brand))
+
+    # Every enumerated value of every filter is its own phrase ("graphite", "mallet", "black dot")
+    for param, spec in params.items():
+        if param in ("g2_brand", "g2_model", "g2_club_loft", "g2_club_length"):
+            continue
+        for value in spec["values"]:
+            if value.replace(".", "").isdigit():
+                continue
+            add(value, ("filter", param, value))
+    return vocab
+
+
+def _get_vocab(club_type: str) -> dict:
+    schema = get_filter_schema(club_type)
+    cached = _VOCAB.get(club_type)
+    if cached is None or cached[0] is not schema:  # prompt file was edited
+        cached = (schema, _build_vocab(club_type))
+        _VOCAB[club_type] = cached
+    return cached[1]
+
+
+def parse_query(user_query: str, club_type: str) -> dict:
+    """Parse a query into filters using only local vocabularies.
+
+    Returns:
+        {
+            "filters": {param: [values]},
+            "sort": str or None,
+            "leftover": [unrecognised tokens],
+            "tokens": (all tokens after numeric patterns are removed),
+            "leftover_positions": [index into tokens of each leftover token]
+        }
+    """
+    params = get_filter_schema(club_type)["params"]
+    text = _normalize(user_query)
+    filters = {}
+    sort = None
+
+    def add_filter(param, value):
+        values = filters.setdefault(param, [])
+        if value not in values:
+            values.append(value)
+
+    # Numeric patterns first; matched spans are blanked out before tokenizing
+    m = _PRICE_UNDER_RE.search(text)
+    if m and "price" in params:
+        add_filter("price", f"0-{m.group(1).replace(',', '')}")
+        text = text[:m.start()] + " " + text[m.end():]
+    else:
+        m = _PRICE_RANGE_RE.search(text)
+        if m and "price" in params and ("$" in m.group(0) or "between" in m.group(0) or "from" in m.group(0)):
+            add_filter("price", f"{m.group(1).replace(',', '')}-{m.group(2).replace(',', '')}")
+            text = text[:m.start()] + " " + text[m.end():]
+    if "g2_club_loft" in params:
+        for m in _LOFT_RE.finditer(text):
+            loft = m.group(1)[:-2] if m.group(1).endswith(".0") else m.group(1)
+            add_filter("g2_club_loft", f"{loft}°")
+        text = _LOFT_RE.sub(" ", text)
+    if "g2_club_length" in params:
+        for m in _LENGTH_RE.finditer(text):
+            length = m.group(1) if "." in m.group(1) else f"{m.group(1)}.0"
+            add_filter("g2_club_length", f"{length}in")
+        text = _LENGTH_RE.sub(" ", text)
+
+    vocab = _get_vocab(club_type)
+    tokens = _tokens(text.replace("$", " "))
+    leftover = []
+    leftover_positions = []
+    i = 0
+    while i < len(tokens):
+        # Greedy longest-phrase match
+        for n in range(min(MAX_PHRASE_TOKENS, len(tokens) - i), 0, -1):
+            entry = vocab.get(tokens[i:i + n])
+            if entry:
+                break
+        else:
+            leftover.append(tokens[i])
+            leftover_positions.append(i)
+            i += 1
+            continue
+        if entry[0] == "filter":
+            add_filter(entry[1], entry[2])
+        elif entry[0] == "sort":
+            sort = entry[1]
+        i += n
+
+    # An explicit flex beats the women -> Ladies heuristic
+    flexes = filters.get("g2_shaft_flex", [])
+    if "Ladies" in flexes and len(flexes) > 1 and not re.search(r"\blad(y|ies)\b", text):
+        flexes.remove("Ladies")
+
+    return {
+        "filters": filters,
+        "sort": sort,
+        "leftover": leftover,
+        "tokens": tokens,
+        "leftover_positions": leftover_positions,
+    }
+
+
+def build_url_locally(user_query: str, club_type: str, model_phrase: str = None):
+    """Return a URL if every token of the query is understood, else None.
+
+    With model_phrase (from the local model index) the model's tokens count as
+    understood and the MODEL_SPECIFIC catalog search shape is used with q=model_phrase.
+    """
+    if not (user_query or "").strip():
+        return None
+    parsed = parse_query(user_query, club_type)
+    leftover = list(parsed["leftover"])
+    if model_phrase:
+        for tok in _tokens(_normalize(model_phrase)):
+            if tok in leftover:
+                leftover.remove(tok)
+    if leftover:
+        return None
+    return assemble_url(club_type, parsed["filters"], sort=parsed["sort"], model_query=model_phrase)
+
+
+def record_path(fast_path: bool):
+    """Count which path a production query took (see /stats)."""
+    with _stats_lock:
+        STATS["fast_path" if fast_path else "llm"] += 1
+
+
+def stats() -> dict:
+    total = STATS["fast_path"] + STATS["llm"]
+    return {
+        "fast_path": STATS["fast_path"],
+        "llm": STATS["llm"],
+        "fast_path_fraction": round(STATS["fast_path"] / total, 4) if total else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    total = covered = 0
+    per_club = {}
+    with open(sys.argv[1], encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            club_type = row.get("club_type", "Driver")
+            hit = build_url_locally(row.get("user_query", ""), club_type) is not None
+            total += 1
+            covered += hit
+            counts = per_club.setdefault(club_type, [0, 0])
+            counts[0] += hit
+            counts[1] += 1
+    for club_type, (hits, n) in sorted(per_club.items()):
+        print(f"{club_type:15} {hits:6}/{n:<6} {hits / n:.1%}")
+    print(f"{'TOTAL':15} {covered:6}/{total:<6} {covered / total:.1%}" if total else "No queries")
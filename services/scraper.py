@@ -1,57 +1,147 @@
-import requests
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
+from config import (
+    SCRAPE_CACHE_ENABLED, SCRAPE_CACHE_BACKEND, SCRAPE_CACHE_TTL_SECS, SCRAPE_CACHE_STALE_SECS,
+    SCRAPE_CACHE_MAX_ENTRIES, SCRAPE_CACHE_DIR, SCRAPE_REFRESH_WORKERS, SCRAPE_PARSER, SCRAPE_PARSE_WORKERS,
+    SINGLEFLIGHT_ENABLED, INVENTORY_ENABLED, URL_VALIDATION_ENABLED,
+)
+from services import http_client, inventory, metrics
+from services.cache import make_cache
+from services.filter_schema import canonical_url, validate_url
+from services.singleflight import make_group
 
-def scrape_2ndswing(url: str):
-    """Scrape product data from 2nd Swing website."""
-    headers = {"User-Agent": "Mozilla/5.0"}
+EMPTY_RESULT = ([], None, [], None, False)
+
+# Scrape metrics (see /stats): calls vs. real upstream fetches, cache outcomes, upstream latency
+STATS = {
+    "calls": 0, "upstream_fetches": 0, "upstream_errors": 0, "rejected_urls": 0,
+    "fresh_hits": 0, "stale_hits": 0, "misses": 0, "background_refreshes": 0,
+}
+UPSTREAM_MS = deque(maxlen=1000)
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        STATS[key] += n
+
+
+def fetch_listing_html(url: str) -> str:
+    """GET a 2nd Swing listing page (the only network call in this module).
+
+    Raises on a non-2xx response: an error page would parse as an empty listing.
+    """
+    t = time.perf_counter()
     try:
-        soup = BeautifulSoup(requests.get(url, headers=headers, timeout=10).text, "html.parser")
-        all_data = []
-        total_count = None
-        applied_filters = []
-        next_page_url = None
-        no_results = False
-        
-        # Check for no results message - two different selectors depending on search type
-        # Filter-based no results (div.message.info.empty)
-        no_results_element = soup.select_one('div.message.info.empty')
-        if no_results_element and "We can't find products matching the selection" in no_results_element.get_text():
-            no_results = True
-        
-        # Search-based no results (q= parameter) - different selector
-        search_no_results = soup.select_one('#maincontent > div.columns > div.column.main > div.message.notice')
-        if search_no_results:
-            no_results = True
-        
-        # If no results found, still capture filters but skip scraping product tiles
-        if no_results:
-            # Capture applied filters even with no results
-            for li in soup.select('ol.items li.item'):
-                label_el = li.select_one('.filter-label')
-                value_el = li.select_one('.filter-value')
-                if label_el and value_el:
-                    label = label_el.get_text(strip=True)
-                    value = value_el.get_text(strip=True)
-                    if label and value:
-                        applied_filters.append({
-                            "label": label,
-                            "value": value,
-                        })
-            return [], None, applied_filters, None, True
-        
-        # Capture total count
-        count_tag = soup.select_one('p.toolbar-amount span.toolbar-number:last-child')
-        if count_tag:
-            try:
-                total_count = int(count_tag.get_text(strip=True).replace(',', ''))
-            except ValueError:
-                total_count = None
-
-        # Capture applied filters (label/value pairs), if present
-        # This targets structures like:
-        # <ol class="items">
-        #   <li class="item"> <span class="filter-label">Brand</span> <span class="filter-value">Ping</span> ...
-        # We scope broadly to avoid missing due to container class name differences.
+        resp = http_client.get(url)
+        resp.raise_for_status()
+        return resp.text
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        with _stats_lock:
+            STATS["upstream_fetches"] += 1
+            UPSTREAM_MS.append(ms)
+        metrics.observe("upstream_fetch", ms)
+
+
+def scrape_2ndswing_uncached(url: str):
+    """Fetch and parse a listing page, bypassing the scrape cache.
+
+    Returns (result tuple, ok); ok is False when the fetch failed (connection error or
+    non-2xx status) or the parse raised.
+    """
+    try:
+        return _timed_parse(fetch_listing_html(url)), True
+    except Exception as e:
+        print("Scrape error:", e)
+        _count("upstream_errors")
+        return EMPTY_RESULT, False
+
+
+def _timed_parse(page_html: str):
+    t = time.perf_counter()
+    result = parse_listing_html(page_html)
+    metrics.observe("html_parse", (time.perf_counter() - t) * 1000)
+    return result
+
+
+# HTML parsing is CPU-bound; the async path runs it here so the event loop keeps serving
+_parse_pool = ThreadPoolExecutor(max_workers=SCRAPE_PARSE_WORKERS, thread_name_prefix="parse")
+
+
+async def fetch_listing_html_async(url: str) -> str:
+    """fetch_listing_html on the shared httpx.AsyncClient."""
+    t = time.perf_counter()
+    try:
+        resp = await http_client.aget(url)
+        resp.raise_for_status()
+        return resp.text
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        with _stats_lock:
+            STATS["upstream_fetches"] += 1
+            UPSTREAM_MS.append(ms)
+        metrics.observe("upstream_fetch", ms)
+
+
+async def scrape_2ndswing_uncached_async(url: str):
+    """scrape_2ndswing_uncached with an async fetch and the parse on _parse_pool."""
+    try:
+        page_html = await fetch_listing_html_async(url)
+        ctx = contextvars.copy_context()  # keeps the request's Server-Timing list
+        result = await asyncio.get_running_loop().run_in_executor(_parse_pool, ctx.run, _timed_parse, page_html)
+        return result, True
+    except Exception as e:
+        print("Scrape error:", e)
+        _count("upstream_errors")
+        return EMPTY_RESULT, False
+
+
+try:
+    from services import lxml_parser
+except ImportError:  # lxml not installed
+    lxml_parser = None
+
+
+def parse_listing_html(page_html: str, backend: str = None):
+    """Parse a 2nd Swing listing page into (products, total_count, applied_filters, next_page_url, no_results).
+
+    backend is "lxml" or "bs4" (default SCRAPE_PARSER); both return identical results.
+    """
+    if (backend or SCRAPE_PARSER) == "lxml" and lxml_parser is not None:
+        return lxml_parser.parse_listing_html(page_html)
+    return parse_listing_html_bs4(page_html)
+
+
+def parse_listing_html_bs4(page_html: str):
+    """BeautifulSoup (html.parser) implementation of parse_listing_html."""
+    soup = BeautifulSoup(page_html, "html.parser")
+    all_data = []
+    total_count = None
+    applied_filters = []
+    next_page_url = None
+    no_results = False
+    
+    # Check for no results message - two different selectors depending on search type
+    # Filter-based no results (div.message.info.empty)
+    no_results_element = soup.select_one('div.message.info.empty')
+    if no_results_element and "We can't find products matching the selection" in no_results_element.get_text():
+        no_results = True
+    
+    # Search-based no results (q= parameter) - different selector
+    search_no_results = soup.select_one('#maincontent > div.columns > div.column.main > div.message.notice')
+    if search_no_results:
+        no_results = True
+    
+    # If no results found, still capture filters but skip scraping product tiles
+    if no_results:
+        # Capture applied filters even with no results
         for li in soup.select('ol.items li.item'):
             label_el = li.select_one('.filter-label')
             value_el = li.select_one('.filter-value')
@@ -63,114 +153,299 @@ def scrape_2ndswing(url: str):
                         "label": label,
                         "value": value,
                     })
+        return [], None, applied_filters, None, True
+    
+    # Capture total count
+    count_tag = soup.select_one('p.toolbar-amount span.toolbar-number:last-child')
+    if count_tag:
+        try:
+            total_count = int(count_tag.get_text(strip=True).replace(',', ''))
+        except ValueError:
+            total_count = None
+
+    # Capture applied filters (label/value pairs), if present
+    # This targets structures like:
+    # <ol class="items">
+    #   <li class="item"> <span class="filter-label">Brand</span> <span class="filter-value">Ping</span> ...
+    # We scope broadly to avoid missing due to container class name differences.
+    for li in soup.select('ol.items li.item'):
+        label_el = li.select_one('.filter-label')
+        value_el = li.select_one('.filter-value')
+        if label_el and value_el:
+            label = label_el.get_text(strip=True)
+            value = value_el.get_text(strip=True)
+            if label and value:
+                applied_filters.append({
+                    "label": label,
+                    "value": value,
+                })
 
-        # Capture next page URL from pagination
-        # Look for the "next" button or page 2 if on page 1
-        next_link = soup.select_one('ul.pages-items li.pages-item-next a.next')
-        if not next_link:
-            # Fallback: look for page 2 link if we're on page 1
-            next_link = soup.select_one('ul.pages-items li.item a[href*="p=2"]')
+    # Capture next page URL from pagination
+    # Look for the "next" button or page 2 if on page 1
+    next_link = soup.select_one('ul.pages-items li.pages-item-next a.next')
+    if not next_link:
+        # Fallback: look for page 2 link if we're on page 1
+        next_link = soup.select_one('ul.pages-items li.item a[href*="p=2"]')
+    
+    if next_link and next_link.get('href'):
+        href = next_link['href']
+        # Fix HTML entity encoding issues
+        import html
+        href = html.unescape(href)
         
-        if next_link and next_link.get('href'):
-            href = next_link['href']
-            # Fix HTML entity encoding issues
-            import html
-            href = html.unescape(href)
-            
-            # Ensure we have a full URL
-            if href.startswith('/'):
-                next_page_url = 'https://www.2ndswing.com' + href
-            elif href.startswith('http'):
-                next_page_url = href
-            else:
-                next_page_url = None
-            print(f"Next page URL found: {next_page_url}")
+        # Ensure we have a full URL
+        if href.startswith('/'):
+            next_page_url = 'https://www.2ndswing.com' + href
+        elif href.startswith('http'):
+            next_page_url = href
         else:
-            print("No next page URL found")
-
-        for card in soup.select("div.product-box.product-item-info"):
-            brand = card.find("div", class_="product-brand")
-            brand = brand.get_text(strip=True) if brand else "N/A"
-            
-            model_tag = card.find("div", class_="pmp-product-category") or card.find("div", class_="p-title")
-            model = model_tag.get_text(strip=True) if model_tag else "N/A"
-            
-            img_tag = card.find("img", class_="product-image-photo")
-            img_url = img_tag["src"] if img_tag else ""
-            
-            link_tag = card.select_one("a.product.photo.product-item-photo")
-            product_url = link_tag["href"] if link_tag else ""
-
-            # Determine if this is a parent model card. Previously we required BOTH used and new variants.
-            # Some parent tiles (e.g., Pre-order) may only have NEW variants. Treat those as parent models too.
-            has_used_variants = card.get("data-itemhasused") == "1"
-            has_new_variants = card.get("data-hasnewvariants") == "1"
-            has_variant_links = bool(card.find_all("a", class_="new-used-listing-link"))
-            parent_model = bool(has_new_variants or (has_used_variants and has_new_variants) or has_variant_links)
-
-            # Capture ALL attrs dynamically
-            attrs = {}
-            attr_block = card.find("div", class_="pmp-attribute")
-            if attr_block:
-                for lbl in attr_block.select("span.pmp-attribute-label"):
-                    key = lbl.get_text(strip=True).rstrip(":").lower()
-                    val = lbl.next_sibling
-                    while val and getattr(val, "name", None) == "br":
-                        val = val.next_sibling
-                    if val:
-                        attrs[key] = val.strip() if isinstance(val, str) else val.get_text(strip=True)
-
-            # Price & condition (if single‑used)
-            price = condition = "N/A"
-            new_price = new_url = used_price = used_url = None
-            
-            if not parent_model:
-                price_div = card.find("div", class_="current-price")
-                price = price_div.get_text(strip=True) if price_div else "N/A"
-                cond_div = card.find("div", class_="pmp-product-condition")
-                condition = cond_div.get_text(strip=True) if cond_div else "N/A"
-            else:
-                # Extract New and Used pricing for parent models
-                new_used_links = card.find_all("a", class_="new-used-listing-link")
-                for link in new_used_links:
-                    href = link.get("href", "")
-                    price_span = link.find("span", class_="price") or link.find("span", class_="old-price")
-                    label_text = link.get_text(" ", strip=True).lower()
-
-                    is_new = ("new_used_filter=New" in href) or ("new" in label_text and "used" not in label_text)
-                    is_used = ("new_used_filter=Used" in href) or ("used" in label_text)
-
-                    if is_new and price_span:
-                        new_price = price_span.get_text(strip=True)
-                        new_url = href
-                    elif is_used and price_span:
-                        used_price = price_span.get_text(strip=True)
-                        used_url = href
-
-                # Fallbacks: some Pre-order tiles may not use the standard link structure
-                if not new_price:
-                    # Try to read a visible current price within the card as NEW price
-                    price_div = card.find("div", class_="current-price") or card.find("span", class_="price")
-                    if price_div:
-                        new_price = price_div.get_text(strip=True)
-                        new_url = product_url  # fall back to product page
-
-            all_data.append({
-                "brand": brand,
-                "model": model,
-                "img_url": img_url,
-                "url": product_url,
-                "price": price,
-                "condition": condition,
-                "parent_model": parent_model,
-                "new_price": new_price,
-                "new_url": new_url,
-                "used_price": used_price,
-                "used_url": used_url,
-                "attrs": attrs,
-            })
-        return all_data, total_count, applied_filters, next_page_url, no_results
-    except Exception as e:
-        print("Scrape error:", e)
-        return [], None, [], None, False
- 
\ No newline at end of file
+            next_page_url = None
+        print(f"Next page URL found: {next_page_url}")
+    else:
+        print("No next page URL found")
+
+    for card in soup.select("div.product-box.product-item-info"):
+        brand = card.find("div", class_="product-brand")
+        brand = brand.get_text(strip=True) if brand else "N/A"
+        
+        model_tag = card.find("div", class_="pmp-product-category") or card.find("div", class_="p-title")
+        model = model_tag.get_text(strip=True) if model_tag else "N/A"
+        
+        img_tag = card.find("img", class_="product-image-photo")
+        img_url = img_tag["src"] if img_tag else ""
+        
+        link_tag = card.select_one("a.product.photo.product-item-photo")
+        product_url = link_tag["href"] if link_tag else ""
+
+        # Determine if this is a parent model card. Previously we required BOTH used and new variants.
+        # Some parent tiles (e.g., Pre-order) may only have NEW variants. Treat those as parent models too.
+        has_used_variants = card.get("data-itemhasused") == "1"
+        has_new_variants = card.get("data-hasnewvariants") == "1"
+        has_variant_links = bool(card.find_all("a", class_="new-used-listing-link"))
+        parent_model = bool(has_new_variants or (has_used_variants and has_new_variants) or has_variant_links)
+
+        # Capture ALL attrs dynamically
+        attrs = {}
+        attr_block = card.find("div", class_="pmp-attribute")
+        if attr_block:
+            for lbl in attr_block.select("span.pmp-attribute-label"):
+                key = lbl.get_text(strip=True).rstrip(":").lower()
+                val = lbl.next_sibling
+                while val and getattr(val, "name", None) == "br":
+                    val = val.next_sibling
+                if val:
+                    attrs[key] = val.strip() if isinstance(val, str) else val.get_text(strip=True)
+
+        # Price & condition (if single‑used)
+        price = condition = "N/A"
+        new_price = new_url = used_price = used_url = None
+        
+        if not parent_model:
+            price_div = card.find("div", class_="current-price")
+            price = price_div.get_text(strip=True) if price_div else "N/A"
+            cond_div = card.find("div", class_="pmp-product-condition")
+            condition = cond_div.get_text(strip=True) if cond_div else "N/A"
+        else:
+            # Extract New and Used pricing for parent models
+            new_used_links = card.find_all("a", class_="new-used-listing-link")
+            for link in new_used_links:
+                href = link.get("href", "")
+                price_span = link.find("span", class_="price") or link.find("span", class_="old-price")
+                label_text = link.get_text(" ", strip=True).lower()
+
+                is_new = ("new_used_filter=New" in href) or ("new" in label_text and "used" not in label_text)
+                is_used = ("new_used_filter=Used" in href) or ("used" in label_text)
+
+                if is_new and price_span:
+                    new_price = price_span.get_text(strip=True)
+                    new_url = href
+                elif is_used and price_span:
+                    used_price = price_span.get_text(strip=True)
+                    used_url = href
+
+            # Fallbacks: some Pre-order tiles may not use the standard link structure
+            if not new_price:
+                # Try to read a visible current price within the card as NEW price
+                price_div = card.find("div", class_="current-price") or card.find("span", class_="price")
+                if price_div:
+                    new_price = price_div.get_text(strip=True)
+                    new_url = product_url  # fall back to product page
+
+        all_data.append({
+            "brand": brand,
+            "model": model,
+            "img_url": img_url,
+            "url": product_url,
+            "price": price,
+            "condition": condition,
+            "parent_model": parent_model,
+            "new_price": new_price,
+            "new_url": new_url,
+            "used_price": used_price,
+            "used_url": used_url,
+            "attrs": attrs,
+        })
+    return all_data, total_count, applied_filters, next_page_url, no_results
+ 
+
+_cache = None
+_cache_lock = threading.Lock()
+_refresh_pool = ThreadPoolExecutor(max_workers=SCRAPE_REFRESH_WORKERS, thread_name_prefix="scrape-refresh")
+_refreshing = set()  # canonical URLs with a background refresh in flight
+
+
+def get_scrape_cache():
+    """The scrape result cache (created on first use), or None when disabled."""
+    global _cache
+    if not SCRAPE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                redis_url = os.environ.get("REDIS_URL") if SCRAPE_CACHE_BACKEND == "redis" else None
+                disk_dir = SCRAPE_CACHE_DIR if SCRAPE_CACHE_BACKEND == "disk" else None
+                # Entries live for fresh + stale window; freshness is checked against fetched_at
+                _cache = make_cache(
+                    "scrape", SCRAPE_CACHE_MAX_ENTRIES, SCRAPE_CACHE_TTL_SECS + SCRAPE_CACHE_STALE_SECS,
+                    redis_url, disk_dir,
+                )
+    return _cache
+
+
+def _store(cache, key: str, result):
+    cache.set(key, {"fetched_at": time.time(), "result": list(result)})
+
+
+def _refresh(url: str, key: str):
+    try:
+        result, ok = scrape_2ndswing_uncached(url)
+        if ok:
+            _store(get_scrape_cache(), key, result)
+    finally:
+        with _cache_lock:
+            _refreshing.discard(key)
+
+
+def scrape_2ndswing(url: str):
+    """Scrape product data from 2nd Swing website.
+
+    Results are cached by canonical URL. Within SCRAPE_CACHE_TTL_SECS a cached
+    page is returned as is; for SCRAPE_CACHE_STALE_SECS after that the stale page
+    is returned immediately while a background refresh replaces it.
+    """
+    return scrape_with_status(url)[0]
+
+
+def _from_cache(cache, url: str, key: str):
+    """Fresh or stale cached result (stale ones get a background refresh), or None."""
+    entry = cache.get(key)
+    if entry is not None:
+        age = time.time() - entry["fetched_at"]
+        if age < SCRAPE_CACHE_TTL_SECS:
+            _count("fresh_hits")
+            return tuple(entry["result"]), True
+        _count("stale_hits")
+        with _cache_lock:
+            start = key not in _refreshing
+            _refreshing.add(key)
+        if start:
+            _count("background_refreshes")
+            _refresh_pool.submit(_refresh, url, key)
+        return tuple(entry["result"]), True
+    _count("misses")
+    return None
+
+
+# Concurrent requests for the same canonical URL share one upstream fetch + parse
+_fetch_flight = make_group("scrape") if SINGLEFLIGHT_ENABLED else None
+
+
+def _shared_cache_hit(key: str):
+    cache = get_scrape_cache()
+    entry = cache.get(key) if cache is not None else None
+    return (tuple(entry["result"]), True) if entry else None
+
+
+def _fetch_and_store(url: str, key: str):
+    result, ok = scrape_2ndswing_uncached(url)
+    cache = get_scrape_cache()
+    if ok and cache is not None:  # never cache fetch errors
+        _store(cache, key, result)
+    return result, ok
+
+
+async def _fetch_and_store_async(url: str, key: str):
+    result, ok = await scrape_2ndswing_uncached_async(url)
+    cache = get_scrape_cache()
+    if ok and cache is not None:
+        _store(cache, key, result)
+    return result, ok
+
+
+def scrape_with_status(url: str):
+    """scrape_2ndswing that also returns ok=False when the upstream fetch failed.
+
+    The URL is checked and canonicalised first (URL_VALIDATION_ENABLED). With
+    INVENTORY_ENABLED, listing URLs the local snapshot can answer never reach the site.
+    """
+    _count("calls")
+    if URL_VALIDATION_ENABLED:
+        url, _ = validate_url(url)
+        if url is None:  # not a 2nd Swing URL: don't spend a fetch (and its timeout) on it
+            _count("rejected_urls")
+            return EMPTY_RESULT, False
+    if INVENTORY_ENABLED:
+        local = inventory.search(url)
+        if local is not None:
+            return local, True
+    cache = get_scrape_cache()
+    key = canonical_url(url)
+    if cache is not None:
+        hit = _from_cache(cache, url, key)
+        if hit is not None:
+            return hit
+    if _fetch_flight is None:
+        return _fetch_and_store(url, key)
+    return _fetch_flight.do(key, lambda: _fetch_and_store(url, key), lookup=lambda: _shared_cache_hit(key))[0]
+
+
+async def scrape_with_status_async(url: str):
+    """scrape_with_status for the ASGI app; cache hits return without touching the network."""
+    _count("calls")
+    if URL_VALIDATION_ENABLED:
+        url, _ = validate_url(url)
+        if url is None:  # not a 2nd Swing URL: don't spend a fetch (and its timeout) on it
+            _count("rejected_urls")
+            return EMPTY_RESULT, False
+    if INVENTORY_ENABLED:
+        local = inventory.search(url)  # indexed SQLite lookup, fast enough to run inline
+        if local is not None:
+            return local, True
+    cache = get_scrape_cache()
+    key = canonical_url(url)
+    if cache is not None:
+        hit = _from_cache(cache, url, key)
+        if hit is not None:
+            return hit
+    if _fetch_flight is None:
+        return await _fetch_and_store_async(url, key)
+    return (await _fetch_flight.do_async(key, lambda: _fetch_and_store_async(url, key), lookup=lambda: _shared_cache_hit(key)))[0]
+
+
+async def scrape_2ndswing_async(url: str):
+    """Async scrape_2ndswing: (products, total_count, applied_filters, next_page_url, no_results)."""
+    return (await scrape_with_status_async(url))[0]
+
+
+def scrape_stats() -> dict:
+    with _stats_lock:
+        out = dict(STATS)
+        ordered = sorted(UPSTREAM_MS)
+    out["upstream_per_call"] = round(out["upstream_fetches"] / out["calls"], 4) if out["calls"] else 0.0
+    if ordered:
+        out["upstream_p50_ms"] = round(ordered[len(ordered) // 2], 1)
+        out["upstream_p95_ms"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1)
+    cache = get_scrape_cache()
+    out["cache"] = cache.stats() if cache is not None else None
+    out["singleflight"] = _fetch_flight.stats() if _fetch_flight is not None else None
+    return out
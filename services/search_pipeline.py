@@ -0,0 +1,441 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    DEBUG_DUMP_SYSTEM_PROMPT, RULE_FAST_PATH_ENABLED, LOCAL_CLASSIFIER_ENABLED,
+    USE_MODEL_FILTERS, URL_BUILD_MODE, SPECULATIVE_URL_BUILD, SPECULATIVE_POOL_SIZE, SINGLEFLIGHT_ENABLED,
+    SEMANTIC_CACHE_ENABLED, URL_VALIDATION_ENABLED,
+)
+from services.cache import query_cache_key, text_hash
+from services.filter_schema import sanitize_filters, assemble_url, validate_url
+from services.llm_service import (
+    classify_query_is_model_specific, build_url_with_llm, detect_club_type_mismatch, extract_and_map_models,
+    extract_filters_with_llm, parse_mapped_models, classify_query_is_model_specific_async, build_url_with_llm_async,
+    extract_and_map_models_async, extract_filters_with_llm_async,
+)
+from services import metrics, rule_parser, model_index, prompt_registry, semantic_cache
+from services.singleflight import make_group
+
+# Threads for SPECULATIVE_URL_BUILD (3 LLM calls per request in flight at once)
+_SPECULATIVE_POOL = ThreadPoolExecutor(max_workers=SPECULATIVE_POOL_SIZE, thread_name_prefix="speculative")
+
+# Concurrent identical searches (same normalized query, club type and prompt) share one LLM build
+_llm_flight = make_group("llm") if SINGLEFLIGHT_ENABLED else None
+
+# Paraphrases of queries the LLM already answered (this process only)
+_semantic = semantic_cache.SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+
+# Recent per-stage timings per path ("rules", "cache", "semantic", "llm", "speculative", "coalesced")
+TIMING_SAMPLES = 1000
+STAGE_TIMINGS = {}
+_timings_lock = threading.Lock()
+
+
+def load_system_prompt(club_type: str) -> str:
+    """The prompts_v2 system prompt for a club type (served from the prompt registry)."""
+    return prompt_registry.club_prompt(club_type)
+
+
+def _local_classification(user_query: str, club_type: str, is_model_specific: bool) -> dict:
+    """Classification dict in the classify_query_is_model_specific shape, without the LLM."""
+    potential_clubtype_mismatch, intended_club_type = detect_club_type_mismatch(user_query, club_type)
+    return {
+        "is_model_specific": is_model_specific,
+        "potential_clubtype_mismatch": potential_clubtype_mismatch,
+        "intended_club_type": intended_club_type,
+        "classification_error": False,
+    }
+
+
+def build_url_from_filters(user_query: str, club_type: str, system_prompt: str, is_model_specific: bool,
+                           mapped_models: str, request_inputs: str = "") -> str:
+    """URL_BUILD_MODE="json": the LLM returns filters as JSON and the URL is assembled locally.
+
+    Returns "" when the structured output is unusable so the caller can fall back
+    to build_url_with_llm.
+    """
+    return _url_from_structured(extract_filters_with_llm(user_query, system_prompt, request_inputs),
+                                club_type, is_model_specific, mapped_models)
+
+
+def _url_from_structured(data, club_type: str, is_model_specific: bool, mapped_models: str) -> str:
+    """Sanitize the model's {"filters", "sort", "q"} and assemble the URL ("" if unusable)."""
+    if data is None:
+        return ""
+    raw_filters = data.get("filters") or {}
+    filters, sort, dropped = sanitize_filters(club_type, raw_filters, data.get("sort"))
+    if dropped:
+        print(f"[DEBUG] dropped filters not in the {club_type} schema: {dropped}")
+
+    models = parse_mapped_models(mapped_models)
+    if models:
+        filters["g2_model"] = models
+
+    model_query = None
+    if is_model_specific and not models:
+        q = data.get("q") or raw_filters.get("q")
+        if isinstance(q, list):
+            q = q[0] if q else None
+        model_query = str(q).strip() if q else None
+        if not model_query:
+            print("[DEBUG] structured output has no q for a MODEL_SPECIFIC query")
+            return ""
+    return assemble_url(club_type, filters, sort=sort, model_query=model_query)
+
+
+def _url_inputs(user_query: str, club_type: str, base_prompt: str, url_shape: str) -> str:
+    """Per-request lines appended after the static prompt (dumped when DEBUG_DUMP_SYSTEM_PROMPT)."""
+    # Classifier result goes after the static prompt so the provider can cache the prefix
+    request_inputs = (
+        f"CLASSIFICATION: {url_shape}\n"
+        f"CLUB_TYPE: {club_type}\n"
+    )
+
+    # Debug: dump system prompt to CLI if enabled
+    if DEBUG_DUMP_SYSTEM_PROMPT:
+        print("\n" + "="*80)
+        print("SYSTEM PROMPT DEBUG DUMP")
+        print("="*80)
+        print(f"Club Type: {club_type}")
+        print(f"User Query: {user_query}")
+        print("-"*80)
+        print(base_prompt)
+        print(request_inputs)
+        print("="*80 + "\n")
+    return request_inputs
+
+
+def _generate_url(user_query: str, club_type: str, base_prompt: str, url_shape: str, mapped_models: str = "") -> str:
+    """Run the URL-building LLM call for one CLASSIFICATION shape."""
+    request_inputs = _url_inputs(user_query, club_type, base_prompt, url_shape)
+
+    # Generate URL (model names go in q= unless mapped to g2_model filters)
+    generated_url = ""
+    if URL_BUILD_MODE == "json":
+        generated_url = build_url_from_filters(
+            user_query, club_type, base_prompt, url_shape == "MODEL_SPECIFIC", mapped_models, request_inputs
+        )
+    if not generated_url:
+        generated_url = build_url_with_llm(user_query, base_prompt, mapped_models, request_inputs)
+    return generated_url
+
+
+async def _generate_url_async(user_query: str, club_type: str, base_prompt: str, url_shape: str, mapped_models: str = "") -> str:
+    """_generate_url on the async OpenAI client."""
+    request_inputs = _url_inputs(user_query, club_type, base_prompt, url_shape)
+    generated_url = ""
+    if URL_BUILD_MODE == "json":
+        data = await extract_filters_with_llm_async(user_query, base_prompt, request_inputs)
+        generated_url = _url_from_structured(data, club_type, url_shape == "MODEL_SPECIFIC", mapped_models)
+    if not generated_url:
+        generated_url = await build_url_with_llm_async(user_query, base_prompt, mapped_models, request_inputs)
+    return generated_url
+
+
+def _speculative_classify_and_build(user_query: str, club_type: str, base_prompt: str, timings: dict):
+    """Start the classifier and both URL-builder variants at once; keep the URL the classifier picks.
+
+    The losing variant can't be interrupted mid-request; its result is discarded
+    (or it never starts if the pool is busy and it is cancelled in time).
+    """
+    t = time.perf_counter()
+    classify_future = _SPECULATIVE_POOL.submit(classify_query_is_model_specific, user_query, club_type)
+    url_futures = {
+        shape: _SPECULATIVE_POOL.submit(_generate_url, user_query, club_type, base_prompt, shape)
+        for shape in ("MODEL_SPECIFIC", "GENERIC")
+    }
+    classification = classify_future.result()
+    timings["classify_ms"] = (time.perf_counter() - t) * 1000
+    metrics.note("llm_classify", timings["classify_ms"])  # ran on a pool thread; show it on this request
+
+    shape = "MODEL_SPECIFIC" if classification["is_model_specific"] else "GENERIC"
+    for other, future in url_futures.items():
+        if other != shape:
+            future.cancel()
+    generated_url = url_futures[shape].result()
+    timings["build_url_ms"] = (time.perf_counter() - t) * 1000 - timings["classify_ms"]  # time spent waiting after classify
+    metrics.note("llm_build_url_wait", timings["build_url_ms"])
+    print(f"[SPECULATIVE] classify {timings['classify_ms']:.0f} ms, kept {shape} URL after +{timings['build_url_ms']:.0f} ms")
+    return classification, generated_url
+
+
+def record_timings(path: str, timings: dict):
+    """Keep the most recent per-stage timings for each path (see timing_stats)."""
+    with _timings_lock:
+        stages = STAGE_TIMINGS.setdefault(path, {})
+        for stage, ms in timings.items():
+            stages.setdefault(stage, deque(maxlen=TIMING_SAMPLES)).append(ms)
+
+
+def _pct(ordered: list, pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def singleflight_stats():
+    """Leader / coalesced counts for identical concurrent LLM builds (None when disabled)."""
+    return _llm_flight.stats() if _llm_flight is not None else None
+
+
+def semantic_cache_stats():
+    """Lookups, hits and signature rejects of the near-duplicate cache (None when disabled)."""
+    return _semantic.stats() if _semantic is not None else None
+
+
+def timing_stats() -> dict:
+    """p50/p95 per stage over the last TIMING_SAMPLES requests of each path."""
+    out = {}
+    with _timings_lock:
+        for path, stages in STAGE_TIMINGS.items():
+            out[path] = {}
+            for stage, samples in stages.items():
+                ordered = sorted(samples)
+                out[path][stage] = {
+                    "n": len(ordered),
+                    "p50_ms": round(_pct(ordered, 50), 1),
+                    "p95_ms": round(_pct(ordered, 95), 1),
+                }
+    return out
+
+
+def _cached_or_local(user_query: str, club_type: str, cache, t_start: float, timings: dict):
+    """Everything before the LLM: local classifier, rule fast path and query cache.
+
+    Returns (result, state): result is the finished build_search_url dict when
+    no LLM call is needed, else None and state carries what the LLM path needs.
+    """
+    # Local model-name index decides MODEL_SPECIFIC/GENERIC unless the match is ambiguous
+    local = model_index.classify_locally(user_query, club_type) if LOCAL_CLASSIFIER_ENABLED else None
+    timings["local_ms"] = (time.perf_counter() - t_start) * 1000
+    metrics.observe("local_classify", timings["local_ms"])
+    local_decided = local is not None and local["is_model_specific"] is not None
+
+    # Fast path: queries made only of known filter vocabulary (plus at most one
+    # locally matched model phrase) never need the LLM
+    if RULE_FAST_PATH_ENABLED:
+        model_phrase = local["model_phrase"] if local_decided and local["is_model_specific"] else None
+        local_url = rule_parser.build_url_locally(user_query, club_type, model_phrase)
+        rule_parser.record_path(local_url is not None)
+        if local_url:
+            print(f"[FASTPATH] rule-based URL for '{user_query}' ({club_type}): {local_url}")
+            timings["total_ms"] = (time.perf_counter() - t_start) * 1000
+            record_timings("rules", timings)
+            return {
+                "classification": _local_classification(user_query, club_type, bool(model_phrase)),
+                "generated_url": local_url,
+                "source": "rules",
+                "timings": timings,
+            }, None
+
+    base_prompt = load_system_prompt(club_type)
+
+    # Both LLM calls run at temperature=0, so identical inputs give identical outputs.
+    # The prompt hash is part of the key so prompt edits invalidate old entries.
+    prompt_hash = text_hash(base_prompt + f"|model_filters={USE_MODEL_FILTERS}|mode={URL_BUILD_MODE}")
+    cache_key = query_cache_key(user_query, club_type, prompt_hash)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached:
+            print(f"[CACHE] query cache hit for '{user_query}' ({club_type})")
+            timings["total_ms"] = (time.perf_counter() - t_start) * 1000
+            record_timings("cache", timings)
+            return {
+                "classification": cached["classification"],
+                "generated_url": cached["generated_url"],
+                "source": "cache",
+                "timings": timings,
+            }, None
+
+    # Near-duplicate of a query the LLM already answered for this club type and prompt
+    semantic_key = None
+    if _semantic is not None:
+        t = time.perf_counter()
+        model_phrase = local["model_phrase"] if local_decided and local["is_model_specific"] else None
+        semantic_key = (f"{club_type}|{prompt_hash}", semantic_cache.signature(user_query, club_type, model_phrase))
+        near = _semantic.lookup(user_query, *semantic_key)
+        timings["semantic_ms"] = (time.perf_counter() - t) * 1000
+        metrics.observe("semantic_lookup", timings["semantic_ms"])
+        if near:
+            print(f"[CACHE] near-duplicate of '{near['query']}' ({near['similarity']:.2f}) for '{user_query}' ({club_type})")
+            timings["total_ms"] = (time.perf_counter() - t_start) * 1000
+            record_timings("semantic", timings)
+            return {
+                "classification": near["value"]["classification"],
+                "generated_url": near["value"]["generated_url"],
+                "source": "semantic",
+                "timings": timings,
+            }, None
+
+    if local_decided:
+        print(f"[DEBUG] local classification: {local}")
+    return None, {
+        "user_query": user_query,
+        "club_type": club_type,
+        "base_prompt": base_prompt,
+        "cache_key": cache_key,
+        "semantic_key": semantic_key,
+        "local_classification": _local_classification(user_query, club_type, local["is_model_specific"]) if local_decided else None,
+        "speculative": SPECULATIVE_URL_BUILD and not local_decided and not USE_MODEL_FILTERS,
+    }
+
+
+def _llm_result(classification: dict, generated_url: str, state: dict, cache, t_start: float, timings: dict) -> dict:
+    # Repair what the model wrote against the club type's schema before it is cached or
+    # fetched; a URL that can't be repaired counts as a failed build
+    if URL_VALIDATION_ENABLED and generated_url:
+        generated_url = validate_url(generated_url, state["club_type"])[0] or ""
+
+    timings["total_ms"] = (time.perf_counter() - t_start) * 1000
+    record_timings("speculative" if state["speculative"] else "llm", timings)
+
+    # Don't cache failures (build_url_with_llm returns "" on OpenAI errors,
+    # and a failed classification silently falls back to GENERIC)
+    if generated_url and not classification.get("classification_error"):
+        entry = {"classification": classification, "generated_url": generated_url}
+        if cache is not None:
+            cache.set(state["cache_key"], entry)
+        if state["semantic_key"] is not None:
+            _semantic.add(state["user_query"], *state["semantic_key"], entry)
+
+    return {
+        "classification": classification,
+        "generated_url": generated_url,
+        "source": "llm",
+        "timings": timings,
+    }
+
+
+def build_search_url(user_query: str, club_type: str, cache=None) -> dict:
+    """Classify the query and build the 2nd Swing URL, consulting the query cache first.
+
+    Returns:
+        {
+            "classification": dict from classify_query_is_model_specific,
+            "generated_url": str,
+            "source": "rules" | "cache" | "semantic" | "llm" | "coalesced",
+            "timings": {stage: ms}
+        }
+    """
+    t_start = time.perf_counter()
+    timings = {}
+    result, state = _cached_or_local(user_query, club_type, cache, t_start, timings)
+    if result:
+        return result
+    if _llm_flight is None:
+        return _build_with_llm(user_query, club_type, state, cache, t_start, timings)
+    result, coalesced = _llm_flight.do(
+        state["cache_key"],
+        lambda: _build_with_llm(user_query, club_type, state, cache, t_start, timings),
+        lookup=lambda: _shared_cache_result(cache, state["cache_key"]),
+    )
+    return _coalesced(result, t_start) if coalesced else result
+
+
+def _shared_cache_result(cache, cache_key: str):
+    """Result another worker just stored in the (shared) query cache, if any."""
+    cached = cache.get(cache_key) if cache is not None else None
+    if not cached:
+        return None
+    return {"classification": cached["classification"], "generated_url": cached["generated_url"], "source": "cache", "timings": {}}
+
+
+def _coalesced(result: dict, t_start: float) -> dict:
+    """A duplicate's view of the leader's result: same URL, its own wait time."""
+    timings = {"total_ms": (time.perf_counter() - t_start) * 1000}
+    record_timings("coalesced", timings)
+    print(f"[SINGLEFLIGHT] shared an in-flight LLM build after {timings['total_ms']:.0f} ms")
+    return dict(result, source="coalesced", timings=timings)
+
+
+def _build_with_llm(user_query: str, club_type: str, state: dict, cache, t_start: float, timings: dict) -> dict:
+    base_prompt = state["base_prompt"]
+
+    # Check if query is model-specific and detect club type mismatch
+    speculative = state["speculative"]
+    if state["local_classification"]:
+        classification = state["local_classification"]
+    elif speculative:
+        classification, generated_url = _speculative_classify_and_build(user_query, club_type, base_prompt, timings)
+    else:
+        t = time.perf_counter()
+        classification = classify_query_is_model_specific(user_query, club_type)
+        timings["classify_ms"] = (time.perf_counter() - t) * 1000
+    is_model_specific = classification["is_model_specific"]
+
+    if not speculative:
+        # Optionally map model names to exact g2_model[i] filters on the listing page
+        # (extract_and_map_models only sends top-k candidate names, so this is cheap now)
+        mapped_models = ""
+        if USE_MODEL_FILTERS and is_model_specific:
+            t = time.perf_counter()
+            mapped_models = extract_and_map_models(user_query, club_type)
+            timings["extract_models_ms"] = (time.perf_counter() - t) * 1000
+        url_shape = "MODEL_SPECIFIC" if is_model_specific and not mapped_models else "GENERIC"
+
+        t = time.perf_counter()
+        generated_url = _generate_url(user_query, club_type, base_prompt, url_shape, mapped_models)
+        timings["build_url_ms"] = (time.perf_counter() - t) * 1000
+
+    return _llm_result(classification, generated_url, state, cache, t_start, timings)
+
+
+async def build_search_url_async(user_query: str, club_type: str, cache=None) -> dict:
+    """build_search_url for the ASGI app: same result, LLM calls awaited on the async client.
+
+    In speculative mode the losing URL-builder call is actually cancelled.
+    """
+    t_start = time.perf_counter()
+    timings = {}
+    result, state = _cached_or_local(user_query, club_type, cache, t_start, timings)
+    if result:
+        return result
+    if _llm_flight is None:
+        return await _build_with_llm_async(user_query, club_type, state, cache, t_start, timings)
+    result, coalesced = await _llm_flight.do_async(
+        state["cache_key"],
+        lambda: _build_with_llm_async(user_query, club_type, state, cache, t_start, timings),
+        lookup=lambda: _shared_cache_result(cache, state["cache_key"]),
+    )
+    return _coalesced(result, t_start) if coalesced else result
+
+
+async def _build_with_llm_async(user_query: str, club_type: str, state: dict, cache, t_start: float, timings: dict) -> dict:
+    base_prompt = state["base_prompt"]
+
+    if state["local_classification"]:
+        classification = state["local_classification"]
+    elif state["speculative"]:
+        t = time.perf_counter()
+        classify_task = asyncio.ensure_future(classify_query_is_model_specific_async(user_query, club_type))
+        url_tasks = {
+            shape: asyncio.ensure_future(_generate_url_async(user_query, club_type, base_prompt, shape))
+            for shape in ("MODEL_SPECIFIC", "GENERIC")
+        }
+        classification = await classify_task
+        timings["classify_ms"] = (time.perf_counter() - t) * 1000
+        shape = "MODEL_SPECIFIC" if classification["is_model_specific"] else "GENERIC"
+        for other, task in url_tasks.items():
+            if other != shape:
+                task.cancel()
+        generated_url = await url_tasks[shape]
+        timings["build_url_ms"] = (time.perf_counter() - t) * 1000 - timings["classify_ms"]
+        print(f"[SPECULATIVE] classify {timings['classify_ms']:.0f} ms, kept {shape} URL after +{timings['build_url_ms']:.0f} ms")
+        return _llm_result(classification, generated_url, state, cache, t_start, timings)
+    else:
+        t = time.perf_counter()
+        classification = await classify_query_is_model_specific_async(user_query, club_type)
+        timings["classify_ms"] = (time.perf_counter() - t) * 1000
+    is_model_specific = classification["is_model_specific"]
+
+    mapped_models = ""
+    if USE_MODEL_FILTERS and is_model_specific:
+        t = time.perf_counter()
+        mapped_models = await extract_and_map_models_async(user_query, club_type)
+        timings["extract_models_ms"] = (time.perf_counter() - t) * 1000
+    url_shape = "MODEL_SPECIFIC" if is_model_specific and not mapped_models else "GENERIC"
+
+    t = time.perf_counter()
+    generated_url = await _generate_url_async(user_query, club_type, base_prompt, url_shape, mapped_models)
+    timings["build_url_ms"] = (time.perf_counter() - t) * 1000
+    return _llm_result(classification, generated_url, state, cache, t_start, timings)
@@ -0,0 +1,159 @@
+"""Near-duplicate query cache: a paraphrase of an earlier LLM-built search reuses its URL.
+
+The exact query cache only folds case and whitespace, so "forgiving ping
+driver for a slow swing" and "ping drivers that are forgiving for slow
+swings" each cost a full LLM build (benchmarks/check_semantic_cache.py checks
+that the second reuses the first). Every query the LLM answered is kept here as a local vector (hashed
+character trigrams and words, L2-normalized; no embedding service) per club
+type and prompt version, and a later query whose cosine similarity to one of
+them reaches SEMANTIC_CACHE_THRESHOLD reuses its URL and classification.
+
+Similar text alone is not enough: "ping driver under $300" and "ping driver
+under $500" are near-identical strings. Two queries only match when
+everything the local parsers can read from them is identical too (see
+signature()): rule_parser's filters and sort, the local model phrase, every
+token containing a digit, the CONTRAST_WORDS present and each negation with
+the word it negates ("not forged" never reuses "forged").
+
+With numpy the vectors are rows of one matrix and a lookup is a single
+matrix-vector product; without it, a sparse dot product per entry.
+"""
+import math
+import re
+import threading
+import zlib
+from config import SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_DIMS
+from services import rule_parser
+from services.cache import normalize_query
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_WORD_RE = re.compile(r"[a-z0-9.]+")
+
+# Words that flip what a query asks for while barely changing its text
+# ("irons for a high / low handicapper", "fixes my slice / hook")
+CONTRAST_WORDS = {
+    "high", "low", "mid", "fast", "slow", "hook", "slice", "draw", "fade", "spin", "launch", "forgiving",
+    "beginner", "advanced", "junior", "kid", "short", "long", "heavy", "light", "upright", "flat",
+    "soft", "firm", "wind", "windy", "lob", "sand", "gap", "pitching",
+}
+
+# Words that turn the next one around ("not forged", "non adjustable", "without offset")
+NEGATION_WORDS = {"not", "no", "non", "without", "except", "excluding", "nor"}
+
+
+def _words(text: str) -> list:
+    # Dropping a trailing "s" folds most plurals ("drivers", "irons") into the singular
+    return [w[:-1] if len(w) > 3 and w.endswith("s") else w for w in _WORD_RE.findall(normalize_query(text))]
+
+
+def vectorize(text: str, dims: int = SEMANTIC_CACHE_DIMS) -> dict:
+    """Sparse L2-normalized {bucket: weight} of the query's words and character trigrams."""
+    words = _words(text)
+    padded = f" {' '.join(words)} "
+    features = [f"w:{w}" for w in words] + [padded[i:i + 3] for i in range(len(padded) - 2)]
+    counts = {}
+    for feature in features:
+        bucket = zlib.crc32(feature.encode("utf-8")) % dims
+        counts[bucket] = counts.get(bucket, 0) + 1
+    weights = {b: 1 + math.log(c) for b, c in counts.items()}
+    norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+    return {b: w / norm for b, w in weights.items()}
+
+
+def signature(user_query: str, club_type: str, model_phrase: str = None) -> tuple:
+    """What must be equal for two queries to share a URL, whatever their similarity."""
+    parsed = rule_parser.parse_query(user_query, club_type)
+    filters = tuple(sorted((param, tuple(sorted(values))) for param, values in parsed["filters"].items()))
+    digit_tokens = tuple(sorted({t for t in parsed["leftover"] if any(c.isdigit() for c in t)}))
+    words = _words(user_query)
+    contrast = tuple(sorted(CONTRAST_WORDS.intersection(words)))
+    negated = tuple(sorted(" ".join(words[i:i + 2]) for i, w in enumerate(words) if w in NEGATION_WORDS))
+    return filters, parsed["sort"], (model_phrase or "").lower(), digit_tokens, contrast, negated
+
+
+class SemanticCache:
+    """Fixed-size ring of (namespace, signature, query, value) and their vectors; oldest entries are replaced first."""
+
+    def __init__(self, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 dims: int = SEMANTIC_CACHE_DIMS):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.dims = dims
+        self._entries = [None] * max_entries  # (namespace, signature, query, value)
+        self._next = 0
+        self._lock = threading.Lock()
+        if np is not None:
+            self._matrix = np.zeros((max_entries, dims), dtype=np.float32)
+            self._namespace_ids = np.full(max_entries, -1, dtype=np.int32)
+            self._ids = {}  # namespace -> small int for the mask
+        else:
+            self._vectors = [None] * max_entries
+        self.stats_counts = {"lookups": 0, "hits": 0, "guard_rejects": 0, "adds": 0}
+
+    def _candidates(self, vector: dict, namespace: str) -> list:
+        """(similarity, slot) of entries in the namespace at or above the threshold, best first."""
+        if np is not None:
+            ns_id = self._ids.get(namespace)
+            if ns_id is None:
+                return []
+            dense = np.zeros(self.dims, dtype=np.float32)
+            dense[list(vector)] = list(vector.values())
+            scores = self._matrix @ dense
+            scores[self._namespace_ids != ns_id] = -1.0
+            slots = np.flatnonzero(scores >= self.threshold)
+            slots = slots[np.argsort(-scores[slots], kind="stable")]
+            return [(float(scores[i]), int(i)) for i in slots]
+        found = []
+        for slot, (entry, other) in enumerate(zip(self._entries, self._vectors)):
+            if entry is None or entry[0] != namespace:
+                continue
+            score = sum(w * other.get(b, 0.0) for b, w in vector.items())
+            if score >= self.threshold:
+                found.append((score, slot))
+        return sorted(found, reverse=True)
+
+    def lookup(self, user_query: str, namespace: str, sig: tuple):
+        """{"value", "query", "similarity"} of the closest matching earlier query, or None."""
+        vector = vectorize(user_query, self.dims)
+        with self._lock:
+            self.stats_counts["lookups"] += 1
+            rejected = False
+            for score, slot in self._candidates(vector, namespace):
+                _, entry_sig, query, value = self._entries[slot]
+                if entry_sig != sig:
+                    rejected = True
+                    continue
+                self.stats_counts["hits"] += 1
+                return {"value": value, "query": query, "similarity": score}
+            if rejected:
+                self.stats_counts["guard_rejects"] += 1
+        return None
+
+    def add(self, user_query: str, namespace: str, sig: tuple, value):
+        vector = vectorize(user_query, self.dims)
+        with self._lock:
+            slot = self._next
+            self._next = (slot + 1) % self.max_entries
+            self._entries[slot] = (namespace, sig, user_query, value)
+            if np is not None:
+                ns_id = self._ids.setdefault(namespace, len(self._ids))
+                row = self._matrix[slot]
+                row[:] = 0.0
+                row[list(vector)] = list(vector.values())
+                self._namespace_ids[slot] = ns_id
+            else:
+                self._vectors[slot] = vector
+            self.stats_counts["adds"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.stats_counts)
+            out["entries"] = sum(1 for e in self._entries if e is not None)
+        out["hit_rate"] = round(out["hits"] / out["lookups"], 4) if out["lookups"] else 0.0
+        out["threshold"] = self.threshold
+        out["backend"] = "numpy" if np is not None else "python"
+        return out
@@ -0,0 +1,198 @@
+"""Single-flight coalescing: identical concurrent work runs once, duplicates wait for it.
+
+SingleFlight.do(key, fn) runs fn for the first caller of a key; callers that
+arrive while it is running block until it finishes and get the same result
+(or exception). do_async is the same for coroutines in asgi.py.
+
+With a Redis client the leader also holds a short SET NX lock, so a worker
+that finds another process computing the same key polls until the lock is
+released and then reads the result through lookup() (the shared Redis query
+or scrape cache) instead of computing it again. If the lock holder dies or
+takes longer than SINGLEFLIGHT_WAIT_SECS, the waiter computes it itself.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from config import SINGLEFLIGHT_REDIS, SINGLEFLIGHT_LOCK_TTL_SECS, SINGLEFLIGHT_WAIT_SECS, SINGLEFLIGHT_POLL_SECS
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name: str, redis_client=None):
+        self.name = name
+        self.redis = redis_client
+        self._calls = {}  # key -> _Call (threads)
+        self._futures = {}  # key -> asyncio.Future (event loop)
+        self._lock = threading.Lock()
+        self.stats_counts = {"leaders": 0, "coalesced": 0, "remote_waits": 0, "remote_hits": 0, "lock_errors": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats_counts[key] += 1
+
+    # ---------- in-process ----------
+
+    def do(self, key: str, fn, lookup=None):
+        """Return (result, coalesced): fn() once per key at a time; duplicates share its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats_counts["leaders"] += 1
+            else:
+                self.stats_counts["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = self._across_workers(key, fn, lookup)
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key: str, coro_fn, lookup=None):
+        """do() for coroutines: coro_fn() is awaited once per key; duplicates await the same future."""
+        future = self._futures.get(key)
+        if future is not None:
+            self._count("coalesced")
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # this request was cancelled
+                return await self.do_async(key, coro_fn, lookup)  # the leader's was; take over
+        future = self._futures[key] = asyncio.get_running_loop().create_future()
+        self._count("leaders")
+        try:
+            result = await self._across_workers_async(key, coro_fn, lookup)
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            self._futures.pop(key, None)
+
+    # ---------- across workers (optional Redis lock) ----------
+
+    def _try_lock(self, key: str):
+        """Lock token if we got the lock, None if another worker holds it, "" if Redis failed."""
+        token = uuid.uuid4().hex
+        try:
+            if self.redis.set(f"sf:{self.name}:{key}", token, nx=True, px=int(SINGLEFLIGHT_LOCK_TTL_SECS * 1000)):
+                return token
+            return None
+        except Exception as e:
+            print(f"[SINGLEFLIGHT] {self.name} lock error:", e)
+            self._count("lock_errors")
+            return ""
+
+    def _unlock(self, key: str, token: str):
+        if not token:
+            return
+        try:
+            lock_key = f"sf:{self.name}:{key}"
+            if self.redis.get(lock_key) in (token, token.encode()):
+                self.redis.delete(lock_key)
+        except Exception as e:
+            print(f"[SINGLEFLIGHT] {self.name} unlock error:", e)
+            self._count("lock_errors")
+
+    def _locked(self, key: str) -> bool:
+        try:
+            return bool(self.redis.exists(f"sf:{self.name}:{key}"))
+        except Exception:
+            return False
+
+    def _across_workers(self, key: str, fn, lookup):
+        if self.redis is None:
+            return fn()
+        token = self._try_lock(key)
+        if token is None:
+            self._count("remote_waits")
+            deadline = time.monotonic() + SINGLEFLIGHT_WAIT_SECS
+            while self._locked(key) and time.monotonic() < deadline:
+                time.sleep(SINGLEFLIGHT_POLL_SECS)
+            found = lookup() if lookup else None
+            if found is not None:
+                self._count("remote_hits")
+                return found
+            token = self._try_lock(key)
+        try:
+            return fn()
+        finally:
+            self._unlock(key, token)
+
+    async def _across_workers_async(self, key: str, coro_fn, lookup):
+        if self.redis is None:
+            return await coro_fn()
+        token = await asyncio.to_thread(self._try_lock, key)
+        if token is None:
+            self._count("remote_waits")
+            deadline = time.monotonic() + SINGLEFLIGHT_WAIT_SECS
+            while await asyncio.to_thread(self._locked, key) and time.monotonic() < deadline:
+                await asyncio.sleep(SINGLEFLIGHT_POLL_SECS)
+            found = await asyncio.to_thread(lookup) if lookup else None
+            if found is not None:
+                self._count("remote_hits")
+                return found
+            token = await asyncio.to_thread(self._try_lock, key)
+        try:
+            return await coro_fn()
+        finally:
+            await asyncio.to_thread(self._unlock, key, token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self.stats_counts)
+            out["inflight"] = len(self._calls) + len(self._futures)
+        total = out["leaders"] + out["coalesced"]
+        out["coalesced_ratio"] = round(out["coalesced"] / total, 4) if total else 0.0
+        out["shared"] = self.redis is not None
+        return out
+
+
+_redis_client = None
+_redis_checked = False
+
+
+def _shared_redis():
+    """Redis client for cross-worker locks (REDIS_URL, when SINGLEFLIGHT_REDIS), else None."""
+    global _redis_client, _redis_checked
+    if not _redis_checked:
+        _redis_checked = True
+        redis_url = os.environ.get("REDIS_URL")
+        if SINGLEFLIGHT_REDIS and redis_url:
+            try:
+                import redis
+                client = redis.Redis.from_url(redis_url, socket_timeout=2)
+                client.ping()
+                _redis_client = client
+                print("[SINGLEFLIGHT] using Redis locks across workers")
+            except Exception as e:
+                print(f"[SINGLEFLIGHT] Redis unavailable ({e}), coalescing in-process only")
+    return _redis_client
+
+
+def make_group(name: str) -> SingleFlight:
+    return SingleFlight(name, _shared_redis())
@@ -0,0 +1,147 @@
+"""Mixpanel events sent from a background thread instead of inside the request.
+
+track() only puts the event on a bounded in-process queue and returns; it
+never blocks. One long-lived consumer thread drains the queue and posts
+events to Mixpanel in batches, whenever TELEMETRY_BATCH_SIZE events are
+buffered or TELEMETRY_FLUSH_SECS has passed. When the queue is full the
+event is dropped (and counted) rather than slowing the request down. The
+buffer is flushed at interpreter exit.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+import mixpanel
+from config import (
+    TELEMETRY_QUEUE_SIZE, TELEMETRY_BATCH_SIZE, TELEMETRY_FLUSH_SECS,
+    TELEMETRY_TIMEOUT_SECS, TELEMETRY_SHUTDOWN_SECS,
+)
+from services import metrics
+
+MAX_BATCH = 50  # Mixpanel /track accepts at most 50 events per request
+_STOP = object()
+
+_queue = queue.Queue(maxsize=TELEMETRY_QUEUE_SIZE)
+_worker = None
+_worker_lock = threading.Lock()
+_stopped = False
+
+STATS = {"enqueued": 0, "dropped": 0, "sent": 0, "failed": 0, "batches": 0, "flush_ms": 0.0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, n=1):
+    with _stats_lock:
+        STATS[key] += n
+
+
+class _Collector:
+    """Mixpanel consumer that only collects the encoded events; the worker posts them."""
+
+    def __init__(self):
+        self.events = []
+
+    def send(self, endpoint, json_message, api_key=None, api_secret=None):
+        self.events.append(json_message)
+
+
+def _flush(collector: _Collector, consumer):
+    events, collector.events = collector.events, []
+    for i in range(0, len(events), MAX_BATCH):
+        batch = events[i:i + MAX_BATCH]
+        t = time.perf_counter()
+        try:
+            consumer.send("events", "[" + ",".join(batch) + "]")  # the SDK retries internally
+            _count("sent", len(batch))
+        except Exception as e:
+            print(f"[TELEMETRY] dropping {len(batch)} events after send error:", e)
+            _count("failed", len(batch))
+        ms = (time.perf_counter() - t) * 1000
+        with _stats_lock:
+            STATS["batches"] += 1
+            STATS["flush_ms"] += ms
+        metrics.observe("telemetry_flush", ms)
+
+
+def _run(token: str):
+    collector = _Collector()
+    mp = mixpanel.Mixpanel(token, consumer=collector)
+    consumer = mixpanel.Consumer(request_timeout=TELEMETRY_TIMEOUT_SECS)
+    batch_size = max(1, min(TELEMETRY_BATCH_SIZE, MAX_BATCH))
+    deadline = time.monotonic() + TELEMETRY_FLUSH_SECS
+    while True:
+        try:
+            item = _queue.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            item = None
+        if item is _STOP:
+            _flush(collector, consumer)
+            return
+        if item is not None:
+            distinct_id, event, properties = item
+            try:
+                mp.track(distinct_id, event, properties)
+            except Exception as e:
+                print(f"[TELEMETRY] could not encode {event}:", e)
+                _count("failed")
+        if len(collector.events) >= batch_size or time.monotonic() >= deadline:
+            if collector.events:
+                _flush(collector, consumer)
+            deadline = time.monotonic() + TELEMETRY_FLUSH_SECS
+
+
+def _ensure_worker(token: str):
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_run, args=(token,), name="telemetry", daemon=True)
+                _worker.start()
+
+
+def enabled() -> bool:
+    return bool(os.environ.get("MIXPANEL_TOKEN")) and not _stopped
+
+
+def track(distinct_id: str, event: str, properties: dict = None):
+    """Queue a Mixpanel event; returns immediately and drops the event if the queue is full."""
+    if not enabled():
+        return
+    t = time.perf_counter()
+    _ensure_worker(os.environ.get("MIXPANEL_TOKEN"))
+    props = dict(properties or {})
+    props.setdefault("time", time.time())  # event time, not the time the worker gets to it
+    try:
+        _queue.put_nowait((distinct_id, event, props))
+        _count("enqueued")
+    except queue.Full:
+        _count("dropped")
+    metrics.observe("telemetry", (time.perf_counter() - t) * 1000)
+
+
+def shutdown(timeout: float = TELEMETRY_SHUTDOWN_SECS):
+    """Stop accepting events and flush what is queued (registered with atexit)."""
+    global _stopped
+    _stopped = True
+    if _worker is None or not _worker.is_alive():
+        return
+    try:
+        _queue.put(_STOP, timeout=timeout)
+    except queue.Full:
+        print("[TELEMETRY] queue still full at shutdown; remaining events are lost")
+        return
+    _worker.join(timeout)
+
+
+atexit.register(shutdown)
+
+
+def telemetry_stats() -> dict:
+    with _stats_lock:
+        out = dict(STATS)
+    out["flush_ms"] = round(out["flush_ms"], 1)
+    out["queue_depth"] = _queue.qsize()
+    out["queue_size"] = TELEMETRY_QUEUE_SIZE
+    out["enabled"] = enabled()
+    return out